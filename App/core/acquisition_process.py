@@ -0,0 +1,307 @@
+import multiprocessing as mp
+import queue
+import threading
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Set, Tuple, Type
+
+import numpy as np
+
+from core.serial_manager import SerialManager
+from core.csv_export import ExportCancelled
+from core.metrics import REGISTRY
+
+_DROPPED = REGISTRY.counter("temp_lab_dropped_samples_total", "Zahozené vzorky", ("stage",)).labels("shared_ring")
+
+# Hlavička sdílené paměti: [publikovaný počet řádků, kapacita, počet sloupců, rezerva]
+_HEADER_SLOTS = 4
+
+
+class SharedSampleRing:
+    """
+    Kruhový buffer vzorků ve sdílené paměti (multiprocessing.shared_memory).
+      - jeden zapisovatel (proces měření), čtenář (GUI) má pohled jen pro čtení
+      - řádek = [t_s, kanál_0, kanál_1, ...], chybějící hodnota = NaN
+      - zapisovatel nejdřív zapíše řádek a teprve pak zvýší publikovaný počet,
+        čtenář tedy nikdy nevidí rozepsaný řádek
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, channels: List[str], owner: bool):
+        self._shm = shm
+        self._owner = owner
+        self.channels = list(channels)
+        self._index: Dict[str, int] = {key: i + 1 for i, key in enumerate(self.channels)}
+
+        self._header = np.ndarray((_HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        self.capacity = int(self._header[1])
+        n_cols = int(self._header[2])
+        self._rows = np.ndarray(
+            (self.capacity, n_cols), dtype=np.float64, buffer=shm.buf, offset=8 * _HEADER_SLOTS
+        )
+        if owner:
+            # GUI strana data jen čte
+            self._rows.flags.writeable = False
+
+    @classmethod
+    def create(cls, channels: List[str], capacity: int = 4096) -> "SharedSampleRing":
+        n_cols = 1 + len(channels)
+        shm = shared_memory.SharedMemory(create=True, size=8 * (_HEADER_SLOTS + capacity * n_cols))
+        header = np.ndarray((_HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        header[:] = (0, capacity, n_cols, 0)
+        del header
+        return cls(shm, channels, owner=True)
+
+    @classmethod
+    def attach(cls, name: str, channels: List[str]) -> "SharedSampleRing":
+        return cls(shared_memory.SharedMemory(name=name), channels, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def write(self, t_s: float, values: dict):
+        """Zapíše jeden vzorek (volá jen proces měření)."""
+        count = int(self._header[0])
+        row = self._rows[count % self.capacity]
+        row.fill(np.nan)
+        row[0] = t_s
+        for key, val in values.items():
+            idx = self._index.get(key)
+            if idx is not None:
+                row[idx] = val
+        self._header[0] = count + 1
+
+    def read_new(self, last_count: int) -> Tuple[np.ndarray, int, int]:
+        """
+        Vrátí (kopie nových řádků, nový počet, počet přeskočených řádků).
+        Přeskočené řádky vzniknou, pokud čtenář zaostal o víc než kapacitu.
+        """
+        count = int(self._header[0])
+        if count == last_count:
+            return self._rows[:0].copy(), count, 0
+
+        # Zapisovatel může právě psát řádek `count`, tj. slot řádku count - capacity
+        start = max(last_count, count + 1 - self.capacity)
+        rows = self._rows[np.arange(start, count) % self.capacity]
+
+        # Během kopírování mohl zapisovatel přepsat nejstarší řádky (včetně rozepsaného)
+        valid_from = int(self._header[0]) + 1 - self.capacity
+        if start < valid_from:
+            rows = rows[valid_from - start:]
+            start = valid_from
+        return rows, count, start - last_count
+
+    def rows_to_samples(self, rows: np.ndarray) -> List[Tuple[float, dict]]:
+        samples = []
+        for row in rows:
+            values = {
+                key: float(row[i + 1])
+                for i, key in enumerate(self.channels)
+                if not np.isnan(row[i + 1])
+            }
+            samples.append((float(row[0]), values))
+        return samples
+
+    def close(self):
+        # numpy pohledy musí zaniknout dřív, než se sdílená paměť zavře
+        self._header = None
+        self._rows = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _acquisition_main(measurement_cls, kwargs: dict, allowed: Optional[Set[str]], port: str,
+                      shm_name: str, channels: List[str], commands, events, replies, export_cancel):
+    """
+    Vstupní bod podřízeného procesu: SerialManager + měření, vzorky do sdílené paměti.
+    Proces po skončení měření uvolní port, ale běží dál kvůli exportu, dokud nepřijde "quit".
+    Odpovědi na příkazy (export, session) jdou do vlastní fronty replies - frontu events
+    čte GUI timer a odpověď by si vzal dřív než čekající vlákno.
+    """
+    ring = SharedSampleRing.attach(shm_name, channels)
+    serial_mgr = SerialManager()
+    try:
+        serial_mgr.open(port, reset=False)
+    except Exception as e:
+        events.put(("error", f"Port nelze otevřít v procesu měření: {e}"))
+        events.put(("finished",))
+        ring.close()
+        return
+
+    try:
+        measurement = measurement_cls(serial_mgr, **kwargs)
+    except (TypeError, ValueError) as e:
+        events.put(("error", f"Chyba při inicializaci měření: {e}"))
+        events.put(("finished",))
+        serial_mgr.close()
+        ring.close()
+        return
+    measurement.set_channel_filter(allowed)
+
+    finished = threading.Event()
+
+    def on_restored(hello):
+        measurement.on_connection_restored()
+        events.put(("connection_restored", measurement.gaps[-1] if measurement.gaps else None))
+
+    def on_lost():
+        measurement.on_connection_lost()
+        events.put(("connection_lost",))
+
+    measurement.set_callbacks(
+        on_data=ring.write,
+        on_progress=lambda fraction: events.put(("progress", fraction)),
+        on_finished=finished.set,
+        on_error=lambda msg: events.put(("error", msg)),
+    )
+    serial_mgr.set_connection_callbacks(on_lost=on_lost, on_restored=on_restored)
+    serial_mgr.set_line_callback(measurement.handle_line)
+    measurement.start()
+
+    port_released = False
+    while True:
+        if finished.is_set() and not port_released:
+            serial_mgr.close()
+            port_released = True
+            events.put(("finished",))
+
+        try:
+            cmd = commands.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+        if cmd[0] == "stop":
+            measurement.stop()
+        elif cmd[0] == "export":
+            _, filename, export_allowed, options = cmd
+            try:
+                ok = measurement.export_to_csv(
+                    filename, export_allowed, cancel=export_cancel,
+                    progress=lambda fraction: replies.put(("export_progress", fraction)), **options
+                )
+                replies.put(("export_result", ok, False))
+            except ExportCancelled:
+                replies.put(("export_result", False, True))
+        elif cmd[0] == "session":
+            _, path, session_file, metadata = cmd
+            replies.put(("session_result", measurement.save_session(path, session_file, **metadata)))
+        elif cmd[0] == "quit":
+            measurement.stop()
+            break
+
+    serial_mgr.close()
+    ring.close()
+
+
+class AcquisitionProcess:
+    """
+    Správa podřízeného procesu měření z pohledu GUI.
+    GUI periodicky volá poll_samples() / poll_events(); data čte ze sdílené paměti.
+    Export a uložení session volá jiné vlákno a čeká na odpověď ve vlastní frontě.
+    """
+
+    # Jak často čekající vlákno kontroluje zrušení exportu a běh procesu
+    REQUEST_POLL_S = 0.1
+
+    def __init__(self, measurement_cls: Type, port: str, channels: List[str],
+                 kwargs: Optional[dict] = None, allowed: Optional[Set[str]] = None,
+                 capacity: int = 4096):
+        ctx = mp.get_context("spawn")
+        self.ring = SharedSampleRing.create(channels, capacity)
+        self._commands = ctx.Queue()
+        self._events = ctx.Queue()
+        self._replies = ctx.Queue()
+        self._export_cancel = ctx.Event()
+        # Na odpověď čeká vždy jen jeden požadavek (export a uložení session z dávky se nesmí prolnout)
+        self._request_lock = threading.Lock()
+        self._read_count = 0
+        self.dropped_samples = 0
+
+        self._process = ctx.Process(
+            target=_acquisition_main,
+            args=(measurement_cls, kwargs or {}, allowed, port,
+                  self.ring.name, channels, self._commands, self._events,
+                  self._replies, self._export_cancel),
+            daemon=True,
+        )
+
+    def start(self):
+        self._process.start()
+
+    def is_alive(self) -> bool:
+        return self._process.is_alive()
+
+    def poll_samples(self) -> List[Tuple[float, dict]]:
+        rows, self._read_count, dropped = self.ring.read_new(self._read_count)
+        if dropped:
+            self.dropped_samples += dropped
+            _DROPPED.inc(dropped)
+            print(f"GUI nestíhá číst sdílený buffer, přeskočeno {dropped} vzorků")
+        return self.ring.rows_to_samples(rows)
+
+    def poll_events(self) -> List[tuple]:
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def stop(self):
+        self._commands.put(("stop",))
+
+    def export(self, filename: str, allowed: Optional[Set[str]] = None, options: Optional[dict] = None,
+               progress: Optional[Callable[[float], None]] = None,
+               cancel: Optional[threading.Event] = None) -> bool:
+        """
+        Export probíhá v procesu měření (tam jsou uložená data), čekáme na výsledek.
+        progress se volá z čekajícího vlákna, nastavený cancel se předá procesu (pak vyhodí ExportCancelled).
+        """
+        if not self.is_alive():
+            return False
+        self._export_cancel.clear()
+        reply = self._request(("export", filename, allowed, options or {}), "export_result", progress, cancel)
+        if reply is None:
+            return False
+        ok, cancelled = reply
+        if cancelled:
+            raise ExportCancelled()
+        return bool(ok)
+
+    def save_session(self, path: str, session_file: str, metadata: dict) -> Optional[dict]:
+        """Uložení session v procesu měření, vrací záznam katalogu."""
+        if not self.is_alive():
+            return None
+        reply = self._request(("session", path, session_file, metadata), "session_result")
+        return reply[0] if reply else None
+
+    def _request(self, cmd: tuple, result_kind: str, progress: Optional[Callable[[float], None]] = None,
+                 cancel: Optional[threading.Event] = None) -> Optional[tuple]:
+        """Pošle příkaz a počká na odpověď (bez výsledku = proces skončil). Vrací data odpovědi."""
+        with self._request_lock:
+            self._commands.put(cmd)
+            while True:
+                if cancel is not None and cancel.is_set():
+                    self._export_cancel.set()
+                try:
+                    reply = self._replies.get(timeout=self.REQUEST_POLL_S)
+                except queue.Empty:
+                    if not self.is_alive():
+                        return None
+                    continue
+                if reply[0] == "export_progress":
+                    if progress:
+                        progress(reply[1])
+                elif reply[0] == result_kind:
+                    return reply[1:]
+
+    def shutdown(self):
+        """Ukončí proces měření. Sdílená paměť zůstává čitelná až do close()."""
+        if self._process.is_alive():
+            self._commands.put(("quit",))
+            self._process.join(timeout=3.0)
+            if self._process.is_alive():
+                self._process.terminate()
+
+    def close(self):
+        self.ring.close()
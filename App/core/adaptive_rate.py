@@ -0,0 +1,142 @@
+import math
+from typing import Dict, Iterable, Optional, Tuple
+
+from core.sensors import FILTERED_SUFFIX
+
+# Rozsah firmware (SET RATE přijme 0 < f <= 10 Hz)
+MIN_RATE_HZ = 0.1
+MAX_RATE_HZ = 10.0
+# Povolené frekvence - menší počet změn a hezčí čísla v metadatech
+RATE_STEPS_HZ: Tuple[float, ...] = (0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+
+class _ChannelState:
+    """Odhad směrnice a šumu jednoho kanálu (exponenciální průměry)."""
+
+    __slots__ = ("t", "x", "slope", "noise")
+
+    def __init__(self, t: float, x: float):
+        self.t = t
+        self.x = x
+        self.slope = 0.0
+        self.noise: Optional[float] = None
+
+
+class AdaptiveRateController:
+    """
+    Volí vzorkovací frekvenci podle dynamiky signálu.
+
+    Pro každý sledovaný kanál se průběžně odhaduje směrnice (°C/s) a šum (odchylka vzorku
+    od předpovědi). Frekvence se volí tak, aby se mezi dvěma vzorky hodnota změnila zhruba
+    o `resolution` - ale změny menší než NOISE_FACTOR * šum se za pohyb nepovažují.
+      - zvýšení frekvence: hned (přechodový děj nesmí uniknout), nejvýš jednou za UP_HOLD_S
+      - snížení: až když nižší frekvence stačí nepřetržitě DOWN_HOLD_S sekund
+    update() vrací novou frekvenci, nebo None, pokud se nemá měnit.
+    """
+
+    SMOOTHING = 0.3       # váha nového odhadu směrnice
+    NOISE_SMOOTHING = 0.1
+    NOISE_FACTOR = 3.0
+    UP_HOLD_S = 2.0
+    DOWN_HOLD_S = 30.0
+    # Snížení jen s rezervou (frekvence by stačila i pro o tolik rychlejší změnu)
+    DOWN_MARGIN = 1.5
+
+    def __init__(self, initial_hz: float, resolution: float = 0.1,
+                 min_hz: float = MIN_RATE_HZ, max_hz: float = MAX_RATE_HZ,
+                 channels: Optional[Iterable[str]] = None):
+        self.min_hz = min_hz
+        self.max_hz = max_hz
+        self.resolution = resolution
+        self.channels = set(channels) if channels else None
+        self.rate_hz = self._quantize(initial_hz)
+        self._states: Dict[str, _ChannelState] = {}
+        self._last_change_t: Optional[float] = None
+        self._lower_since: Optional[float] = None
+
+    def reset(self, rate_hz: Optional[float] = None):
+        """Nová časová základna (start, znovupřipojení) - odhady se zahodí."""
+        self._states = {}
+        self._last_change_t = None
+        self._lower_since = None
+        if rate_hz is not None:
+            self.rate_hz = self._quantize(rate_hz)
+
+    def _quantize(self, rate_hz: float) -> float:
+        """Nejnižší povolená frekvence >= rate_hz (v mezích min/max)."""
+        rate_hz = min(max(rate_hz, self.min_hz), self.max_hz)
+        for step in RATE_STEPS_HZ:
+            if self.min_hz <= step <= self.max_hz and step >= rate_hz - 1e-9:
+                return step
+        return self.max_hz
+
+    def _watched(self, key: str) -> bool:
+        if self.channels is not None:
+            return key in self.channels
+        return key.startswith("T_") and not key.endswith(FILTERED_SUFFIX)
+
+    def _channel_rate(self, t_s: float, key: str, x: float) -> Optional[float]:
+        state = self._states.get(key)
+        if state is None:
+            self._states[key] = _ChannelState(t_s, x)
+            return None
+        dt = t_s - state.t
+        if dt <= 0:
+            return None
+
+        # Šum = odchylka od předpovědi podle dosavadní směrnice. Odchylka se omezí,
+        # aby začátek přechodového děje nezvedl odhad šumu (a tím necitlivost).
+        residual = abs(x - (state.x + state.slope * dt))
+        if state.noise is None:
+            state.noise = min(residual, self.resolution)
+        else:
+            residual = min(residual, self.NOISE_FACTOR * state.noise + self.resolution)
+            state.noise += self.NOISE_SMOOTHING * (residual - state.noise)
+
+        change = x - state.x
+        step = max(self.resolution, self.NOISE_FACTOR * state.noise)
+        state.slope += self.SMOOTHING * (change / dt - state.slope)
+        state.t, state.x = t_s, x
+
+        slope = abs(state.slope)
+        if abs(change) > step:
+            # Skok nad šumem se projeví hned, ne až po vyhlazení
+            slope = max(slope, abs(change) / dt)
+        return slope / step
+
+    def update(self, t_s: float, values: Dict[str, float]) -> Optional[float]:
+        wanted = self.min_hz
+        seen = False
+        for key, x in values.items():
+            if not self._watched(key) or not isinstance(x, (int, float)) or not math.isfinite(x):
+                continue
+            rate = self._channel_rate(t_s, key, float(x))
+            if rate is not None:
+                seen = True
+                wanted = max(wanted, rate)
+        if not seen:
+            return None
+
+        target = self._quantize(wanted)
+        if target > self.rate_hz:
+            self._lower_since = None
+            if self._last_change_t is not None and t_s - self._last_change_t < self.UP_HOLD_S:
+                return None
+            return self._change(t_s, target)
+
+        if self._quantize(wanted * self.DOWN_MARGIN) < self.rate_hz:
+            if self._lower_since is None:
+                self._lower_since = t_s
+            elif t_s - self._lower_since >= self.DOWN_HOLD_S:
+                # Dolů jen o jeden stupeň - případný další pokles po další prodlevě
+                lower = max(target, self._quantize(self.rate_hz / 2.5))
+                self._lower_since = t_s
+                return self._change(t_s, lower)
+        else:
+            self._lower_since = None
+        return None
+
+    def _change(self, t_s: float, rate_hz: float) -> float:
+        self.rate_hz = rate_hz
+        self._last_change_t = t_s
+        return rate_hz
@@ -0,0 +1,194 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Metody převzorkování
+METHOD_LINEAR = "linear"      # lineární interpolace mezi sousedními vzorky
+METHOD_PREVIOUS = "previous"  # poslední známá hodnota (zero-order hold)
+METHOD_NEAREST = "nearest"    # nejbližší vzorek
+METHOD_NONE = "none"          # bez interpolace - jen vzorky padající do buňky mřížky
+METHODS = (METHOD_LINEAR, METHOD_PREVIOUS, METHOD_NEAREST, METHOD_NONE)
+
+# Mezera mezi vzorky delší než GAP_FACTOR * typický krok = díra (jeden vynechaný vzorek se ještě překlene)
+GAP_FACTOR = 2.5
+
+
+class AlignedData:
+    """
+    Kanály převzorkované na společnou rovnoměrnou časovou mřížku.
+      - t: mřížka (s)
+      - values: { klíč: np.ndarray } - mimo platná místa NaN
+      - masks: { klíč: bool np.ndarray } - True = hodnota vychází z naměřených dat
+    """
+
+    def __init__(self, t: np.ndarray, values: Dict[str, np.ndarray], masks: Dict[str, np.ndarray]):
+        self.t = t
+        self.values = values
+        self.masks = masks
+
+    @property
+    def channels(self) -> List[str]:
+        return list(self.values)
+
+    @property
+    def dt(self) -> float:
+        return float(self.t[1] - self.t[0]) if len(self.t) > 1 else 0.0
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def matrix(self, keys: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Hodnoty jako 2D pole (řádek = čas, sloupec = kanál)."""
+        keys = self.channels if keys is None else keys
+        if not keys:
+            return np.empty((len(self.t), 0))
+        return np.column_stack([self.values[k] for k in keys])
+
+    def valid_rows(self, keys: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Řádky, kde jsou platné všechny zadané kanály."""
+        keys = self.channels if keys is None else keys
+        mask = np.ones(len(self.t), dtype=bool)
+        for key in keys:
+            mask &= self.masks[key]
+        return mask
+
+
+def make_grid(t_start: float, t_end: float, dt: float) -> np.ndarray:
+    if dt <= 0:
+        raise ValueError("dt musí být kladné")
+    n = int(np.floor((t_end - t_start) / dt + 1e-9)) + 1
+    return t_start + dt * np.arange(max(n, 0))
+
+
+def typical_step(t: np.ndarray) -> float:
+    """Typický krok vzorkování (medián rozdílů), 0 pokud nelze určit."""
+    steps = np.diff(t[np.isfinite(t)])
+    steps = steps[steps > 0]
+    return float(np.median(steps)) if len(steps) else 0.0
+
+
+def resample(t: np.ndarray, x: np.ndarray, grid: np.ndarray, method: str = METHOD_LINEAR,
+             max_gap_s: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Převzorkuje jeden kanál (t, x) na mřížku `grid`. NaN ve vstupu = chybějící vzorek.
+    Vrací (hodnoty, maska). Mimo rozsah dat a v dírách delších než max_gap_s je maska False
+    a hodnota NaN.
+    """
+    if method not in METHODS:
+        raise ValueError(f"neznámá metoda převzorkování: {method}")
+
+    valid = np.isfinite(t) & np.isfinite(x)
+    tk, xk = t[valid], x[valid]
+    out = np.full(len(grid), np.nan)
+    mask = np.zeros(len(grid), dtype=bool)
+    if not len(tk):
+        return out, mask
+
+    order = np.argsort(tk, kind="stable")
+    tk, xk = tk[order], xk[order]
+    if max_gap_s is None:
+        max_gap_s = GAP_FACTOR * (typical_step(tk) or typical_step(grid) or 1.0)
+
+    if method == METHOD_NONE:
+        # Každý vzorek do nejbližší buňky mřížky (při kolizi vyhrává pozdější)
+        dt = grid[1] - grid[0] if len(grid) > 1 else 1.0
+        idx = np.rint((tk - grid[0]) / dt).astype(np.int64)
+        inside = (idx >= 0) & (idx < len(grid))
+        out[idx[inside]] = xk[inside]
+        mask[idx[inside]] = True
+        return out, mask
+
+    # Index posledního vzorku <= t mřížky a následujícího vzorku
+    right = np.searchsorted(tk, grid, side="right")
+    left = right - 1
+    has_left = left >= 0
+    has_right = right < len(tk)
+    left_c = np.clip(left, 0, len(tk) - 1)
+    right_c = np.clip(right, 0, len(tk) - 1)
+    exact = has_left & (tk[left_c] == grid)
+
+    if method == METHOD_PREVIOUS:
+        mask = has_left & ((grid - tk[left_c]) <= max_gap_s)
+        out[mask] = xk[left_c[mask]]
+        return out, mask
+
+    # linear / nearest: uvnitř dat a sousední vzorky nejsou dál než max_gap_s
+    mask = exact | (has_left & has_right & ((tk[right_c] - tk[left_c]) <= max_gap_s))
+    if method == METHOD_LINEAR:
+        out[mask] = np.interp(grid[mask], tk, xk)
+    else:
+        nearer_right = (tk[right_c] - grid) < (grid - tk[left_c])
+        idx = np.where(has_right & nearer_right, right_c, left_c)
+        out[mask] = xk[idx[mask]]
+    return out, mask
+
+
+def _gap_mask(grid: np.ndarray, gaps: Iterable[Tuple[float, float]]) -> np.ndarray:
+    """True pro body mřížky ležící ve výpadku spojení."""
+    inside = np.zeros(len(grid), dtype=bool)
+    for start, end in gaps:
+        inside |= (grid > start) & (grid < end)
+    return inside
+
+
+def align(columns: Dict[str, np.ndarray], dt: Optional[float] = None, method: str = METHOD_LINEAR,
+          max_gap_s: Optional[float] = None, gaps: Iterable[Tuple[float, float]] = (),
+          t_start: Optional[float] = None, t_end: Optional[float] = None,
+          keys: Optional[Sequence[str]] = None) -> AlignedData:
+    """
+    Zarovná všechny kanály { "t_s": ..., klíč: ... } (např. Session.columns) na rovnoměrnou mřížku.
+      - dt: krok mřížky (výchozí = typický krok vzorkování)
+      - gaps: výpadky spojení, uvnitř nich je maska vždy False
+      - t_start / t_end: rozsah mřížky (výchozí = rozsah dat)
+    """
+    t = np.asarray(columns["t_s"], dtype=np.float64)
+    finite_t = t[np.isfinite(t)]
+    keys = [k for k in columns if k != "t_s"] if keys is None else list(keys)
+    if not len(finite_t):
+        empty = np.empty(0)
+        return AlignedData(empty, {k: empty for k in keys}, {k: empty.astype(bool) for k in keys})
+
+    source_step = typical_step(finite_t) or 1.0
+    step = dt or source_step
+    if max_gap_s is None:
+        # Díry se posuzují podle vzorkování celého záznamu, ne jednoho kanálu
+        max_gap_s = GAP_FACTOR * source_step
+    grid = make_grid(finite_t.min() if t_start is None else t_start,
+                     finite_t.max() if t_end is None else t_end, step)
+    in_gap = _gap_mask(grid, gaps)
+
+    values: Dict[str, np.ndarray] = {}
+    masks: Dict[str, np.ndarray] = {}
+    for key in keys:
+        x = np.asarray(columns[key], dtype=np.float64) if key in columns else np.full(len(t), np.nan)
+        out, mask = resample(t, x, grid, method, max_gap_s)
+        if in_gap.any():
+            mask &= ~in_gap
+            out[~mask] = np.nan
+        values[key] = out
+        masks[key] = mask
+    return AlignedData(grid, values, masks)
+
+
+def align_sessions(sessions: Sequence, dt: Optional[float] = None, method: str = METHOD_LINEAR,
+                   keys: Optional[Sequence[str]] = None) -> List[AlignedData]:
+    """
+    Více session na společnou mřížku v relativním čase (každá od 0 s) - pro překryvné grafy.
+    Délka mřížky = nejdelší session, kratší mají na konci masku False.
+    """
+    if not sessions:
+        return []
+    if dt is None:
+        steps = [typical_step(s.t_s) for s in sessions]
+        dt = min((s for s in steps if s > 0), default=1.0)
+    t_end = max(s.duration_s() for s in sessions)
+
+    result = []
+    for session in sessions:
+        t = session.t_s
+        t0 = float(np.nanmin(t)) if len(t) else 0.0
+        columns = dict(session.columns)
+        columns["t_s"] = t - t0
+        gaps = [(start - t0, end - t0) for start, end in session.gaps]
+        result.append(align(columns, dt, method, gaps=gaps, t_start=0.0, t_end=t_end, keys=keys))
+    return result
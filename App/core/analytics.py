@@ -0,0 +1,187 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from core.ring_buffer import RingBuffer
+from core.sensors import FILTERED_SUFFIX
+
+# Referenční teploměr (TMP117, ±0,1 °C)
+REFERENCE_KEY = "T_TMP"
+# Časový rozestup přírůstků pro odhad zpoždění
+DIFF_SPAN_S = 5.0
+# Největší hledané zpoždění (časové konstanty senzorů jsou v desítkách sekund)
+MAX_LAG_S = 120.0
+
+
+class SensorStats(NamedTuple):
+    """Odchylka senzoru od reference (v °C) a jeho zpoždění (v s, kladné = senzor je pomalejší)."""
+    n: int
+    bias: float
+    rms: float
+    max_error: float
+    lag_s: float
+
+
+def temperature_channels(keys: Iterable[str], reference: str = REFERENCE_KEY) -> List[str]:
+    """Teplotní kanály k porovnání (bez reference a filtrovaných kopií)."""
+    return [k for k in keys if k.startswith("T_") and k != reference and not k.endswith(FILTERED_SUFFIX)]
+
+
+def estimate_lag(t_s: np.ndarray, x: np.ndarray, ref: np.ndarray,
+                 max_lag_s: Optional[float] = None) -> float:
+    """
+    Zpoždění x za ref pomocí křížové korelace přes FFT.
+    Data se převzorkují na rovnoměrnou mřížku a korelují se přírůstky za DIFF_SPAN_S
+    (samotné teploty ovládá trend ohřevu, přírůstky po jednom vzorku zase šum).
+    Korelace je normovaná pro každé posunutí zvlášť (krátká okna živého měření),
+    poloha maxima se zpřesní parabolou přes sousední body.
+    Chybějící hodnoty (NaN) se přeskočí.
+    """
+    valid = np.isfinite(t_s) & np.isfinite(x) & np.isfinite(ref)
+    t, x, ref = t_s[valid], x[valid], ref[valid]
+    if len(t) < 8:
+        return float("nan")
+
+    dt = float(np.median(np.diff(t)))
+    if dt <= 0:
+        return float("nan")
+    grid = np.arange(t[0], t[-1], dt)
+    span = max(1, int(round(DIFF_SPAN_S / dt)))
+    if len(grid) < span + 8:
+        return float("nan")
+    dx = _increments(np.interp(grid, t, x), span)
+    dr = _increments(np.interp(grid, t, ref), span)
+    n = len(dx)
+    if n < 4 or not dx.any() or not dr.any():
+        return float("nan")
+
+    max_lag = max(1, n // 2 if max_lag_s is None else min(n // 2, int(max_lag_s / dt)))
+    lags = _normalized_xcorr(dx, dr, max_lag)
+    k = int(np.nanargmax(lags))
+
+    shift = 0.0
+    if 0 < k < len(lags) - 1:
+        y0, y1, y2 = lags[k - 1], lags[k], lags[k + 1]
+        denom = y0 - 2 * y1 + y2
+        if denom:
+            shift = 0.5 * (y0 - y2) / denom
+    return float((k - max_lag + shift) * dt)
+
+
+def _normalized_xcorr(x: np.ndarray, r: np.ndarray, max_lag: int) -> np.ndarray:
+    """
+    Pearsonův korelační koeficient x[i + k] a r[i] pro k = -max_lag..max_lag.
+    Součiny pro všechna k najednou přes FFT (doplnění nulami -> lineární korelace),
+    střední hodnoty a rozptyly překrývajících se úseků z kumulativních součtů.
+    """
+    n = len(x)
+    nfft = 1 << (2 * n - 1).bit_length()
+    corr = np.fft.irfft(np.fft.rfft(x, nfft) * np.conj(np.fft.rfft(r, nfft)), nfft)
+    k = np.arange(-max_lag, max_lag + 1)
+    s_xy = np.concatenate((corr[nfft - max_lag:], corr[:max_lag + 1]))
+
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cxx = np.concatenate(([0.0], np.cumsum(x * x)))
+    cr = np.concatenate(([0.0], np.cumsum(r)))
+    crr = np.concatenate(([0.0], np.cumsum(r * r)))
+    # Překryv: x[max(k,0) : n+min(k,0)], r[max(-k,0) : n-max(k,0)]
+    x0, x1 = np.maximum(k, 0), n + np.minimum(k, 0)
+    r0, r1 = np.maximum(-k, 0), n - np.maximum(k, 0)
+    m = (n - np.abs(k)).astype(np.float64)
+    s_x, s_xx = cx[x1] - cx[x0], cxx[x1] - cxx[x0]
+    s_r, s_rr = cr[r1] - cr[r0], crr[r1] - crr[r0]
+
+    cov = s_xy - s_x * s_r / m
+    var = (s_xx - s_x * s_x / m) * (s_rr - s_r * s_r / m)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(var > 0, cov / np.sqrt(np.maximum(var, 0.0)), np.nan)
+
+
+def _increments(y: np.ndarray, span: int) -> np.ndarray:
+    """Přírůstky y[i + span] - y[i] bez střední hodnoty."""
+    d = y[span:] - y[:-span]
+    return d - d.mean()
+
+
+def compare_to_reference(columns: Dict[str, np.ndarray], reference: str = REFERENCE_KEY,
+                         sensors: Optional[Iterable[str]] = None,
+                         max_lag_s: Optional[float] = MAX_LAG_S) -> Dict[str, SensorStats]:
+    """
+    Statistiky všech teplotních senzorů vůči referenci nad celou session.
+    columns = { "t_s": ..., "T_TMP": ..., "T_BME": ... } (např. Session.columns), NaN = chybí.
+    """
+    if reference not in columns or "t_s" not in columns:
+        return {}
+    t = np.asarray(columns["t_s"], dtype=np.float64)
+    ref = np.asarray(columns[reference], dtype=np.float64)
+    keys = temperature_channels(columns, reference) if sensors is None else list(sensors)
+
+    result: Dict[str, SensorStats] = {}
+    for key in keys:
+        x = np.asarray(columns.get(key, ()), dtype=np.float64)
+        if len(x) != len(ref):
+            continue
+        err = x - ref
+        err = err[np.isfinite(err)]
+        if not len(err):
+            continue
+        result[key] = SensorStats(
+            n=len(err),
+            bias=float(err.mean()),
+            rms=float(np.sqrt(np.mean(err * err))),
+            max_error=float(np.abs(err).max()),
+            lag_s=estimate_lag(t, x, ref, max_lag_s),
+        )
+    return result
+
+
+class SlidingComparison:
+    """
+    Porovnání s referencí za posledních `window_s` sekund živého měření.
+    compute(snapshot) čte okno přímo z uložených dat měření (SampleSnapshot, bez vlastní kopie).
+    Bez snapshotu (měření v samostatném procesu) se vzorky z add() ukládají do kruhových
+    bufferů (jeden na kanál, NaN = chybí). Výpočet je stejný jako compare_to_reference() nad oknem.
+    """
+
+    MAX_RATE_HZ = 10.0
+
+    def __init__(self, window_s: float = 120.0, reference: str = REFERENCE_KEY,
+                 max_lag_s: Optional[float] = 30.0):
+        self.window_s = window_s
+        self.reference = reference
+        self.max_lag_s = max_lag_s
+        self._capacity = int(window_s * self.MAX_RATE_HZ) + 1
+        self._t = RingBuffer(self._capacity)
+        self._channels: Dict[str, RingBuffer] = {}
+
+    def clear(self):
+        self._t.clear()
+        self._channels.clear()
+
+    def add(self, t_s: float, values: Dict[str, float]):
+        for key in values:
+            if key not in self._channels and (key == self.reference
+                                              or temperature_channels([key], self.reference)):
+                buf = RingBuffer(self._capacity)
+                buf.extend(np.full(len(self._t), np.nan))
+                self._channels[key] = buf
+
+        self._t.append(t_s)
+        for key, buf in self._channels.items():
+            buf.append(values.get(key, np.nan))
+
+    def compute(self, snapshot=None) -> Dict[str, SensorStats]:
+        if snapshot is not None:
+            # Okno má nejvýš tolik řádků jako vlastní buffery (MAX_RATE_HZ)
+            columns = snapshot.columns(start=max(0, len(snapshot) - self._capacity))
+        else:
+            columns = {"t_s": self._t.view()}
+            for key, buf in self._channels.items():
+                columns[key] = buf.view()
+
+        t = columns.get("t_s")
+        if self.reference not in columns or t is None or len(t) < 2:
+            return {}
+        start = int(t.searchsorted(t[-1] - self.window_s))
+        return compare_to_reference({key: col[start:] for key, col in columns.items()},
+                                    self.reference, max_lag_s=self.max_lag_s)
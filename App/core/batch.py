@@ -0,0 +1,352 @@
+import json
+import math
+import os
+import threading
+import time
+from typing import List, Optional, Set, Union
+
+from PySide6.QtCore import QObject, QTimer, Signal, Slot
+
+from core.session import SESSIONS_DIR, load_catalog, save_catalog
+from core.steady_state import SteadyStateDetector
+
+# Měření, které během čekání na podmínku jen sleduje teploty (STOP v ESP32 vypne topení i chlazení)
+MONITOR_TYPE = "Krátké měření"
+MONITOR_RATE_HZ = 1.0
+
+
+class Cooldown:
+    """
+    Podmínka pro start běhu: kanál `channel` je v pásmu target ± band nepřetržitě hold_s sekund.
+      - target None = hodnota kanálu na začátku dávky (návrat do výchozího stavu)
+      - timeout_s: nejdelší čekání, pak se běh spustí i tak (poznamená se do metadat)
+    """
+
+    def __init__(self, channel: str = "T_TMP", target: Optional[float] = None, band: float = 0.5,
+                 hold_s: float = 30.0, timeout_s: float = 1800.0):
+        self.channel = channel
+        self.target = target
+        self.band = band
+        self.hold_s = hold_s
+        self.timeout_s = timeout_s
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Cooldown":
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        return {"channel": self.channel, "target": self.target, "band": self.band,
+                "hold_s": self.hold_s, "timeout_s": self.timeout_s}
+
+
+class BatchRun:
+    """
+    Jeden běh dávky: typ měření (název z MeasurementManager) a jeho parametry.
+    duration_s / rate_hz None = výchozí hodnota typu měření, adaptive_rate = frekvence podle dynamiky.
+    steady_stop: True / parametry SteadyStateDetector = běh skončí (a dávka pokračuje), jakmile se teploty ustálí.
+    """
+
+    def __init__(self, type_name: str, duration_s: Optional[float] = None, rate_hz: Optional[float] = None,
+                 pwm_channel: Optional[int] = None, pwm_value: Optional[int] = None,
+                 cooldown: Optional[Cooldown] = None, label: str = "", adaptive_rate: bool = False,
+                 steady_stop: Union[bool, dict, None] = None):
+        self.type_name = type_name
+        self.duration_s = duration_s
+        self.rate_hz = rate_hz
+        self.pwm_channel = pwm_channel
+        self.pwm_value = pwm_value
+        self.cooldown = cooldown
+        self.label = label
+        self.adaptive_rate = adaptive_rate
+        self.steady_stop = steady_stop
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BatchRun":
+        data = dict(data)
+        if data.get("cooldown") is not None:
+            data["cooldown"] = Cooldown.from_dict(data["cooldown"])
+        return cls(**data)
+
+    def measurement_kwargs(self) -> dict:
+        kwargs = {}
+        if self.duration_s is not None:
+            kwargs["duration_s"] = self.duration_s
+        if self.rate_hz is not None:
+            kwargs["rate_hz"] = self.rate_hz
+        if self.pwm_channel is not None:
+            kwargs["pwm_channel"] = self.pwm_channel
+        if self.pwm_value is not None:
+            kwargs["pwm_value"] = self.pwm_value
+        if self.adaptive_rate:
+            kwargs["adaptive_rate"] = True
+        if self.steady_stop:
+            kwargs["steady_stop"] = self.steady_stop
+        return kwargs
+
+    def validate(self):
+        """Chybné parametry (TypeError / ValueError) se ohlásí před startem dávky, ne až v jejím průběhu."""
+        if isinstance(self.steady_stop, dict):
+            SteadyStateDetector(**self.steady_stop)
+
+    def describe(self) -> str:
+        return self.label or self.type_name
+
+
+def load_batch(path: str) -> List[BatchRun]:
+    """
+    Dávka z JSON souboru - seznam běhů, např.:
+      [{"type_name": "Část 1: Odporové snímače", "duration_s": 600, "pwm_channel": 0, "pwm_value": 50,
+        "cooldown": {"channel": "T_TMP", "band": 0.3, "hold_s": 60}, "label": "topeni_50",
+        "steady_stop": {"hold_s": 120, "max_slope": 0.01}}, ...]
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError("dávka musí být seznam běhů")
+    return [BatchRun.from_dict(item) for item in data]
+
+
+class BatchRunner(QObject):
+    """
+    Spouští frontu měření bez obsluhy.
+    Po konci běhu uloží session (vlastní .npz + záznam v katalogu) a hned spustí další běh,
+    případně nejdřív sleduje teploty, dokud nejsou splněny podmínky Cooldown.
+    Session se ukládá mimo GUI vlákno - v režimu procesu čeká na odpověď procesu
+    (a případně na dokončení exportu), GUI by mezitím zamrzlo.
+    """
+
+    IDLE = "idle"
+    RUNNING = "running"
+    COOLING = "cooling"
+    SAVING = "saving"
+
+    run_started = Signal(int, int, str)   # (index od 1, počet běhů, popis)
+    cooling_started = Signal(int, str)    # (index od 1, popis podmínky)
+    run_saved = Signal(int, str)          # (index od 1, soubor session)
+    batch_finished = Signal(int, bool)    # (dokončené běhy, přerušeno)
+    _session_saved = Signal(str, object)  # (soubor session, záznam katalogu / None) z vlákna ukládání
+
+    def __init__(self, meas_mgr, parent=None):
+        super().__init__(parent)
+        self._mgr = meas_mgr
+        self._runs: List[BatchRun] = []
+        self._allowed: Optional[Set[str]] = None
+        self._index = -1
+        self._state = self.IDLE
+        self._aborting = False
+        self._completed = 0
+        self._out_dir = SESSIONS_DIR
+        self._batch_dir = ""
+        self._save_thread: Optional[threading.Thread] = None
+
+        # Stav čekání na podmínku
+        self._baseline: dict = {}
+        self._cooldown_target = math.nan
+        self._in_band_since: Optional[float] = None
+        self._condition_met = False
+        self._cooldown_timed_out = False
+
+        self._mgr.finished.connect(self._on_measurement_finished)
+        self._mgr.data_received.connect(self._on_data)
+        self._session_saved.connect(self._on_session_saved)
+
+    def is_active(self) -> bool:
+        return self._state != self.IDLE
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def current_run(self) -> Optional[BatchRun]:
+        if 0 <= self._index < len(self._runs):
+            return self._runs[self._index]
+        return None
+
+    def start(self, runs: List[BatchRun], allowed_sensors: Optional[Set[str]] = None,
+              out_dir: str = SESSIONS_DIR):
+        if self.is_active():
+            raise RuntimeError("dávka už běží")
+        known = set(self._mgr.get_available_types())
+        unknown = [run.type_name for run in runs if run.type_name not in known]
+        if unknown:
+            raise ValueError(f"neznámé typy měření: {', '.join(unknown)}")
+        if not runs:
+            raise ValueError("dávka je prázdná")
+        for i, run in enumerate(runs, 1):
+            try:
+                run.validate()
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"běh {i} ({run.describe()}): {e}") from e
+
+        self._runs = list(runs)
+        self._allowed = set(allowed_sensors) if allowed_sensors else None
+        self._out_dir = out_dir
+        self._batch_dir = "batch_" + time.strftime("%Y%m%d_%H%M%S")
+        self._index = -1
+        self._completed = 0
+        self._aborting = False
+        self._baseline = {}
+        self._state = self.RUNNING
+        print(f"Dávka: {len(runs)} běhů -> {os.path.join(out_dir, self._batch_dir)}")
+        self._advance()
+
+    def stop(self):
+        """Přeruší dávku (rozběhnuté měření se uloží jako nedokončené)."""
+        if not self.is_active():
+            return
+        self._aborting = True
+        if self._state == self.SAVING:
+            # Po uložení rozběhnutého běhu dávka skončí sama
+            return
+        if self._mgr.is_running():
+            self._mgr.stop_measurement()
+        else:
+            # Nic neběží (např. start běhu selhal) - signál finished nepřijde
+            self._finish()
+
+    # --- průběh dávky ---
+
+    def _advance(self):
+        """Další běh: buď rovnou, nebo přes čekání na podmínku."""
+        if not self.is_active():
+            # Dávka mezitím skončila (stop), odložené volání z event loopu se zahodí
+            return
+        self._index += 1
+        if self._aborting or self._index >= len(self._runs):
+            self._finish()
+            return
+        run = self._runs[self._index]
+        if run.cooldown is not None:
+            self._start_cooling(run.cooldown)
+        else:
+            self._start_run()
+
+    def _start_run(self):
+        if not self.is_active():
+            return
+        run = self._runs[self._index]
+        self._state = self.RUNNING
+        self.run_started.emit(self._index + 1, len(self._runs), run.describe())
+        print(f"Dávka: běh {self._index + 1}/{len(self._runs)} ({run.describe()})")
+        if not self._mgr.start_measurement(run.type_name, allowed_sensors=self._allowed,
+                                           **run.measurement_kwargs()):
+            self._abort_failed_start()
+
+    def _abort_failed_start(self):
+        # Chybu už ohlásil MeasurementManager (error_occurred), finished nepřijde
+        print(f"Dávka: běh {self._index + 1} se nepodařilo spustit, dávka se přerušuje")
+        self._aborting = True
+        QTimer.singleShot(0, self._advance)
+
+    def _start_cooling(self, cooldown: Cooldown):
+        target = cooldown.target if cooldown.target is not None else self._baseline.get(cooldown.channel)
+        if target is None:
+            # První běh bez zadaného cíle - není s čím porovnat
+            self._start_run()
+            return
+        self._state = self.COOLING
+        self._cooldown_target = target
+        self._in_band_since = None
+        self._condition_met = False
+        self._cooldown_timed_out = False
+        text = f"{cooldown.channel} v {target:.2f} ± {cooldown.band:.2f} po {cooldown.hold_s:.0f} s"
+        self.cooling_started.emit(self._index + 1, text)
+        print(f"Dávka: čekám na podmínku ({text})")
+        allowed = self._allowed | {cooldown.channel} if self._allowed else None
+        if not self._mgr.start_measurement(MONITOR_TYPE, allowed_sensors=allowed,
+                                           duration_s=cooldown.timeout_s, rate_hz=MONITOR_RATE_HZ):
+            self._abort_failed_start()
+
+    @Slot(float, dict)
+    def _on_data(self, t_s: float, values: dict):
+        if self._state == self.RUNNING:
+            # Výchozí stav pro podmínky bez cíle = první hodnoty dávky
+            if not self._baseline:
+                self._baseline = dict(values)
+            return
+        if self._state != self.COOLING or self._condition_met:
+            return
+
+        cooldown = self._runs[self._index].cooldown
+        value = values.get(cooldown.channel)
+        if value is None:
+            return
+        if abs(value - self._cooldown_target) > cooldown.band:
+            self._in_band_since = None
+            return
+        if self._in_band_since is None:
+            self._in_band_since = t_s
+        if t_s - self._in_band_since >= cooldown.hold_s:
+            self._condition_met = True
+            self._mgr.stop_measurement()
+
+    @Slot()
+    def _on_measurement_finished(self):
+        if self._state == self.RUNNING:
+            self._save_run()
+            return
+        elif self._state == self.COOLING:
+            if not self._condition_met and not self._aborting:
+                self._cooldown_timed_out = True
+                print("Dávka: podmínka nesplněna do timeoutu, pokračuji")
+            if not self._aborting:
+                # Další běh až z event loopu (monitor musí nejdřív doběhnout)
+                QTimer.singleShot(0, self._start_run)
+                return
+        else:
+            return
+        QTimer.singleShot(0, self._advance)
+
+    def _save_run(self):
+        run = self._runs[self._index]
+        safe_label = "".join(c if c.isalnum() else "_" for c in run.describe())
+        session_file = f"{self._batch_dir}/{self._index + 1:02d}_{safe_label}.npz"
+        metadata = {
+            "batch": self._batch_dir,
+            "batch_index": self._index + 1,
+            "label": run.describe(),
+            "type_name": run.type_name,
+            "parameters": run.measurement_kwargs(),
+            "cooldown": run.cooldown.to_dict() if run.cooldown else None,
+            "cooldown_timed_out": self._cooldown_timed_out,
+            "aborted": self._aborting,
+        }
+        self._cooldown_timed_out = False
+        self._state = self.SAVING
+        self._save_thread = threading.Thread(
+            target=self._save_worker,
+            args=(os.path.join(self._out_dir, session_file), session_file, metadata),
+            daemon=True,
+        )
+        self._save_thread.start()
+
+    def _save_worker(self, path: str, session_file: str, metadata: dict):
+        entry = None
+        try:
+            entry = self._mgr.save_session(path, session_file, **metadata)
+            if entry is not None:
+                catalog = load_catalog(self._out_dir)
+                catalog.append(entry)
+                save_catalog(catalog, self._out_dir)
+        except (OSError, ValueError) as e:
+            print(f"Dávka: chyba při ukládání session: {e}")
+            entry = None
+        self._session_saved.emit(session_file, entry)
+
+    @Slot(str, object)
+    def _on_session_saved(self, session_file: str, entry: Optional[dict]):
+        if self._state != self.SAVING:
+            return
+        if entry is None:
+            print(f"Dávka: běh {self._index + 1} se nepodařilo uložit")
+        else:
+            self.run_saved.emit(self._index + 1, session_file)
+        self._completed += 1
+        self._advance()
+
+    def _finish(self):
+        aborted = self._aborting
+        self._state = self.IDLE
+        self._aborting = False
+        print(f"Dávka: hotovo, {self._completed}/{len(self._runs)} běhů")
+        self.batch_finished.emit(self._completed, aborted)
@@ -0,0 +1,92 @@
+import base64
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.sensors import CHANNEL_BITS
+
+# Kanály, které ESP32 umí zaznamenat v režimu BURST (interní ADC, viz BurstCapture.h)
+BURST_CHANNELS = ("V_ESP_R", "V_ESP_NTC")
+MAX_RATE_HZ = 10000.0
+MAX_VALUES = 32768
+MAX_WINDOW_S = 10.0
+
+
+class BurstError(Exception):
+    """Neúplný nebo poškozený výpis rychlého záznamu."""
+
+
+def burst_channels(mask: int) -> List[str]:
+    """Kanály obsažené v záznamu - v pořadí bitů masky (tak je ESP ukládá za sebou)."""
+    return sorted((key for key in BURST_CHANNELS if mask & (1 << CHANNEL_BITS[key])),
+                  key=lambda key: CHANNEL_BITS[key])
+
+
+def burst_command(rate_hz: float, samples: int, channels) -> str:
+    mask = 0
+    for key in channels:
+        mask |= 1 << CHANNEL_BITS[key]
+    return f"BURST {rate_hz:g} {int(samples)} {mask}"
+
+
+class BurstAssembler:
+    """
+    Skládá výpis rychlého záznamu ze zpráv ESP32:
+      {"type":"burst", "t_ms", "n", "mask", "period_us", "elapsed_us", "late"}
+      {"type":"burst_data", "seq", "data"}   (base64, uint16 mV little-endian, kanály vzorku za sebou)
+      {"type":"burst_end", "chunks", "n"}
+    Bloky se jen ukládají jako bajty, na pole se převede celý záznam najednou.
+    """
+
+    def __init__(self):
+        self.header: Optional[dict] = None
+        self._chunks: List[bytes] = []
+
+    def reset(self):
+        self.header = None
+        self._chunks = []
+
+    @property
+    def received_bytes(self) -> int:
+        return sum(len(chunk) for chunk in self._chunks)
+
+    @property
+    def expected_bytes(self) -> int:
+        if not self.header:
+            return 0
+        return self.header["n"] * len(burst_channels(self.header["mask"])) * 2
+
+    def feed(self, msg: dict) -> Optional[Dict[str, np.ndarray]]:
+        """Zpracuje zprávu; po posledním bloku vrátí sloupce (t_s + kanály v mV)."""
+        kind = msg.get("type")
+        if kind == "burst":
+            self.header = msg
+            self._chunks = []
+        elif kind == "burst_data":
+            if self.header is None:
+                return None
+            if msg.get("seq") != len(self._chunks):
+                raise BurstError(f"chybí blok {len(self._chunks)} (přišel {msg.get('seq')})")
+            self._chunks.append(base64.b64decode(msg.get("data", "")))
+        elif kind == "burst_end" and self.header is not None:
+            if msg.get("chunks") != len(self._chunks):
+                raise BurstError(f"přijato {len(self._chunks)} z {msg.get('chunks')} bloků")
+            return self._columns()
+        return None
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        header = self.header
+        keys = burst_channels(header["mask"])
+        n = header["n"]
+        raw = np.frombuffer(b"".join(self._chunks), dtype="<u2")
+        if len(raw) != n * len(keys):
+            raise BurstError(f"délka dat {len(raw)} neodpovídá {n} vzorkům")
+        values = raw.reshape(n, len(keys)).astype(np.float64)
+
+        # Skutečná perioda z doby záznamu (busy-wait na ESP drží krok, ale ověříme)
+        elapsed_s = header.get("elapsed_us", 0) / 1e6
+        period_s = elapsed_s / n if elapsed_s > 0 else header["period_us"] / 1e6
+        columns = {"t_s": np.arange(n) * period_s}
+        for i, key in enumerate(keys):
+            columns[key] = values[:, i]
+        return columns
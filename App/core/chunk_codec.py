@@ -0,0 +1,147 @@
+import json
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Kódování sloupce
+METHOD_QUANTIZED = "q"   # celá čísla na mřížce 1/scale, rozdíly 1. nebo 2. řádu
+METHOD_XOR = "x"         # obecné float64: XOR bitů se sousedem (Gorilla), pak zlib
+
+# Kandidátní rozlišení: celé, DS18B20 (1/16 °C), desetiny... až 4 desetinná místa (zaokrouhlení v měření)
+SCALES = (1, 16, 10, 100, 1000, 10000)
+# Nad tuto hodnotu by škálované celé číslo ztratilo přesnost ve float64
+_MAX_QUANTIZED_ABS = 2.0 ** 52
+
+ZLIB_LEVEL = 1
+_INT_TYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+def _forward_fill(x: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """NaN nahradí poslední platnou hodnotou (před první platnou první platnou) - kvůli malým rozdílům."""
+    if valid.all():
+        return x
+    idx = np.where(valid, np.arange(len(x)), 0)
+    np.maximum.accumulate(idx, out=idx)
+    filled = x[idx]
+    first = np.argmax(valid)
+    filled[:first] = x[first]
+    return filled
+
+
+def _find_scale(x: np.ndarray) -> Optional[int]:
+    """Nejmenší měřítko, se kterým jsou hodnoty přesně celá čísla (bezeztrátově)."""
+    if not len(x) or np.abs(x).max() * SCALES[-1] >= _MAX_QUANTIZED_ABS:
+        return None
+    for scale in SCALES:
+        ints = np.rint(x * scale)
+        if np.array_equal(ints / scale, x):
+            return scale
+    return None
+
+
+def _narrow(d: np.ndarray) -> np.ndarray:
+    """Nejmenší celočíselný typ, do kterého se rozdíly vejdou."""
+    if not len(d):
+        return d.astype(np.int8)
+    lo, hi = int(d.min()), int(d.max())
+    for dtype in _INT_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return d.astype(dtype)
+    return d
+
+
+def _diff(ints: np.ndarray, order: int) -> np.ndarray:
+    d = ints
+    for _ in range(order):
+        d = np.diff(d, prepend=np.int64(0))
+    return d
+
+
+def _encode_column(x: np.ndarray) -> Tuple[dict, bytes]:
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    valid = ~np.isnan(x)
+    n_valid = int(valid.sum())
+    scale = _find_scale(x[valid]) if n_valid and np.isfinite(x[valid]).all() else None
+
+    if scale is None:
+        bits = x.view(np.uint64)
+        xor = bits.copy()
+        xor[1:] ^= bits[:-1]
+        return {"m": METHOD_XOR}, zlib.compress(xor.tobytes(), ZLIB_LEVEL)
+
+    ints = np.rint(_forward_fill(x, valid) * scale).astype(np.int64)
+    # Rozdíly 2. řádu (delta-of-delta) se hodí na časovou osu a rampy, 1. řádu na šum
+    best = None
+    for order in (1, 2):
+        d = _diff(ints, order)
+        cost = np.abs(d[order:]).sum() if len(d) > order else 0
+        if best is None or cost < best[0]:
+            best = (cost, order, d)
+    _, order, d = best
+
+    # Úvodní hodnoty (velká čísla) do hlavičky, zbytek v nejužším typu
+    head = [int(v) for v in d[:order]]
+    body = _narrow(d[order:])
+    meta = {"m": METHOD_QUANTIZED, "s": scale, "o": order, "h": head, "t": body.dtype.str}
+    payload = body.tobytes()
+    if n_valid < len(x):
+        mask = np.packbits(valid).tobytes()
+        meta["nan"] = len(mask)
+        payload = mask + payload
+    return meta, zlib.compress(payload, ZLIB_LEVEL)
+
+
+def _decode_column(meta: dict, blob: bytes, n: int) -> np.ndarray:
+    raw = zlib.decompress(blob)
+    if meta["m"] == METHOD_XOR:
+        xor = np.frombuffer(raw, dtype=np.uint64)
+        return np.bitwise_xor.accumulate(xor).view(np.float64)
+
+    valid = None
+    mask_len = meta.get("nan", 0)
+    if mask_len:
+        valid = np.unpackbits(np.frombuffer(raw[:mask_len], dtype=np.uint8), count=n).astype(bool)
+        raw = raw[mask_len:]
+    body = np.frombuffer(raw, dtype=np.dtype(meta["t"])).astype(np.int64)
+    d = np.concatenate([np.array(meta["h"], dtype=np.int64), body])[:n]
+    for _ in range(meta["o"]):
+        d = np.cumsum(d)
+    x = d / meta["s"]
+    if valid is not None:
+        x[~valid] = np.nan
+    return x
+
+
+def encode_columns(columns: Dict[str, np.ndarray]) -> bytes:
+    """
+    Zakóduje blok sloupců stejné délky do bajtů (bezeztrátově):
+    [délka hlavičky 4 B][hlavička JSON][data sloupce 1][data sloupce 2]...
+    """
+    keys = list(columns)
+    n = len(columns[keys[0]]) if keys else 0
+    metas: List[dict] = []
+    blobs: List[bytes] = []
+    for key in keys:
+        meta, blob = _encode_column(columns[key])
+        meta["size"] = len(blob)
+        metas.append(meta)
+        blobs.append(blob)
+    header = json.dumps({"n": n, "keys": keys, "cols": metas}, separators=(",", ":")).encode("utf-8")
+    return len(header).to_bytes(4, "little") + header + b"".join(blobs)
+
+
+def decode_columns(data: bytes, keys: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """Dekóduje blok z encode_columns (volitelně jen vybrané sloupce)."""
+    header_len = int.from_bytes(data[:4], "little")
+    header = json.loads(data[4:4 + header_len])
+    n = header["n"]
+    pos = 4 + header_len
+    columns: Dict[str, np.ndarray] = {}
+    for key, meta in zip(header["keys"], header["cols"]):
+        size = meta["size"]
+        if keys is None or key in keys:
+            columns[key] = _decode_column(meta, data[pos:pos + size], n)
+        pos += size
+    return columns
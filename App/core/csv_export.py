@@ -0,0 +1,156 @@
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Výchozí formát pro český Excel: středník a desetinná čárka
+DEFAULT_DELIMITER = ";"
+DEFAULT_DECIMAL = ","
+DEFAULT_PRECISION = 4
+# Počet desetinných míst pro konkrétní sloupce
+COLUMN_PRECISION: Dict[str, int] = {"t_s": 3}
+
+CHUNK_ROWS = 200_000
+LINE_END = b"\r\n"
+
+# Nad tuto hodnotu by škálované celé číslo přeteklo int64 -> pomalá cesta přes Python
+_MAX_FAST_ABS = 1e15
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def _format_fixed(x: np.ndarray, precision: int, decimal: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vektorové formátování sloupce na pevný počet desetinných míst.
+    Vrací (znaky, maska): matice bajtů (řádek = hodnota) a maska platných znaků.
+    Úvodní nuly, znaménko u kladných čísel a celé NaN hodnoty maska vynechá.
+    """
+    n = len(x)
+    finite = np.isfinite(x)
+    scaled = np.rint(np.abs(np.where(finite, x, 0.0)) * 10.0 ** precision).astype(np.int64)
+    negative = (x < 0) & (scaled > 0)
+
+    max_val = int(scaled.max()) if n else 0
+    n_digits = max(len(str(max_val)), precision + 1)
+    n_int = n_digits - precision
+
+    # Číslice od nejnižšího řádu
+    digits = np.empty((n, n_digits), dtype=np.uint8)
+    q = scaled.copy()
+    for j in range(n_digits - 1, -1, -1):
+        digits[:, j] = q % 10 + 48
+        q //= 10
+
+    # Počet platných číslic celé části (alespoň jedna - "0,5")
+    int_part = scaled // (10 ** precision)
+    int_len = np.ones(n, dtype=np.int64)
+    threshold = 10
+    for _ in range(n_int - 1):
+        int_len += int_part >= threshold
+        threshold *= 10
+
+    sep_width = 1 if precision > 0 else 0
+    width = 1 + n_int + sep_width + precision
+    chars = np.empty((n, width), dtype=np.uint8)
+    mask = np.zeros((n, width), dtype=bool)
+
+    chars[:, 0] = ord("-")
+    mask[:, 0] = negative & finite
+    chars[:, 1:1 + n_int] = digits[:, :n_int]
+    mask[:, 1:1 + n_int] = (np.arange(n_int) >= (n_int - int_len)[:, None]) & finite[:, None]
+    if precision > 0:
+        chars[:, 1 + n_int] = decimal[0]
+        chars[:, 2 + n_int:] = digits[:, n_int:]
+        mask[:, 1 + n_int:] = finite[:, None]
+    return chars, mask
+
+
+def _format_slow(x: np.ndarray, precision: int, decimal: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Záložní formátování po hodnotách (velmi velká čísla)."""
+    texts = [
+        (f"{v:.{precision}f}".replace(".", decimal) if np.isfinite(v) else "").encode("utf-8")
+        for v in x.tolist()
+    ]
+    width = max((len(t) for t in texts), default=0) or 1
+    chars = np.zeros((len(texts), width), dtype=np.uint8)
+    mask = np.zeros((len(texts), width), dtype=bool)
+    for i, t in enumerate(texts):
+        chars[i, :len(t)] = np.frombuffer(t, dtype=np.uint8)
+        mask[i, :len(t)] = True
+    return chars, mask
+
+
+def format_rows(columns: List[np.ndarray], precisions: List[int],
+                delimiter: str = DEFAULT_DELIMITER, decimal: str = DEFAULT_DECIMAL) -> bytes:
+    """Naformátuje blok řádků (sloupce stejné délky) na bajty CSV najednou."""
+    n = len(columns[0]) if columns else 0
+    if n == 0:
+        return b""
+    dec = decimal.encode("utf-8")
+    delim = np.frombuffer(delimiter.encode("utf-8"), dtype=np.uint8)
+    line_end = np.frombuffer(LINE_END, dtype=np.uint8)
+
+    blocks_chars = []
+    blocks_mask = []
+    for i, (col, precision) in enumerate(zip(columns, precisions)):
+        col = np.asarray(col, dtype=np.float64)
+        finite = col[np.isfinite(col)]
+        if finite.size and np.abs(finite).max() >= _MAX_FAST_ABS:
+            chars, mask = _format_slow(col, precision, decimal)
+        else:
+            chars, mask = _format_fixed(col, precision, dec)
+        blocks_chars.append(chars)
+        blocks_mask.append(mask)
+
+        sep = line_end if i == len(columns) - 1 else delim
+        blocks_chars.append(np.broadcast_to(sep, (n, len(sep))))
+        blocks_mask.append(np.ones((n, len(sep)), dtype=bool))
+
+    chars = np.hstack(blocks_chars)
+    mask = np.hstack(blocks_mask)
+    # Řádkově seřazené platné znaky = výsledný text
+    return chars[mask].tobytes()
+
+
+def export_columns(filename: str, columns: Dict[str, np.ndarray], fieldnames: List[str],
+                   delimiter: str = DEFAULT_DELIMITER, decimal: str = DEFAULT_DECIMAL,
+                   precision: Optional[Dict[str, int]] = None,
+                   progress: Optional[Callable[[float], None]] = None,
+                   cancel: Optional[threading.Event] = None) -> bool:
+    """
+    Zapíše sloupce do CSV po velkých blocích. Chybějící hodnota (NaN) = prázdná buňka.
+    Při zrušení (cancel) se rozepsaný soubor smaže a vyhodí se ExportCancelled.
+    """
+    if len(delimiter.encode("utf-8")) != 1 or len(decimal.encode("utf-8")) != 1:
+        raise ValueError("oddělovač i desetinný znak musí být jeden znak")
+    if delimiter == decimal:
+        raise ValueError("oddělovač a desetinný znak se nesmí shodovat")
+
+    prec = dict(COLUMN_PRECISION)
+    prec.update(precision or {})
+    precisions = [prec.get(key, DEFAULT_PRECISION) for key in fieldnames]
+    n_rows = len(columns[fieldnames[0]]) if fieldnames else 0
+
+    tmp_name = filename + ".part"
+    try:
+        with open(tmp_name, "wb", buffering=4 * 1024 * 1024) as f:
+            f.write(delimiter.join(fieldnames).encode("utf-8") + LINE_END)
+            for start in range(0, n_rows, CHUNK_ROWS):
+                if cancel is not None and cancel.is_set():
+                    raise ExportCancelled()
+                end = min(start + CHUNK_ROWS, n_rows)
+                block = [columns[key][start:end] for key in fieldnames]
+                f.write(format_rows(block, precisions, delimiter, decimal))
+                if progress:
+                    progress(end / n_rows)
+        os.replace(tmp_name, filename)
+    except BaseException:
+        try:
+            os.remove(tmp_name)
+        except OSError:
+            pass
+        raise
+    return True
@@ -0,0 +1,69 @@
+import json
+import os
+import time
+from typing import Optional
+
+from serial.tools import list_ports
+
+# Soubor s posledním úspěšně připojeným zařízením (mimo repozitář, v domovské složce)
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".temp_lab", "last_device.json")
+
+
+def load_last_device() -> Optional[dict]:
+    """
+    Vrátí uložený záznam o posledním zařízení:
+      { "port": "COM5", "serial_number": "...", "hello": {...}, "saved_at": ... }
+    nebo None, pokud žádný není (nebo je poškozený).
+    """
+    try:
+        with open(CACHE_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if isinstance(data, dict) and data.get("port"):
+        return data
+    return None
+
+
+def save_last_device(port: str, hello: Optional[dict]):
+    """Uloží port a identitu zařízení (USB sériové číslo + hello zpráva)."""
+    entry = {
+        "port": port,
+        "serial_number": _usb_serial_number(port),
+        "hello": hello or {},
+        "saved_at": time.time(),
+    }
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        with open(CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=2)
+    except OSError as e:
+        print(f"Nelze uložit poslední zařízení: {e}")
+
+
+def find_last_port() -> Optional[str]:
+    """
+    Najde port posledního zařízení mezi aktuálně dostupnými.
+    Pokud systém přečísloval porty (jiný COM), dohledá ho podle USB sériového čísla.
+    """
+    entry = load_last_device()
+    if not entry:
+        return None
+
+    ports = list(list_ports.comports())
+    serial_number = entry.get("serial_number")
+    if serial_number:
+        for p in ports:
+            if p.serial_number == serial_number:
+                return p.device
+
+    if any(p.device == entry["port"] for p in ports):
+        return entry["port"]
+    return None
+
+
+def _usb_serial_number(port: str) -> Optional[str]:
+    for p in list_ports.comports():
+        if p.device == port:
+            return p.serial_number
+    return None
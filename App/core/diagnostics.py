@@ -0,0 +1,183 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Callable, List, Optional
+
+DIAG_DIR = os.path.join(os.path.expanduser("~"), ".temp_lab", "diagnostics")
+STALL_LOG_NAME = "stalls.log"
+
+
+def _timestamp() -> str:
+    return time.strftime("%Y%m%d_%H%M%S")
+
+
+class Profiler:
+    """
+    Zapínatelný cProfile pro vlákno GUI (cProfile měří jen vlákno, které ho zapnulo).
+    dump() uloží dosavadní profil (.prof pro snakeviz/pstats + textový výpis) a začne nový.
+    """
+
+    TOP_FUNCTIONS = 40
+
+    def __init__(self, out_dir: str = DIAG_DIR):
+        self.out_dir = out_dir
+        self._profile: Optional[cProfile.Profile] = None
+        self._started = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._profile is not None
+
+    def start(self):
+        if self._profile is not None:
+            return
+        self._profile = cProfile.Profile()
+        self._started = time.monotonic()
+        self._profile.enable()
+
+    def stop(self, label: str = "profile") -> Optional[str]:
+        """Vypne profilování a uloží výsledek. Vrací cestu k .prof souboru."""
+        if self._profile is None:
+            return None
+        profile, self._profile = self._profile, None
+        profile.disable()
+        return self._save(profile, label)
+
+    def dump(self, label: str = "profile") -> Optional[str]:
+        """Uloží profil od posledního dump/start a pokračuje v měření."""
+        if self._profile is None:
+            return None
+        path = self.stop(label)
+        self.start()
+        return path
+
+    def _save(self, profile: cProfile.Profile, label: str) -> Optional[str]:
+        duration = time.monotonic() - self._started
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            safe_label = re.sub(r"\W+", "_", label).strip("_") or "profile"
+            base = os.path.join(self.out_dir, f"{_timestamp()}_{safe_label}")
+            profile.dump_stats(base + ".prof")
+
+            text = io.StringIO()
+            stats = pstats.Stats(profile, stream=text)
+            stats.sort_stats("cumulative").print_stats(self.TOP_FUNCTIONS)
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                f.write(f"# {label}, {duration:.1f} s\n")
+                f.write(text.getvalue())
+        except (OSError, TypeError) as e:
+            # TypeError: prázdný profil (nic se nezavolalo)
+            print(f"Profil se nepodařilo uložit: {e}")
+            return None
+        print(f"Profil uložen: {base}.prof")
+        return base + ".prof"
+
+
+class StallEvent:
+    """Jedno zaseknutí smyčky událostí GUI."""
+
+    def __init__(self, started: float, duration_ms: float, stack: List[str], samples: int):
+        self.started = started
+        self.duration_ms = duration_ms
+        self.stack = stack
+        self.samples = samples
+
+    def format(self) -> str:
+        when = time.strftime("%H:%M:%S", time.localtime(self.started))
+        header = f"[{when}] GUI stál {self.duration_ms:.0f} ms (vzorků zásobníku: {self.samples})"
+        return header + "\n" + "".join(self.stack)
+
+
+class StallDetector:
+    """
+    Hlídač smyčky událostí GUI.
+
+    GUI volá beat() z časovače (QTimer, HEARTBEAT_MS). Samostatné vlákno kontroluje,
+    kdy byl poslední tep - pokud déle než threshold_ms, GUI vlákno stojí. Během zaseknutí
+    se opakovaně vzorkuje jeho zásobník (sys._current_frames) a po obnovení se zaloguje
+    nejčastější zásobník = kde GUI trávilo čas (add_point, update_values, export...).
+    """
+
+    HEARTBEAT_MS = 50
+    POLL_S = 0.02
+    STACK_LIMIT = 25
+
+    def __init__(self, threshold_ms: float = 200.0, out_dir: str = DIAG_DIR,
+                 on_stall: Optional[Callable[[StallEvent], None]] = None):
+        self.threshold_ms = threshold_ms
+        self.out_dir = out_dir
+        self.on_stall = on_stall
+        self.events: List[StallEvent] = []
+        self._gui_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def beat(self):
+        """Volat z GUI vlákna (časovač)."""
+        self._last_beat = time.monotonic()
+
+    def start(self):
+        """Spouští se z GUI vlákna - jeho zásobník se pak vzorkuje."""
+        if self.is_running:
+            return
+        self._gui_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="stall-detector", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _watch(self):
+        threshold_s = self.threshold_ms / 1000.0
+        stacks: Counter = Counter()
+        stall_beat: Optional[float] = None
+
+        while not self._stop.wait(self.POLL_S):
+            last = self._last_beat
+            now = time.monotonic()
+            # Tep přichází po HEARTBEAT_MS - do zpoždění počítáme jen to, co je navíc
+            late = now - last - self.HEARTBEAT_MS / 1000.0
+
+            if late > threshold_s:
+                stall_beat = last
+                frame = sys._current_frames().get(self._gui_thread_id)
+                if frame is not None:
+                    stacks[tuple(traceback.format_stack(frame, limit=self.STACK_LIMIT))] += 1
+            elif stall_beat is not None and last != stall_beat:
+                # GUI se rozběhlo - délka zaseknutí = mezera mezi tepy
+                duration_ms = (last - stall_beat) * 1000.0 - self.HEARTBEAT_MS
+                stack = stacks.most_common(1)[0][0] if stacks else ()
+                started = time.time() - (now - stall_beat)
+                self._report(StallEvent(started, duration_ms, list(stack), sum(stacks.values())))
+                stacks.clear()
+                stall_beat = None
+
+    def _report(self, event: StallEvent):
+        self.events.append(event)
+        text = event.format()
+        print(text)
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            with open(os.path.join(self.out_dir, STALL_LOG_NAME), "a", encoding="utf-8") as f:
+                f.write(text + "\n")
+        except OSError as e:
+            print(f"Nelze zapsat log zaseknutí: {e}")
+        if self.on_stall:
+            self.on_stall(event)
@@ -0,0 +1,307 @@
+import fnmatch
+import math
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.sensors import FILTERED_SUFFIX
+
+
+class StreamFilter(ABC):
+    """
+    Základ proudového filtru.
+    process() dostává blok vzorků (časy + hodnoty) a stav si drží mezi bloky,
+    takže výsledek nezávisí na tom, jak jsou data rozdělena do bloků.
+    process_one() je totéž pro jeden vzorek bez numpy polí (živé měření),
+    sdílí stav s process(), oba způsoby lze střídat.
+    """
+
+    @abstractmethod
+    def process(self, t: np.ndarray, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        ...
+
+    def process_one(self, t: float, x: float) -> Optional[float]:
+        """Jeden vzorek - vrací výstup, nebo None (např. decimace vzorek zahodila)."""
+        _, y = self.process(np.array([t]), np.array([x], dtype=np.float64))
+        return float(y[-1]) if len(y) else None
+
+    @abstractmethod
+    def reset(self):
+        ...
+
+
+class _FirFilter(StreamFilter):
+    """Kauzální FIR filtr s historií posledních len(taps)-1 vzorků."""
+
+    def __init__(self, taps: np.ndarray):
+        # np.convolve obrací jádro, taps[0] tedy násobí nejnovější vzorek
+        self._taps = np.asarray(taps, dtype=np.float64)
+        # Pro skalární cestu: váhy k historii od nejstaršího vzorku
+        self._hist_taps = self._taps[:0:-1].tolist()
+        self._tap0 = float(self._taps[0])
+        self._history = None   # ndarray (bloky) nebo list (po jednom vzorku)
+
+    def reset(self):
+        self._history = None
+
+    def _extend(self, x: np.ndarray) -> np.ndarray:
+        n_hist = len(self._taps) - 1
+        if self._history is None:
+            # Náběh: historie = první vzorek (žádný skok z nuly)
+            self._history = np.full(n_hist, x[0])
+        ext = np.concatenate((self._history, x))
+        self._history = ext[len(ext) - n_hist:] if n_hist else ext[:0]
+        return ext
+
+    def process(self, t, x):
+        if len(x) == 0:
+            return t, x
+        ext = self._extend(x)
+        return t, np.convolve(ext, self._taps, mode="valid")
+
+    def _push_one(self, x: float) -> float:
+        history = self._history
+        if history is None:
+            history = [x] * len(self._hist_taps)
+        elif not isinstance(history, list):
+            history = history.tolist()
+        y = self._tap0 * x
+        for w, h in zip(self._hist_taps, history):
+            y += w * h
+        if history:
+            history.append(x)
+            del history[0]
+        self._history = history
+        return y
+
+    def process_one(self, t, x):
+        return self._push_one(x)
+
+
+class MovingAverageFilter(_FirFilter):
+    def __init__(self, window: int = 5):
+        super().__init__(np.full(window, 1.0 / window))
+
+
+class SavitzkyGolayFilter(_FirFilter):
+    """
+    Kauzální Savitzky–Golay: polynom stupně `polyorder` proložený posledními
+    `window` vzorky, vyhodnocený v nejnovějším bodě (bez zpoždění výstupu).
+    """
+
+    def __init__(self, window: int = 9, polyorder: int = 2):
+        if polyorder >= window:
+            raise ValueError("polyorder musí být menší než window")
+        # Vandermonde pro pozice -(window-1)..0, řádek pinv pro hodnotu v 0
+        positions = np.arange(-(window - 1), 1, dtype=np.float64)
+        vander = np.vander(positions, polyorder + 1, increasing=True)
+        coeffs = np.linalg.pinv(vander)[0]
+        # coeffs[i] patří k pozici -(window-1)+i, pro np.convolve obrátíme
+        super().__init__(coeffs[::-1])
+
+
+class DecimatingFirFilter(_FirFilter):
+    """Dolní propust (okno Hamming, sinc) a ponechání každého `factor`-tého vzorku."""
+
+    def __init__(self, factor: int = 4, num_taps: Optional[int] = None):
+        if factor < 1:
+            raise ValueError("factor musí být >= 1")
+        num_taps = num_taps or 4 * factor + 1
+        n = np.arange(num_taps) - (num_taps - 1) / 2.0
+        taps = np.sinc(n / factor) * np.hamming(num_taps)
+        super().__init__(taps / taps.sum())
+        self._factor = factor
+        self._phase = 0
+
+    def reset(self):
+        super().reset()
+        self._phase = 0
+
+    def process(self, t, x):
+        t, y = super().process(t, x)
+        # Fáze decimace pokračuje přes hranice bloků
+        start = (-self._phase) % self._factor
+        self._phase = (self._phase + len(x)) % self._factor
+        return t[start::self._factor], y[start::self._factor]
+
+    def process_one(self, t, x):
+        y = self._push_one(x)
+        emit = self._phase == 0
+        self._phase = (self._phase + 1) % self._factor
+        return y if emit else None
+
+
+class MedianFilter(StreamFilter):
+    def __init__(self, window: int = 5):
+        self._window = window
+        self._history: Optional[np.ndarray] = None
+
+    def reset(self):
+        self._history = None
+
+    def process(self, t, x):
+        if len(x) == 0:
+            return t, x
+        if self._history is None:
+            self._history = np.full(self._window - 1, x[0])
+        ext = np.concatenate((self._history, x))
+        self._history = ext[len(ext) - (self._window - 1):]
+        windows = np.lib.stride_tricks.sliding_window_view(ext, self._window)
+        return t, np.median(windows, axis=1)
+
+    def process_one(self, t, x):
+        history = self._history
+        if history is None:
+            history = [x] * (self._window - 1)
+        elif not isinstance(history, list):
+            history = history.tolist()
+        ordered = sorted(history + [x])
+        mid = len(ordered) // 2
+        y = ordered[mid] if len(ordered) % 2 else 0.5 * (ordered[mid - 1] + ordered[mid])
+        if history:
+            history.append(x)
+            del history[0]
+        self._history = history
+        return y
+
+
+class ExponentialFilter(StreamFilter):
+    """
+    Exponenciální vyhlazování y[k] = a*x[k] + (1-a)*y[k-1].
+    Rekurze je pro blok vyřešena uzavřeným vzorcem (mocniny 1-a + cumsum),
+    blok se kvůli numerické stabilitě zpracovává po kratších úsecích.
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha musí být v (0, 1]")
+        self._alpha = alpha
+        self._last: Optional[float] = None
+        # Délka úseku tak, aby (1-a)^-k nepřesáhlo ~1e12
+        self._segment = max(1, int(12 / -np.log10(1.0 - alpha))) if alpha < 1.0 else 0
+
+    def reset(self):
+        self._last = None
+
+    def process(self, t, x):
+        if len(x) == 0:
+            return t, x
+        if self._last is None:
+            self._last = float(x[0])
+
+        a = self._alpha
+        if a == 1.0:
+            self._last = float(x[-1])
+            return t, np.array(x, dtype=np.float64)
+
+        out = np.empty(len(x))
+        for start in range(0, len(x), self._segment):
+            seg = x[start:start + self._segment]
+            k = np.arange(len(seg))
+            decay = (1.0 - a) ** (k + 1)              # váha počátečního stavu
+            weights = (1.0 - a) ** -k.astype(float)   # x[j] / (1-a)^j
+            y = decay * self._last + a * (1.0 - a) ** k * np.cumsum(seg * weights)
+            out[start:start + len(seg)] = y
+            self._last = float(y[-1])
+        return t, out
+
+    def process_one(self, t, x):
+        last = x if self._last is None else self._last
+        self._last = self._alpha * x + (1.0 - self._alpha) * last
+        return self._last
+
+
+# Názvy filtrů pro konfiguraci měření (FILTERS = {"V_ESP_*": [("median", {...}), ...]})
+FILTER_TYPES = {
+    "moving_average": MovingAverageFilter,
+    "median": MedianFilter,
+    "ema": ExponentialFilter,
+    "savgol": SavitzkyGolayFilter,
+    "decimate": DecimatingFirFilter,
+}
+
+FilterSpec = Tuple[str, dict]
+
+
+class FilterChain(StreamFilter):
+    def __init__(self, filters: Sequence[StreamFilter]):
+        self._filters = list(filters)
+
+    @classmethod
+    def from_spec(cls, spec: Iterable[FilterSpec]) -> "FilterChain":
+        return cls([FILTER_TYPES[name](**params) for name, params in spec])
+
+    def process(self, t, x):
+        for f in self._filters:
+            t, x = f.process(t, x)
+        return t, x
+
+    def process_one(self, t, x):
+        for f in self._filters:
+            x = f.process_one(t, x)
+            if x is None:
+                return None
+        return x
+
+    def reset(self):
+        for f in self._filters:
+            f.reset()
+
+
+class ChannelFilterBank:
+    """
+    Řetězce filtrů pro jednotlivé kanály podle konfigurace { vzor klíče: spec }.
+    Vzor může obsahovat zástupné znaky (fnmatch), např. "V_ESP_*".
+    Výsledky se ukládají pod klíčem s příponou FILTERED_SUFFIX.
+    Nekonečné a NaN vstupy (výpadek senzoru) se přeskakují, stav filtrů zůstane
+    z posledního platného vzorku - jinak by NaN v historii otrávil celý řetězec.
+    """
+
+    def __init__(self, config: Dict[str, List[FilterSpec]]):
+        self._config = dict(config)
+        self._chains: Dict[str, Optional[FilterChain]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._config)
+
+    def _chain_for(self, key: str) -> Optional[FilterChain]:
+        if key not in self._chains:
+            spec = next((s for pattern, s in self._config.items() if fnmatch.fnmatchcase(key, pattern)), None)
+            self._chains[key] = FilterChain.from_spec(spec) if spec else None
+        return self._chains[key]
+
+    def filtered_keys(self, keys: Iterable[str]) -> List[str]:
+        return [key + FILTERED_SUFFIX for key in keys if self._chain_for(key) is not None]
+
+    def process_block(self, t: np.ndarray, columns: Dict[str, np.ndarray]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """Vektorově zpracuje blok: { klíč: hodnoty } -> { klíč_filt: (časy, hodnoty) }."""
+        out = {}
+        for key, x in columns.items():
+            chain = self._chain_for(key)
+            if chain is None:
+                continue
+            x = np.asarray(x, dtype=np.float64)
+            valid = np.isfinite(x)
+            if not valid.all():
+                out[key + FILTERED_SUFFIX] = chain.process(t[valid], x[valid])
+            else:
+                out[key + FILTERED_SUFFIX] = chain.process(t, x)
+        return out
+
+    def process_sample(self, t_s: float, values: Dict[str, float]) -> Dict[str, float]:
+        """Jeden vzorek (živé měření) - vrací jen kanály, pro které filtr vydal výstup."""
+        out = {}
+        for key, val in values.items():
+            chain = self._chain_for(key)
+            if chain is None or not math.isfinite(val):
+                continue
+            y = chain.process_one(t_s, float(val))
+            if y is not None:
+                out[key + FILTERED_SUFFIX] = y
+        return out
+
+    def reset(self):
+        for chain in self._chains.values():
+            if chain is not None:
+                chain.reset()
@@ -0,0 +1,304 @@
+"""
+Hromadný import archivovaných měření do session (core/session.py).
+
+Podporované soubory:
+  - CSV export aplikace (první sloupec t_s, oddělovač podle hlavičky, desetinná čárka i tečka)
+  - legacy textové logy starých firmware (T_BME=24.1; T_DS0=23.5; ...)
+  - JSON logy ze sériové linky (jedna zpráva na řádek)
+
+Soubory se parsují paralelně v procesech, velké soubory po blocích.
+Použití (ze složky App):
+  python -m core.importer CESTA_K_ARCHIVU [--out SLOŽKA] [--workers N]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.parser import (
+    FORMAT_JSON, FORMAT_LEGACY, detect_line_format, extract_data_values,
+    parse_json_message, parse_temp_lines,
+)
+from core.session import (
+    SESSIONS_DIR, Session, catalog_entry, load_catalog, rows_to_columns, save_catalog,
+)
+
+FORMAT_CSV = "csv"
+IMPORT_EXTENSIONS = (".csv", ".txt", ".log")
+# Oddělovače, které může mít CSV export (výchozí je středník)
+CSV_DELIMITERS = (";", ",", "\t")
+
+# Velikost bloku pro paralelní parsování jednoho souboru
+CHUNK_BYTES = 8 * 1024 * 1024
+# Legacy logy neobsahují čas - předpokládaná frekvence starých firmware
+LEGACY_RATE_HZ = 1.0
+
+# Úloha pro pracovní proces: (cesta, formát, začátek, konec, hlavička CSV, oddělovač CSV)
+_Task = Tuple[str, str, int, int, Optional[List[str]], Optional[str]]
+
+
+def _csv_delimiter(first_line: str) -> Optional[str]:
+    """Oddělovač CSV exportu podle hlavičky (první sloupec je vždy t_s), None = není CSV export."""
+    if "=" in first_line:
+        return None
+    for delimiter in CSV_DELIMITERS:
+        if delimiter in first_line and first_line.split(delimiter)[0].strip() == "t_s":
+            return delimiter
+    return None
+
+
+def detect_file_format(path: str) -> Tuple[Optional[str], Optional[List[str]], Optional[str]]:
+    """Vrátí (formát, hlavička CSV, oddělovač CSV) podle prvních řádků souboru."""
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+        head = [f.readline() for _ in range(20)]
+
+    first = head[0].strip()
+    delimiter = _csv_delimiter(first)
+    if delimiter is not None:
+        return FORMAT_CSV, [name.strip() for name in first.split(delimiter)], delimiter
+
+    for line in head:
+        fmt = detect_line_format(line)
+        if fmt is not None:
+            return fmt, None, None
+    return None, None, None
+
+
+def _chunk_offsets(path: str, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """Rozdělí soubor na bloky zarovnané na konce řádků."""
+    size = os.path.getsize(path)
+    offsets = []
+    with open(path, "rb") as f:
+        start = 0
+        while start < size:
+            end = start + chunk_bytes
+            if end >= size:
+                end = size
+            else:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            offsets.append((start, end))
+            start = end
+    return offsets
+
+
+def _to_float(arr: np.ndarray) -> np.ndarray:
+    """Převod pole textů na čísla; nečíselné buňky = NaN."""
+    arr[arr == ""] = "nan"
+    try:
+        return arr.astype(np.float64)
+    except ValueError:
+        def conv(text):
+            try:
+                return float(text)
+            except ValueError:
+                return np.nan
+        return np.vectorize(conv, otypes=[np.float64])(arr)
+
+
+def parse_csv_text(text: str, header: List[str], delimiter: str = ";") -> Dict[str, np.ndarray]:
+    """Blok CSV exportu (bez hlavičky) -> sloupce."""
+    n_cols = len(header)
+    if delimiter != ",":
+        # Čárka tu může být jen desetinná (export podle českého systému)
+        text = text.replace(",", ".")
+    fields = [line.split(delimiter) for line in text.splitlines() if line]
+    # Poškozené řádky (jiný počet sloupců) přeskočíme
+    fields = [row for row in fields if len(row) == n_cols]
+    if not fields:
+        return {key: np.empty(0) for key in header}
+    values = _to_float(np.array(fields))
+    return {key: values[:, i] for i, key in enumerate(header)}
+
+
+def parse_json_text(text: str) -> Dict[str, np.ndarray]:
+    """Blok JSON logu -> sloupce (t_ms zůstává, převod na t_s až po spojení bloků)."""
+    rows = []
+    for line in text.splitlines():
+        msg = parse_json_message(line) if line.startswith("{") else None
+        if msg is None:
+            continue
+        values = extract_data_values(msg)
+        if not values:
+            continue
+        t_ms = msg.get("t_ms")
+        if isinstance(t_ms, (int, float)):
+            values["t_ms"] = float(t_ms)
+        rows.append(values)
+    return rows_to_columns(rows)
+
+
+def _parse_chunk(task: _Task) -> Dict[str, np.ndarray]:
+    """Vstupní bod pracovního procesu: přečte a naparsuje jeden blok souboru."""
+    path, fmt, start, end, header, delimiter = task
+    with open(path, "rb") as f:
+        f.seek(start)
+        raw = f.read(end - start)
+    text = raw.decode("utf-8-sig" if start == 0 else "utf-8", errors="replace")
+
+    if fmt == FORMAT_CSV:
+        if start == 0:
+            # První blok začíná hlavičkou
+            text = text.split("\n", 1)[1] if "\n" in text else ""
+        return parse_csv_text(text, header, delimiter)
+    if fmt == FORMAT_LEGACY:
+        return parse_temp_lines(text)
+    return parse_json_text(text)
+
+
+def _merge_chunks(chunks: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Spojí sloupce bloků v pořadí souboru (chybějící sloupec v bloku = NaN)."""
+    keys: Dict[str, None] = {}
+    for chunk in chunks:
+        for key in chunk:
+            keys.setdefault(key, None)
+
+    lengths = [len(next(iter(c.values()))) if c else 0 for c in chunks]
+    columns = {}
+    for key in keys:
+        parts = [c[key] if key in c else np.full(n, np.nan) for c, n in zip(chunks, lengths)]
+        columns[key] = np.concatenate(parts) if parts else np.empty(0)
+    return columns
+
+
+def _build_session(path: str, fmt: str, columns: Dict[str, np.ndarray]) -> Session:
+    n = len(next(iter(columns.values()))) if columns else 0
+    metadata = {"source": os.path.abspath(path), "format": fmt}
+
+    if fmt == FORMAT_JSON and "t_ms" in columns:
+        t_ms = columns.pop("t_ms")
+        valid = t_ms[~np.isnan(t_ms)]
+        columns["t_s"] = (t_ms - (valid[0] if len(valid) else 0.0)) / 1000.0
+    elif "t_s" not in columns:
+        # Bez časových značek - čas odhadnut z pořadí vzorku
+        columns["t_s"] = np.arange(n) / LEGACY_RATE_HZ
+        metadata["t_s_estimated"] = True
+        metadata["rate_hz"] = LEGACY_RATE_HZ
+    return Session(columns, metadata)
+
+
+def _session_file_name(root: str, path: str) -> str:
+    rel = os.path.relpath(path, root)
+    stem = os.path.splitext(rel)[0]
+    return stem.replace(os.sep, "__").replace("/", "__") + ".npz"
+
+
+def scan_directory(root: str) -> List[str]:
+    found = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            if name.lower().endswith(IMPORT_EXTENSIONS):
+                found.append(os.path.join(dirpath, name))
+    return sorted(found)
+
+
+def import_directory(root: str, out_dir: str = SESSIONS_DIR, workers: Optional[int] = None,
+                     chunk_bytes: int = CHUNK_BYTES, force: bool = False) -> List[dict]:
+    """
+    Naimportuje všechny podporované soubory ze složky `root` do `out_dir`.
+    Nezměněné soubory (stejná velikost a čas změny) se přeskočí, pokud není force.
+    Vrací záznamy katalogu nově naimportovaných session.
+    """
+    catalog = load_catalog(out_dir)
+    known = {entry.get("source"): entry for entry in catalog}
+
+    # 1. Rozpoznání formátů a rozdělení na bloky (rychlé, v hlavním procesu)
+    plans: Dict[str, Tuple[str, int]] = {}
+    tasks: List[Tuple[str, int, _Task]] = []
+    for path in scan_directory(root):
+        source = os.path.abspath(path)
+        stat = os.stat(path)
+        old = known.get(source)
+        if (not force and old and old.get("source_size") == stat.st_size
+                and old.get("source_mtime") == stat.st_mtime
+                and os.path.exists(os.path.join(out_dir, old.get("session_file", "")))):
+            continue
+
+        try:
+            fmt, header, delimiter = detect_file_format(path)
+        except OSError as e:
+            print(f"Import: nelze číst {path}: {e}")
+            continue
+        if fmt is None:
+            print(f"Import: neznámý formát, přeskakuji {path}")
+            continue
+
+        offsets = _chunk_offsets(path, chunk_bytes)
+        plans[path] = (fmt, len(offsets))
+        for i, (start, end) in enumerate(offsets):
+            tasks.append((path, i, (path, fmt, start, end, header, delimiter)))
+
+    if not tasks:
+        print("Import: nic nového k importu")
+        return []
+
+    # 2. Paralelní parsování bloků
+    t_start = time.perf_counter()
+    results: Dict[str, List[Optional[Dict[str, np.ndarray]]]] = {
+        path: [None] * n_chunks for path, (_, n_chunks) in plans.items()
+    }
+    imported: List[dict] = []
+    total_bytes = 0
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(_parse_chunk, task): (path, i) for path, i, task in tasks}
+        for future in as_completed(futures):
+            path, i = futures[future]
+            if path not in results:
+                continue  # soubor už selhal v jiném bloku
+            try:
+                results[path][i] = future.result()
+            except Exception as e:
+                print(f"Import: chyba při čtení {path}: {e}")
+                del results[path]
+                continue
+
+            # 3. Jakmile má soubor všechny bloky, spojí se a uloží
+            if all(chunk is not None for chunk in results[path]):
+                fmt, _ = plans[path]
+                session = _build_session(path, fmt, _merge_chunks(results.pop(path)))
+                session_file = _session_file_name(root, path)
+                session.save(os.path.join(out_dir, session_file))
+
+                stat = os.stat(path)
+                total_bytes += stat.st_size
+                entry = catalog_entry(
+                    session, session_file,
+                    source=os.path.abspath(path), source_size=stat.st_size,
+                    source_mtime=stat.st_mtime, format=fmt,
+                )
+                imported.append(entry)
+                print(f"Import: {os.path.relpath(path, root)} -> {len(session)} řádků ({fmt})")
+
+    # 4. Katalog: nové záznamy nahradí staré se stejným zdrojem
+    replaced = {entry["source"] for entry in imported}
+    catalog = [entry for entry in catalog if entry.get("source") not in replaced] + imported
+    save_catalog(catalog, out_dir)
+
+    elapsed = time.perf_counter() - t_start
+    print(f"Import: {len(imported)} souborů, {total_bytes / 1e6:.1f} MB za {elapsed:.1f} s")
+    return imported
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Hromadný import archivovaných měření do session.")
+    parser.add_argument("root", help="složka s CSV exporty a logy")
+    parser.add_argument("--out", default=SESSIONS_DIR, help=f"cílová složka (výchozí {SESSIONS_DIR})")
+    parser.add_argument("--workers", type=int, default=None, help="počet procesů (výchozí = počet jader)")
+    parser.add_argument("--force", action="store_true", help="importovat i nezměněné soubory")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.root):
+        print(f"Složka neexistuje: {args.root}")
+        return 1
+    import_directory(args.root, args.out, workers=args.workers, force=args.force)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import json
+import select
+import socket
+import threading
+from collections import deque
+from typing import List, Optional, Tuple
+
+from core.metrics import REGISTRY
+
+_DROPPED = REGISTRY.counter("temp_lab_dropped_samples_total", "Zahozené vzorky", ("stage",)).labels("live_client")
+_QUEUE_DEPTH = REGISTRY.gauge("temp_lab_queue_depth", "Počet položek ve frontě", ("queue",)).labels("live_clients")
+
+
+class _Client:
+    """
+    Jeden připojený odběratel.
+      - vlastní omezená fronta: při zaplnění se zahodí nejstarší zpráva
+      - volitelné podvzorkování (každý N-tý vzorek / max. frekvence)
+    Pomalý klient tak nikdy nezdrží měření ani ostatní klienty.
+    """
+
+    def __init__(self, sock: socket.socket, addr, queue_size: int):
+        self.sock = sock
+        self.addr = addr
+        self.queue: deque = deque(maxlen=queue_size)
+        self.wakeup = threading.Event()
+        self.alive = True
+        self.dropped = 0
+
+        # Podvzorkování (nastavuje klient zprávou {"every": N} / {"max_rate_hz": f})
+        self.every = 1
+        self.min_interval_s = 0.0
+        self._counter = 0
+        self._last_sent_t: Optional[float] = None
+
+    def offer(self, t_s: Optional[float], payload: bytes):
+        if t_s is not None:
+            self._counter += 1
+            if self._counter % self.every:
+                return
+            if self._last_sent_t is not None and t_s - self._last_sent_t < self.min_interval_s:
+                return
+            self._last_sent_t = t_s
+
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+            _DROPPED.inc()
+        self.queue.append(payload)
+        self.wakeup.set()
+
+    def apply_settings(self, line: bytes):
+        try:
+            cfg = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(cfg, dict):
+            return
+        try:
+            if "every" in cfg:
+                self.every = max(1, int(cfg["every"]))
+            if "max_rate_hz" in cfg:
+                rate = float(cfg["max_rate_hz"])
+                self.min_interval_s = 1.0 / rate if rate > 0 else 0.0
+        except (TypeError, ValueError):
+            pass
+
+
+class LiveDataServer:
+    """
+    Lokální TCP server, který rozesílá živá data měření libovolnému počtu klientů.
+
+    Protokol (JSON, jedna zpráva na řádek):
+      server -> klient: {"type":"hello",...}, {"type":"data","t_s":1.5,"T_BME":24.1,...},
+                        {"type":"status","status":"started"|"finished"}
+      klient -> server (volitelně): {"every": 5} nebo {"max_rate_hz": 1.0}
+
+    Příklad odběru:  nc 127.0.0.1 8765
+    """
+
+    DEFAULT_PORT = 8765
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, queue_size: int = 1000):
+        self._host = host
+        self._port = port
+        self._queue_size = queue_size
+        self._server_sock: Optional[socket.socket] = None
+        self._accept_thread: Optional[threading.Thread] = None
+        self._clients: List[_Client] = []
+        self._clients_lock = threading.Lock()
+        self._running = False
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Skutečná adresa (při port=0 přidělí port systém)."""
+        if self._server_sock:
+            return self._server_sock.getsockname()[:2]
+        return self._host, self._port
+
+    def client_count(self) -> int:
+        with self._clients_lock:
+            return len(self._clients)
+
+    def is_running(self) -> bool:
+        return self._running
+
+    def max_queue_depth(self) -> int:
+        """Nejplnější fronta klienta (pro metriky)."""
+        with self._clients_lock:
+            return max((len(c.queue) for c in self._clients), default=0)
+
+    def start(self):
+        if self._running:
+            return
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self._host, self._port))
+        sock.listen()
+        sock.settimeout(0.5)
+        self._server_sock = sock
+        self._running = True
+        self._accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._accept_thread.start()
+        _QUEUE_DEPTH.set_function(self.max_queue_depth)
+        print(f"Živá data: naslouchám na {self.address[0]}:{self.address[1]}")
+
+    def stop(self):
+        self._running = False
+        _QUEUE_DEPTH.set_function(None)
+        _QUEUE_DEPTH.set(0)
+        if self._accept_thread:
+            self._accept_thread.join(timeout=1.0)
+            self._accept_thread = None
+        if self._server_sock:
+            self._server_sock.close()
+            self._server_sock = None
+        with self._clients_lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.alive = False
+            client.wakeup.set()
+
+    def publish(self, t_s: float, values: dict):
+        """Rozešle vzorek všem klientům. Nikdy neblokuje (volá se z vlákna měření)."""
+        if not self._clients:
+            return
+        payload = self._encode({"type": "data", "t_s": round(t_s, 3), **values})
+        self._broadcast(t_s, payload)
+
+    def publish_status(self, status: str):
+        if not self._clients:
+            return
+        self._broadcast(None, self._encode({"type": "status", "status": status}))
+
+    @staticmethod
+    def _encode(msg: dict) -> bytes:
+        return (json.dumps(msg, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def _broadcast(self, t_s: Optional[float], payload: bytes):
+        with self._clients_lock:
+            clients = list(self._clients)
+        for client in clients:
+            client.offer(t_s, payload)
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                sock, addr = self._server_sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            sock.settimeout(None)
+            client = _Client(sock, addr, self._queue_size)
+            client.offer(None, self._encode({"type": "hello", "server": "temp-lab", "version": 1}))
+            with self._clients_lock:
+                self._clients.append(client)
+            threading.Thread(target=self._client_loop, args=(client,), daemon=True).start()
+            print(f"Živá data: připojen klient {addr[0]}:{addr[1]}")
+
+    def _client_loop(self, client: _Client):
+        buffer = b""
+        try:
+            while client.alive:
+                # Nastavení od klienta (neblokující kontrola)
+                readable, _, _ = select.select([client.sock], [], [], 0)
+                if readable:
+                    chunk = client.sock.recv(1024)
+                    if not chunk:
+                        break
+                    buffer += chunk
+                    while b"\n" in buffer:
+                        line, buffer = buffer.split(b"\n", 1)
+                        client.apply_settings(line)
+
+                if not client.wakeup.wait(timeout=0.2):
+                    continue
+                client.wakeup.clear()
+
+                # Odešleme vše, co se mezitím nahromadilo, jedním voláním
+                batch = []
+                while client.queue:
+                    batch.append(client.queue.popleft())
+                if batch:
+                    client.sock.sendall(b"".join(batch))
+        except OSError:
+            pass
+        finally:
+            client.alive = False
+            with self._clients_lock:
+                if client in self._clients:
+                    self._clients.remove(client)
+            try:
+                client.sock.close()
+            except OSError:
+                pass
+            print(f"Živá data: klient {client.addr[0]}:{client.addr[1]} odpojen "
+                  f"(zahozeno {client.dropped} zpráv)")
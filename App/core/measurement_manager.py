@@ -1,43 +1,83 @@
-from typing import Optional, Dict, Type, Set, Any
-from PySide6.QtCore import QObject, Signal
+from typing import Optional, Dict, Type, Set, Any, List, Tuple
+from PySide6.QtCore import QObject, Signal, QTimer
 
 from core.serial_manager import SerialManager
+from core.acquisition_process import AcquisitionProcess
+from core.live_server import LiveDataServer
+from core.sensors import ALL_CHANNELS
+from core.filters import ChannelFilterBank
 from measurements.base import BaseMeasurement
 from measurements.streaming_measurement import StreamingTempMeasurement
 from measurements.bme_dallas_slow import BmeDallasSlowMeasurement
 from measurements.part_one import PartOneMeasurement
+from measurements.burst_measurement import BurstMeasurement
 
 class MeasurementManager(QObject):
     data_received = Signal(float, dict)
     progress_updated = Signal(float)
     finished = Signal()
     error_occurred = Signal(str)
+    connection_lost = Signal()
+    connection_restored = Signal()
 
-    def __init__(self, serial_mgr: SerialManager):
+    # Jak často GUI čte sdílenou paměť procesu měření
+    PROCESS_POLL_MS = 50
+
+    def __init__(self, serial_mgr: SerialManager, use_process: bool = False):
         super().__init__()
         self._serial_mgr = serial_mgr
         self._current_measurement: Optional[BaseMeasurement] = None
+
+        # Volitelně: měření běží v samostatném procesu (vlastní GIL a jádro CPU)
+        self.use_process = use_process
+        self._process: Optional[AcquisitionProcess] = None
+        self._process_cls: Optional[Type[BaseMeasurement]] = None
+        self._process_duration_s: Optional[float] = None
+        self._process_running = False
+        self._process_gaps: List[Tuple[float, float]] = []
+        self._process_port: Optional[str] = None
+        self._poll_timer = QTimer(self)
+        self._poll_timer.timeout.connect(self._poll_process)
+
+        # Volitelné rozesílání živých dat externím klientům
+        self._live_server: Optional[LiveDataServer] = None
         
         self._types: Dict[str, Type[BaseMeasurement]] = {
             PartOneMeasurement.DISPLAY_NAME: PartOneMeasurement,
             "Krátké měření": StreamingTempMeasurement,
             "Pomalé měření": BmeDallasSlowMeasurement,
+            BurstMeasurement.DISPLAY_NAME: BurstMeasurement,
         }
 
+        self.finished.connect(self._on_finished_publish)
+
+        self._serial_mgr.set_connection_callbacks(
+            on_lost=self._on_connection_lost,
+            on_restored=self._on_connection_restored
+        )
+
     def get_available_types(self):
         return list(self._types.keys())
 
-    def start_measurement(self, type_name: str, **kwargs):
+    def start_measurement(self, type_name: str, allowed_sensors: Optional[Set[str]] = None, **kwargs) -> bool:
         """
         Spustí vybrané měření. 
         Argumenty v **kwargs jsou předány konstruktoru třídy měření.
+        allowed_sensors omezí měřené kanály (ostatní se nedekódují ani neukládají).
+        Vrací False, pokud se měření nepodařilo spustit (chyba jde i do error_occurred,
+        signál finished v tom případě nepřijde).
         """
         cls = self._types.get(type_name)
         if not cls:
             self.error_occurred.emit(f"Neznámý typ měření: {type_name}")
-            return
+            return False
 
         self.stop_measurement()
+        self._shutdown_process()
+        self._current_measurement = None
+
+        if self.use_process:
+            return self._start_in_process(cls, allowed_sensors, kwargs)
 
         # Zde předáme kwargs (např. pwm_channel, pwm_value) do konstruktoru
         # Pokud měření tyto argumenty nečeká, je nutné zajistit, aby kwargs byly prázdné,
@@ -45,39 +85,208 @@ class MeasurementManager(QObject):
         # V našem případě to řídí MainWindow.
         try:
             self._current_measurement = cls(self._serial_mgr, **kwargs)
+            self._current_measurement.set_channel_filter(allowed_sensors)
             
             self._current_measurement.set_callbacks(
                 on_data=self._on_data_callback,
                 on_progress=self.progress_updated.emit,
-                on_finished=self.finished.emit
+                on_finished=self.finished.emit,
+                on_error=self.error_occurred.emit
             )
 
             self._serial_mgr.set_line_callback(self._current_measurement.handle_line)
+            self._publish_status("started")
             self._current_measurement.start()
+            return True
             
-        except TypeError as e:
-            # Ošetření chyby, pokud pošleme argumenty třídě, která je nečeká
+        except (TypeError, ValueError) as e:
+            # Ošetření chyby, pokud pošleme argumenty třídě, která je nečeká (nebo jsou neplatné)
             self.error_occurred.emit(f"Chyba při inicializaci měření: {e}")
             print(f"Init Error: {e}")
+            return False
 
     def stop_measurement(self):
+        if self._process and self._process_running:
+            self._process.stop()
         if self._current_measurement:
             self._current_measurement.stop()
 
-    def export_data(self, filename: str, allowed_sensors: Optional[Set[str]] = None) -> bool:
+    def shutdown(self):
+        """Ukončí měření i případný proces měření (při zavírání aplikace)."""
+        self.stop_measurement()
+        self._shutdown_process()
+        self.stop_live_server()
+
+    def start_live_server(self, port: int = LiveDataServer.DEFAULT_PORT, host: str = "127.0.0.1") -> bool:
+        if self._live_server:
+            return True
+        server = LiveDataServer(host, port)
+        try:
+            server.start()
+        except OSError as e:
+            self.error_occurred.emit(f"Server živých dat nelze spustit: {e}")
+            return False
+        self._live_server = server
+        return True
+
+    def stop_live_server(self):
+        if self._live_server:
+            self._live_server.stop()
+            self._live_server = None
+
+    def export_data(self, filename: str, allowed_sensors: Optional[Set[str]] = None,
+                    progress=None, cancel=None, **options) -> bool:
+        """
+        Export do CSV. Volá se z pracovního vlákna (může trvat dlouho).
+        options: delimiter, decimal; progress/cancel viz BaseMeasurement.export_to_csv.
+        """
+        if self._process:
+            # Data jsou v procesu měření, průběh i zrušení se předávají přes frontu odpovědí
+            return self._process.export(filename, allowed_sensors, options, progress, cancel)
         if not self._current_measurement: return False
         
         if hasattr(self._current_measurement, "export_to_csv"):
-            return self._current_measurement.export_to_csv(filename, allowed_sensors)
+            return self._current_measurement.export_to_csv(
+                filename, allowed_sensors, progress=progress, cancel=cancel, **options
+            )
         return False
 
+    def runs_in_process(self) -> bool:
+        """Měření běží (nebo běželo) v samostatném procesu - jeho data nejsou v GUI procesu."""
+        return self._process is not None
+
+    def snapshot(self):
+        """
+        Pohled na data aktuálního měření (i za běhu) bez kopie, viz BaseMeasurement.snapshot.
+        V režimu samostatného procesu jsou data v jiném procesu -> None (export jde přes příkaz).
+        """
+        if self._process or not self._current_measurement:
+            return None
+        return self._current_measurement.snapshot()
+
+    def save_session(self, path: str, session_file: str, **metadata) -> Optional[dict]:
+        """Uloží data posledního měření jako session, vrací záznam katalogu (None = nelze)."""
+        if self._process:
+            return self._process.save_session(path, session_file, metadata)
+        if not self._current_measurement:
+            return None
+        return self._current_measurement.save_session(path, session_file, **metadata)
+
     def is_running(self) -> bool:
+        if self._process:
+            return self._process_running
         return self._current_measurement.is_running() if self._current_measurement else False
 
     def get_duration(self) -> float:
-        if self._current_measurement and hasattr(self._current_measurement, "DURATION_S"):
-            return self._current_measurement.DURATION_S
+        if self._process and self._process_duration_s is not None:
+            return self._process_duration_s
+        current = self._process_cls if self._process else self._current_measurement
+        if current and hasattr(current, "DURATION_S"):
+            return current.DURATION_S
         return 60.0
 
     def _on_data_callback(self, t_s: float, values: dict):
-        self.data_received.emit(t_s, values)
\ No newline at end of file
+        if self._live_server:
+            self._live_server.publish(t_s, values)
+        self.data_received.emit(t_s, values)
+
+    def _publish_status(self, status: str):
+        if self._live_server:
+            self._live_server.publish_status(status)
+
+    def _on_finished_publish(self):
+        self._publish_status("finished")
+
+    def get_gaps(self):
+        if self._process:
+            return list(self._process_gaps)
+        if self._current_measurement:
+            return list(self._current_measurement.gaps)
+        return []
+
+    def _on_connection_lost(self):
+        if self._current_measurement:
+            self._current_measurement.on_connection_lost()
+        self.connection_lost.emit()
+
+    def _on_connection_restored(self, hello: Optional[dict]):
+        if self._current_measurement:
+            self._current_measurement.on_connection_restored()
+        self.connection_restored.emit()
+
+    # --- Měření v samostatném procesu ---
+
+    def _start_in_process(self, cls: Type[BaseMeasurement], allowed_sensors: Optional[Set[str]], kwargs: dict) -> bool:
+        port = self._serial_mgr.port
+        if not port or not self._serial_mgr.is_open():
+            self.error_occurred.emit("Port není otevřen.")
+            return False
+
+        # Port může mít otevřený jen jeden proces -> předáme ho procesu měření
+        self._serial_mgr.close()
+        channels = sorted(allowed_sensors) if allowed_sensors else list(ALL_CHANNELS)
+        # Sdílený buffer musí mít sloupce i pro filtrované kanály
+        channels += ChannelFilterBank(getattr(cls, "FILTERS", {})).filtered_keys(channels)
+        self._process = AcquisitionProcess(cls, port, channels, kwargs, allowed_sensors)
+        self._process_cls = cls
+        self._process_duration_s = kwargs.get("duration_s")
+        self._process_port = port
+        self._process_gaps = []
+        self._process_running = True
+        self._publish_status("started")
+        self._process.start()
+        self._poll_timer.start(self.PROCESS_POLL_MS)
+        # Chyba konstruktoru v procesu přijde jako "error" + "finished"
+        return True
+
+    def _poll_process(self):
+        if not self._process:
+            self._poll_timer.stop()
+            return
+
+        for t_s, values in self._process.poll_samples():
+            self._on_data_callback(t_s, values)
+
+        for event in self._process.poll_events():
+            kind = event[0]
+            if kind == "progress":
+                self.progress_updated.emit(event[1])
+            elif kind == "error":
+                self.error_occurred.emit(event[1])
+            elif kind == "connection_lost":
+                self.connection_lost.emit()
+            elif kind == "connection_restored":
+                if event[1]:
+                    self._process_gaps.append(tuple(event[1]))
+                self.connection_restored.emit()
+            elif kind == "finished":
+                self._on_process_finished()
+
+        if not self._process_running or not self._process.is_alive():
+            self._poll_timer.stop()
+            if self._process_running:
+                self._on_process_finished()
+
+    def _on_process_finished(self):
+        if not self._process_running:
+            return
+        self._process_running = False
+        # Vzorky zapsané těsně před koncem měření
+        for t_s, values in self._process.poll_samples():
+            self._on_data_callback(t_s, values)
+        # Proces port uvolnil, GUI si ho vezme zpět (bez resetu ESP32)
+        try:
+            self._serial_mgr.open(self._process_port, reset=False)
+        except Exception as e:
+            self.error_occurred.emit(f"Port se nepodařilo znovu otevřít: {e}")
+        self.finished.emit()
+
+    def _shutdown_process(self):
+        if not self._process:
+            return
+        self._poll_timer.stop()
+        self._process.shutdown()
+        # Pokud měření ještě běželo, dokončíme ho stejně jako při běžném konci
+        self._on_process_finished()
+        self._process.close()
+        self._process = None
@@ -0,0 +1,274 @@
+import bisect
+import math
+import threading
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Výchozí hranice histogramu (s) - od ms po sekundy
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+class _Metric(ABC):
+    """
+    Společný základ metrik. Metrika se jmény štítků (labelnames) sama hodnotu nemá,
+    hodnoty drží potomci z labels(...) - ty si volající uloží a na horké cestě už jen inkrementuje.
+    """
+
+    TYPE = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 label_values: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.label_values = label_values
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> "_Metric":
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: očekávány štítky {self.labelnames}")
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child(key)
+                    self._children[key] = child
+        return child
+
+    def _new_child(self, key: Tuple[str, ...]) -> "_Metric":
+        return type(self)(self.name, self.help, (), key)
+
+    @abstractmethod
+    def _samples(self) -> List[Tuple[str, List[Tuple[str, str]], float]]:
+        """(přípona jména, štítky, hodnota) pro export."""
+
+    def collect(self) -> List[Tuple[str, List[Tuple[str, str]], float]]:
+        if not self.labelnames:
+            return self._samples()
+        samples = []
+        for key, child in list(self._children.items()):
+            base = list(zip(self.labelnames, key))
+            for suffix, labels, value in child._samples():
+                samples.append((suffix, base + labels, value))
+        return samples
+
+
+class Counter(_Metric):
+    """Monotónní čítač. inc() je jen přičtení (bez zámku - případná ztráta inkrementu při souběhu nevadí)."""
+
+    TYPE = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def _samples(self):
+        return [("", [], self.value)]
+
+
+class Gauge(_Metric):
+    """Okamžitá hodnota - nastavovaná, nebo počítaná až při stažení (set_function)."""
+
+    TYPE = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1.0):
+        self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        self._value -= amount
+
+    def set_function(self, function: Optional[Callable[[], float]]):
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
+        return self._value
+
+    def _samples(self):
+        return [("", [], self.value)]
+
+
+class Histogram(_Metric):
+    """Histogram s pevnými hranicemi (počty se kumulují až při exportu)."""
+
+    TYPE = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 label_values: Tuple[str, ...] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames, label_values)
+        self.buckets = tuple(sorted(buckets))
+        # Poslední přihrádka = nad nejvyšší hranicí (+Inf)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def _new_child(self, key):
+        return Histogram(self.name, self.help, (), key, self.buckets)
+
+    def observe(self, value: float):
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def _samples(self):
+        samples = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (math.inf,), self._counts):
+            cumulative += n
+            samples.append(("_bucket", [("le", _format_value(bound))], cumulative))
+        samples.append(("_sum", [], self.sum))
+        samples.append(("_count", [], cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Registr metrik procesu. counter/gauge/histogram vrací existující metriku stejného jména,
+    takže moduly si je mohou vytvořit při importu a držet v proměnné.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help_text: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"metrika {name} už existuje jako {metric.TYPE}")
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Všechny metriky v textovém formátu Prometheus (verze 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            for suffix, labels, value in metric.collect():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Registr celé aplikace
+REGISTRY = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Stahování každých pár sekund by zahltilo konzoli
+        pass
+
+
+class MetricsServer:
+    """
+    HTTP endpoint /metrics pro Prometheus. Běží ve vlastním vlákně, metriky se
+    serializují až při stažení - měření nic nestojí.
+    Pro sběr z jiného počítače spustit s host="0.0.0.0".
+    """
+
+    DEFAULT_PORT = 9108
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        self.registry = registry
+        self._host = host
+        self._port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1] if self._server else self._port
+
+    def is_running(self) -> bool:
+        return self._server is not None
+
+    def start(self) -> bool:
+        if self._server is not None:
+            return True
+        handler = type("Handler", (_MetricsHandler,), {"registry": self.registry})
+        try:
+            self._server = ThreadingHTTPServer((self._host, self._port), handler)
+        except OSError as e:
+            print(f"Metriky: nelze otevřít port {self._port}: {e}")
+            return False
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"Metriky na http://{self._host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._thread = None
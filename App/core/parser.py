@@ -1,5 +1,18 @@
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, Set, Union
 import json
+import re
+
+import numpy as np
+
+# Legacy pole "KLÍČ=hodnota" (desetinná čárka i tečka, 'nan' povoleno)
+_LEGACY_FIELD_RE = re.compile(
+    r"([A-Za-z_][A-Za-z0-9_]*)\s*=\s*([-+]?(?:\d+(?:[.,]\d*)?|[.,]\d+)(?:[eE][-+]?\d+)?|[nN][aA][nN])"
+)
+# Datový řádek legacy formátu vždy obsahuje T_BME
+_LEGACY_MARKER = "T_BME"
+
+FORMAT_JSON = "json"
+FORMAT_LEGACY = "legacy"
 
 
 def parse_temp_line(line: str) -> Dict[str, float]:
@@ -11,25 +24,103 @@ def parse_temp_line(line: str) -> Dict[str, float]:
     """
     result: Dict[str, float] = {}
 
-    if "T_BME" not in line:
+    if _LEGACY_MARKER not in line:
         # pravděpodobně info text, ne datová zpráva
         return result
 
-    parts = [p.strip() for p in line.split(";") if p.strip()]
-    for part in parts:
-        if "=" not in part:
-            continue
-        key, val = [x.strip() for x in part.split("=", 1)]
-        if not key:
+    for key, val in _LEGACY_FIELD_RE.findall(line):
+        if val[0] in "nN":
             continue
-        if val.lower() == "nan":
+        result[key] = float(val.replace(",", "."))
+
+    return result
+
+
+def parse_temp_lines(lines: Union[str, bytes, Iterable[str]]) -> Dict[str, np.ndarray]:
+    """
+    Dávkový parser legacy formátu - celý buffer (nebo seznam řádků) najednou.
+    Vrací sloupce { klíč: np.ndarray } stejné délky (jeden prvek na datový řádek),
+    chybějící hodnota nebo 'nan' = NaN. Nedatové řádky se přeskočí.
+
+    Převod textu na čísla dělá numpy pro celý sloupec najednou,
+    v Pythonu zůstává jen průchod výsledky předkompilovaného regexu.
+    """
+    if isinstance(lines, bytes):
+        lines = lines.decode("utf-8", errors="replace")
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+
+    rows: Dict[str, List[int]] = {}
+    texts: Dict[str, List[str]] = {}
+    n_rows = 0
+    findall = _LEGACY_FIELD_RE.findall
+    for line in lines:
+        if _LEGACY_MARKER not in line:
             continue
-        try:
-            result[key] = float(val.replace(",", "."))
-        except ValueError:
+        fields = findall(line.replace(",", "."))
+        if not fields:
             continue
+        for key, val in fields:
+            if key not in rows:
+                rows[key] = []
+                texts[key] = []
+            rows[key].append(n_rows)
+            texts[key].append(val)
+        n_rows += 1
 
-    return result
+    columns: Dict[str, np.ndarray] = {}
+    for key, idx in rows.items():
+        col = np.full(n_rows, np.nan)
+        # "nan" převede numpy samo
+        col[idx] = np.array(texts[key]).astype(np.float64)
+        columns[key] = col
+    return columns
+
+
+def detect_line_format(line: str) -> Optional[str]:
+    """Rozpozná formát jednoho řádku: FORMAT_JSON, FORMAT_LEGACY nebo None."""
+    stripped = line.lstrip()
+    if stripped.startswith("{"):
+        return FORMAT_JSON
+    if _LEGACY_MARKER in stripped and "=" in stripped:
+        return FORMAT_LEGACY
+    return None
+
+
+class LineDecoder:
+    """
+    Dekodér jednoho proudu řádků (sériová linka, soubor).
+    Formát (JSON / legacy) se rozpozná z prvního datového řádku a zapamatuje,
+    další řádky jdou rovnou správným parserem. Řádek, který zapamatovanému
+    formátu neodpovídá, se rozpozná znovu (smíšené zdroje).
+
+    Legacy řádky se vrací ve tvaru JSON zprávy {"type": "data", ...},
+    takže zbytek aplikace pracuje jen s jedním formátem.
+    """
+
+    def __init__(self):
+        self.format: Optional[str] = None
+
+    def reset(self):
+        self.format = None
+
+    def decode(self, line: str) -> Optional[dict]:
+        fmt = self.format
+        is_json = line.lstrip().startswith("{")
+        if fmt is None or is_json != (fmt == FORMAT_JSON):
+            fmt = detect_line_format(line)
+            if fmt is None:
+                return None
+
+        if fmt == FORMAT_JSON:
+            msg = parse_json_message(line)
+        else:
+            values = parse_temp_line(line)
+            msg = {"type": "data", **values} if values else None
+
+        if msg is not None and self.format != fmt:
+            self.format = fmt
+        return msg
 
 
 def parse_json_message(line: str) -> Optional[dict]:
@@ -47,9 +138,10 @@ def parse_json_message(line: str) -> Optional[dict]:
     return None
 
 
-def extract_data_values(msg: dict) -> Dict[str, float]:
+def extract_data_values(msg: dict, allowed: Optional[Set[str]] = None) -> Dict[str, float]:
     """
     Z JSON zprávy typu "data" vytáhne numerické hodnoty senzorů.
+    Pokud je zadáno allowed, ostatní klíče se rovnou přeskočí.
 
     Očekávaný tvar:
       {
@@ -67,6 +159,8 @@ def extract_data_values(msg: dict) -> Dict[str, float]:
     for key, val in msg.items():
         if key in ("type", "t_ms"):
             continue
+        if allowed is not None and key not in allowed:
+            continue
         if isinstance(val, (int, float)):
             result[key] = float(val)
 
@@ -0,0 +1,66 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Kruhový buffer pevné kapacity nad předalokovaným numpy polem.
+      - append() je O(1) a nikdy nealokuje
+      - view() vrací souvislý pohled (bez kopie) na uložená data od nejstaršího
+
+    Každá hodnota se zapisuje dvakrát (na i a i + capacity), takže posledních
+    `capacity` hodnot tvoří vždy souvislý úsek pole.
+    """
+
+    def __init__(self, capacity: int, dtype=np.float64):
+        if capacity <= 0:
+            raise ValueError("capacity musí být kladná")
+        self._capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=dtype)
+        self._idx = 0      # pozice dalšího zápisu (0..capacity-1)
+        self._count = 0    # počet platných hodnot (max. capacity)
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, value):
+        idx = self._idx
+        self._data[idx] = value
+        self._data[idx + self._capacity] = value
+        self._idx = idx + 1 if idx + 1 < self._capacity else 0
+        if self._count < self._capacity:
+            self._count += 1
+
+    def extend(self, values):
+        """Vloží blok hodnot najednou (vektorově)."""
+        values = np.asarray(values, dtype=self._data.dtype)
+        n = len(values)
+        if n == 0:
+            return
+        if n >= self._capacity:
+            values = values[-self._capacity:]
+            n = self._capacity
+
+        cap = self._capacity
+        first = min(n, cap - self._idx)
+        for offset in (0, cap):
+            self._data[self._idx + offset:self._idx + offset + first] = values[:first]
+            self._data[offset:offset + n - first] = values[first:]
+        self._idx = (self._idx + n) % cap
+        self._count = min(cap, self._count + n)
+
+    def view(self) -> np.ndarray:
+        end = self._idx + self._capacity
+        return self._data[end - self._count:end]
+
+    def last(self):
+        if self._count == 0:
+            raise IndexError("buffer je prázdný")
+        return self._data[self._idx + self._capacity - 1]
+
+    def clear(self):
+        self._idx = 0
+        self._count = 0
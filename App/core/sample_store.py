@@ -0,0 +1,268 @@
+import tempfile
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from core.chunk_codec import decode_columns, encode_columns
+from core.session import rows_to_columns
+
+
+class _Chunk:
+    """
+    Blok starších řádků ve sloupcové, zakódované podobě (core.chunk_codec).
+    Data jsou buď v paměti (data), nebo v dočasném souboru (offset/size).
+    """
+
+    def __init__(self, data: bytes, n_rows: int):
+        self.data: Optional[bytes] = data
+        self.file = None
+        self.offset = 0
+        self.size = len(data)
+        self.n_rows = n_rows
+
+    @property
+    def in_memory(self) -> bool:
+        return self.data is not None
+
+
+class SampleSnapshot:
+    """
+    Konzistentní pohled na SampleStore v jednom okamžiku - nic se nekopíruje.
+    Drží n-tici bloků a odkaz na seznam posledních řádků s jeho tehdejší délkou: producent
+    do seznamu jen připojuje (starší prvky se nemění) a při kódování vytvoří seznam nový,
+    takže pohled zůstává platný i během dalšího měření.
+    """
+
+    def __init__(self, store: "SampleStore", chunks: Tuple[_Chunk, ...], chunk_rows: int,
+                 rows: List[dict], n_rows: int):
+        self._store = store
+        self._chunks = chunks
+        self._chunk_rows = chunk_rows
+        self._rows = rows
+        self._n_rows = n_rows
+
+    def __len__(self) -> int:
+        return self._chunk_rows + self._n_rows
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __getitem__(self, index: int) -> dict:
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("index mimo rozsah")
+        if index >= self._chunk_rows:
+            return self._rows[index - self._chunk_rows]
+        for chunk in self._chunks:
+            if index < chunk.n_rows:
+                return self._store._chunk_rows(chunk)[index]
+            index -= chunk.n_rows
+        raise IndexError("index mimo rozsah")
+
+    def __iter__(self) -> Iterator[dict]:
+        # Bloky se dekódují postupně, rozbalený je vždy jen jeden
+        for chunk in self._chunks:
+            yield from self._store._chunk_rows(chunk)
+        for i in range(self._n_rows):
+            yield self._rows[i]
+
+    def columns(self, keys: Optional[List[str]] = None, start: int = 0) -> Dict[str, np.ndarray]:
+        """
+        Historie pohledu od řádku `start` jako sloupce (chybějící hodnota = NaN), volitelně jen vybrané.
+        Bloky celé před `start` se nedekódují (konec dlouhého měření je levný).
+        """
+        parts, lengths = [], []
+        offset = 0
+        for chunk in self._chunks:
+            if offset + chunk.n_rows > start:
+                skip = max(0, start - offset)
+                part = self._store._chunk_columns(chunk, keys)
+                parts.append({k: v[skip:] for k, v in part.items()} if skip else part)
+                lengths.append(chunk.n_rows - skip)
+            offset += chunk.n_rows
+        skip = max(0, start - self._chunk_rows)
+        tail = rows_to_columns(self._rows[skip:self._n_rows])
+        parts.append(tail if keys is None else {k: v for k, v in tail.items() if k in keys})
+        lengths.append(max(0, self._n_rows - skip))
+
+        keys: Dict[str, None] = {}
+        for part in parts:
+            for key in part:
+                keys.setdefault(key, None)
+        return {
+            key: np.concatenate([p[key] if key in p else np.full(n, np.nan) for p, n in zip(parts, lengths)])
+            for key in keys
+        }
+
+
+class SampleStore:
+    """
+    Seznam naměřených řádků { "t_s": ..., "T_BME": ..., ... } s limitem paměti.
+
+    Nejnovější řádky jsou obyčejné slovníky. Starší řádky se po blocích převádějí na sloupce
+    a kódují (rozdíly časů, celočíselné hodnoty na mřížce senzoru, zlib) - typicky desítky
+    krát méně paměti než float objekty. Když ani zakódované bloky nevejdou do `budget_mb`,
+    nejstarší se přesunou do dočasného souboru. Čtení (iterace, index, columns()) vidí
+    celou historii.
+      - compress=False: bez kódování v paměti, bloky se odkládají až při překročení limitu
+
+    Zapisuje jediné vlákno (append, bez zámku), číst může libovolný počet dalších vláken
+    přes snapshot(). Stav (bloky, počet jejich řádků, seznam posledních řádků) se publikuje
+    jedním přiřazením n-tice, zámek chrání jen dočasný soubor.
+    """
+
+    CHUNK_ROWS = 50_000
+    # Hrubý odhad paměti jednoho řádku (dict + float objekty)
+    ROW_OVERHEAD_BYTES = 240
+    VALUE_BYTES = 56
+
+    def __init__(self, budget_mb: Optional[float] = None, compress: bool = True):
+        self.budget_bytes = int(budget_mb * 1024 * 1024) if budget_mb else None
+        self.compress = compress
+        self._rows: List[dict] = []
+        self._row_bytes = 0
+        self._chunks: Tuple[_Chunk, ...] = ()
+        self._chunk_rows_total = 0
+        # Publikovaný stav pro čtenáře: (bloky, řádků v blocích, seznam posledních řádků)
+        self._state = (self._chunks, 0, self._rows)
+        self._memory_chunk_bytes = 0
+        self._file = None
+        self._file_lock = threading.Lock()
+
+    # --- list API ---
+
+    def snapshot(self) -> SampleSnapshot:
+        """Pohled na dosud uložená data (bez kopie a bez blokování zapisujícího vlákna)."""
+        chunks, chunk_rows, rows = self._state
+        return SampleSnapshot(self, chunks, chunk_rows, rows, len(rows))
+
+    def __len__(self) -> int:
+        chunks, chunk_rows, rows = self._state
+        return chunk_rows + len(rows)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def append(self, row: dict):
+        # Horká cesta: jen připojení do seznamu, který čtenáři vidí přes _state
+        self._rows.append(row)
+        self._row_bytes += self.ROW_OVERHEAD_BYTES + self.VALUE_BYTES * len(row)
+        if self.compress and len(self._rows) >= 2 * self.CHUNK_ROWS:
+            # V seznamu zůstane vždy alespoň CHUNK_ROWS nejnovějších řádků
+            self._compact(self.CHUNK_ROWS)
+        if self.budget_bytes is not None and self.memory_bytes > self.budget_bytes:
+            self._enforce_budget()
+
+    def append_columns(self, columns: Dict[str, np.ndarray]):
+        """Připojí celý blok sloupců najednou (např. výpis rychlého záznamu) - bez slovníků po řádcích."""
+        n = len(next(iter(columns.values()), ()))
+        if not n:
+            return
+        if self._rows:
+            # Pořadí: zakódované bloky jsou vždy starší než řádky v seznamu
+            self._compact(len(self._rows))
+        chunk = _Chunk(encode_columns(columns), n)
+        self._memory_chunk_bytes += chunk.size
+        self._publish(self._chunks + (chunk,), self._chunk_rows_total + n, self._rows)
+        if self.budget_bytes is not None and self.memory_bytes > self.budget_bytes:
+            self._enforce_budget()
+
+    def __getitem__(self, index: int) -> dict:
+        return self.snapshot()[index]
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.snapshot())
+
+    def clear(self):
+        self._row_bytes = 0
+        self._memory_chunk_bytes = 0
+        self._publish((), 0, [])
+        # Starší snapshoty mohou ze souboru ještě číst - zavře ho až garbage collector
+        with self._file_lock:
+            self._file = None
+
+    def _publish(self, chunks: Tuple[_Chunk, ...], chunk_rows: int, rows: List[dict]):
+        self._chunks = chunks
+        self._chunk_rows_total = chunk_rows
+        self._rows = rows
+        self._state = (chunks, chunk_rows, rows)
+
+    # --- stav ---
+
+    @property
+    def memory_bytes(self) -> int:
+        """Odhad paměti: řádky jako slovníky + zakódované bloky v paměti."""
+        return self._row_bytes + self._memory_chunk_bytes
+
+    @property
+    def spilled_rows(self) -> int:
+        """Řádky odložené do dočasného souboru."""
+        return sum(chunk.n_rows for chunk in self._state[0] if not chunk.in_memory)
+
+    @property
+    def compressed_rows(self) -> int:
+        """Řádky v zakódovaných blocích (v paměti i na disku)."""
+        return self._state[1]
+
+    # --- sloupcový přístup ---
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Celá historie jako sloupce (chybějící hodnota = NaN)."""
+        return self.snapshot().columns()
+
+    # --- kódování a odkládání ---
+
+    def _compact(self, n: int):
+        """Nejstarších n řádků -> zakódovaný blok v paměti."""
+        # Nové seznamy - původní seznam zůstane beze změny pro snapshoty, které ho drží
+        rows, tail = self._rows[:n], self._rows[n:]
+        chunk = _Chunk(encode_columns(rows_to_columns(rows)), n)
+        self._memory_chunk_bytes += chunk.size
+        self._row_bytes = sum(self.ROW_OVERHEAD_BYTES + self.VALUE_BYTES * len(r) for r in tail)
+        self._publish(self._chunks + (chunk,), self._chunk_rows_total + n, tail)
+
+    def _enforce_budget(self):
+        # 1. Nejstarší bloky z paměti na disk
+        for chunk in self._chunks:
+            if self.memory_bytes <= self.budget_bytes:
+                return
+            if chunk.in_memory:
+                self._write_to_file(chunk)
+        # 2. Ani to nestačí (bez kódování / malý limit) -> rovnou část řádků
+        if self.memory_bytes > self.budget_bytes and len(self._rows) > 1:
+            # Odkládáme alespoň polovinu, aby se nespouštělo po každém řádku
+            self._compact(max(min(self.CHUNK_ROWS, len(self._rows)), len(self._rows) // 2))
+            self._write_to_file(self._chunks[-1])
+
+    def _write_to_file(self, chunk: _Chunk):
+        with self._file_lock:
+            if self._file is None:
+                self._file = tempfile.TemporaryFile(prefix="temp_lab_")
+            self._file.seek(0, 2)
+            chunk.offset = self._file.tell()
+            chunk.file = self._file
+            self._file.write(chunk.data)
+            self._file.flush()
+        self._memory_chunk_bytes -= chunk.size
+        # Až teď - čtenář, který data ještě viděl v paměti, je dočte odtud
+        chunk.data = None
+
+    def _chunk_columns(self, chunk: _Chunk, keys: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        data = chunk.data
+        if data is None:
+            with self._file_lock:
+                chunk.file.seek(chunk.offset)
+                data = chunk.file.read(chunk.size)
+        return decode_columns(data, keys)
+
+    def _chunk_rows(self, chunk: _Chunk) -> List[dict]:
+        columns = self._chunk_columns(chunk)
+        lists = {key: col.tolist() for key, col in columns.items()}
+        rows = []
+        for i in range(chunk.n_rows):
+            # NaN = hodnota v původním řádku nebyla
+            rows.append({key: vals[i] for key, vals in lists.items() if vals[i] == vals[i]})
+        return rows
@@ -1,4 +1,6 @@
-from typing import Dict
+import colorsys
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional
 
 # Centrální mapa názvů senzorů
 # Klíč: Identifikátor v JSONu z ESP32
@@ -22,11 +24,56 @@ SENSOR_NAMES: Dict[str, str] = {
     "ESP_NTC": "U NTC (ESP)",
 }
 
-def get_sensor_name(key: str) -> str:
+# Bity masky pro příkaz "SET CHANNELS <mask>" (musí odpovídat firmware, SerialProtocol.h)
+CHANNEL_BITS: Dict[str, int] = {
+    "T_BME": 0,
+    "T_TMP": 1,
+    "V_ADS_R": 2,
+    "V_ADS_NTC": 3,
+    "V_ESP_R": 4,
+    "V_ESP_NTC": 5,
+}
+DALLAS_FIRST_BIT = 8
+DALLAS_MAX_SENSORS = 4  # DallasBus::MAX_SENSORS ve firmware
+
+# Všechny kanály, které může firmware poslat
+ALL_CHANNELS: List[str] = list(CHANNEL_BITS) + [f"T_DS{i}" for i in range(DALLAS_MAX_SENSORS)]
+
+
+def channel_mask(keys: Iterable[str]) -> int:
+    """Převede množinu klíčů senzorů na bitovou masku pro ESP32."""
+    mask = 0
+    for key in keys:
+        if key in CHANNEL_BITS:
+            mask |= 1 << CHANNEL_BITS[key]
+        elif key.startswith("T_DS"):
+            try:
+                mask |= 1 << (DALLAS_FIRST_BIT + int(key.replace("T_DS", "")))
+            except ValueError:
+                pass
+    return mask
+
+
+# Přípona odvozených (filtrovaných) kanálů, viz core/filters.py
+FILTERED_SUFFIX = "_filt"
+
+
+def base_channel(key: str) -> str:
+    """Klíč surového kanálu, ze kterého je kanál odvozen (V_ESP_R_filt -> V_ESP_R)."""
+    if key.endswith(FILTERED_SUFFIX):
+        return key[:-len(FILTERED_SUFFIX)]
+    return key
+
+
+def _classify_name(key: str) -> str:
     """
-    Vrátí hezký název pro daný klíč senzoru.
+    Vrátí hezký název pro daný klíč senzoru (bez registru).
     Řeší i dynamické senzory jako DS18B20.
     """
+    # 0. Odvozené kanály (filtr) pojmenujeme podle zdroje
+    if key.endswith(FILTERED_SUFFIX):
+        return f"{_classify_name(base_channel(key))} (filtr)"
+
     # 1. Zkusíme přímou shodu v mapě
     if key in SENSOR_NAMES:
         return SENSOR_NAMES[key]
@@ -41,4 +88,173 @@ def get_sensor_name(key: str) -> str:
             return key # Fallback
             
     # 3. Pokud neznáme, vrátíme původní klíč
-    return key
\ No newline at end of file
+    return key
+
+
+# --- Registr kanálů ---
+
+AXIS_TEMPERATURE = "temperature"
+AXIS_VOLTAGE = "voltage"
+AXIS_PWM = "pwm"
+
+# Barvy křivek a kartiček podle indexu kanálu
+CHANNEL_COLORS: List[str] = [
+    "#00FF00", "#FF4500", "#00FFFF", "#FFFF00",
+    "#FF00FF", "#1E90FF", "#FFFFFF", "#FFA500",
+]
+
+
+def channel_color(index: int) -> str:
+    """
+    Barva kanálu podle indexu. Prvních len(CHANNEL_COLORS) je pevných, další se
+    generují posunem odstínu o zlatý řez - paleta tak roste s počtem kanálů a barvy se neopakují.
+    """
+    if index < len(CHANNEL_COLORS):
+        return CHANNEL_COLORS[index]
+    hue = (0.1 + index * 0.618033988749895) % 1.0
+    light = 0.6 if (index // len(CHANNEL_COLORS)) % 2 else 0.45
+    r, g, b = colorsys.hls_to_rgb(hue, light, 1.0)
+    return f"#{round(r * 255):02X}{round(g * 255):02X}{round(b * 255):02X}"
+
+
+class ChannelInfo(NamedTuple):
+    """Předpočítaná metadata jednoho kanálu."""
+    index: int
+    key: str
+    name: str
+    unit: str
+    axis: str
+    color: str
+
+
+def _classify_axis(key: str) -> str:
+    key = base_channel(key)
+    if key.startswith("V_") or key.startswith("ADC") or key.startswith("ESP"):
+        return AXIS_VOLTAGE
+    if key.startswith("PWM"):
+        return AXIS_PWM
+    return AXIS_TEMPERATURE
+
+
+_AXIS_UNITS: Dict[str, str] = {AXIS_TEMPERATURE: "°C", AXIS_VOLTAGE: "mV", AXIS_PWM: "%"}
+
+
+def detected_channels(hello: dict) -> List[str]:
+    """Kanály, které zařízení ohlásilo v handshake zprávě "hello"."""
+    keys: List[str] = []
+    if str(hello.get("bme")).lower() == "true":
+        keys.append("T_BME")
+    if str(hello.get("tmp")).lower() == "true":
+        keys.append("T_TMP")
+    if str(hello.get("adc")).lower() == "true":
+        # Názvy klíčů musí odpovídat tomu, co posílá ESP v sendData
+        keys.extend(["V_ADS_R", "V_ADS_NTC", "V_ESP_R", "V_ESP_NTC"])
+    try:
+        keys.extend(f"T_DS{i}" for i in range(int(hello.get("dallas", 0))))
+    except (TypeError, ValueError):
+        pass
+    return keys
+
+
+class SensorRegistry:
+    """
+    Kanály aktuálního zařízení s pevným indexem a předpočítanými metadaty
+    (název, jednotka, osa, barva). Klasifikace podle klíče proběhne jednou
+    při registraci, dál je to jen vyhledání ve slovníku.
+    Neohlášené kanály (filtrované kopie, starší firmware) se registrují při prvním výskytu
+    v datech (register). Pouhý dotaz (get, describe) registr nemění - indexy a barvy
+    kanálů tak nezávisí na tom, na co se kdo zeptal.
+    """
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self._infos: List[ChannelInfo] = []
+        self._by_key: Dict[str, ChannelInfo] = {}
+        self._lock = threading.Lock()
+        for key in keys:
+            self.register(key)
+
+    @classmethod
+    def from_hello(cls, hello: dict) -> "SensorRegistry":
+        return cls(detected_channels(hello))
+
+    def register(self, key: str) -> ChannelInfo:
+        """Metadata kanálu, který se objevil v datech (nový kanál dostane další index)."""
+        info = self._by_key.get(key)
+        if info is None:
+            with self._lock:
+                info = self._by_key.get(key)
+                if info is None:
+                    info = self._make_info(key, len(self._infos))
+                    self._infos.append(info)
+                    self._by_key[key] = info
+        return info
+
+    def get(self, key: str) -> Optional[ChannelInfo]:
+        return self._by_key.get(key)
+
+    def describe(self, key: str) -> ChannelInfo:
+        """Metadata kanálu bez registrace - neznámý kanál má index -1 (a barvu, kterou by dostal)."""
+        info = self._by_key.get(key)
+        if info is None:
+            info = self._make_info(key, -1, color_index=len(self._infos))
+        return info
+
+    @staticmethod
+    def _make_info(key: str, index: int, color_index: Optional[int] = None) -> ChannelInfo:
+        axis = _classify_axis(key)
+        return ChannelInfo(
+            index=index,
+            key=key,
+            name=_classify_name(key),
+            unit=_AXIS_UNITS[axis],
+            axis=axis,
+            color=channel_color(index if color_index is None else color_index),
+        )
+
+    def index(self, key: str) -> int:
+        info = self._by_key.get(key)
+        return info.index if info is not None else -1
+
+    @property
+    def keys(self) -> List[str]:
+        return [info.key for info in self._infos]
+
+    @property
+    def channels(self) -> List[ChannelInfo]:
+        return list(self._infos)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._by_key
+
+    def __len__(self) -> int:
+        return len(self._infos)
+
+
+# Registr právě připojeného zařízení (do handshake všechny známé kanály)
+_registry = SensorRegistry(ALL_CHANNELS)
+
+
+def get_registry() -> SensorRegistry:
+    return _registry
+
+
+def set_registry(registry: SensorRegistry):
+    global _registry
+    _registry = registry
+
+
+def register_channels(keys: Iterable[str]):
+    """Zaregistruje kanály z přijatého vzorku (známé kanály jsou jen vyhledání ve slovníku)."""
+    registry = _registry
+    for key in keys:
+        if key not in registry:
+            registry.register(key)
+
+
+def channel_info(key: str) -> ChannelInfo:
+    return _registry.describe(key)
+
+
+def get_sensor_name(key: str) -> str:
+    """Hezký název kanálu (z registru, bez opakovaného rozboru klíče)."""
+    return _registry.describe(key).name
@@ -1,63 +1,189 @@
 import threading
 import time
-from typing import Callable, Optional, List
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, Optional, List, Tuple
 
 import serial
 from serial.tools import list_ports
 
+from core.parser import parse_json_message
+from core.metrics import REGISTRY
+
+_LINES_RECEIVED = REGISTRY.counter("temp_lab_serial_lines_total", "Řádky přijaté ze sériové linky")
+_BYTES_RECEIVED = REGISTRY.counter("temp_lab_serial_bytes_total", "Bajty přijaté ze sériové linky")
+_DISCONNECTS = REGISTRY.counter("temp_lab_serial_disconnects_total", "Ztráty spojení s ESP32")
+_RECONNECTS = REGISTRY.counter("temp_lab_serial_reconnects_total", "Úspěšná znovupřipojení k ESP32")
+_COMMAND_RETRIES = REGISTRY.counter("temp_lab_serial_command_retries_total", "Opakovaně odeslané příkazy bez ack")
+_COMMAND_TIMEOUTS = REGISTRY.counter("temp_lab_serial_command_timeouts_total", "Příkazy, které ESP32 nepotvrdilo")
+_QUEUE_DEPTH = REGISTRY.gauge("temp_lab_queue_depth", "Počet položek ve frontě", ("queue",))
+
+
+class CommandError(Exception):
+    """ESP32 odpovědělo na příkaz zprávou typu "error"."""
+    pass
+
+
+class _PendingCommand:
+    """Odeslaný příkaz, který čeká na ack/error z ESP32."""
+    __slots__ = ("line", "ack", "future", "timeout_s", "deadline", "retries_left")
+
+    def __init__(self, line: str, ack: str, timeout_s: float, retries: int):
+        self.line = line
+        self.ack = ack
+        self.future: Future = Future()
+        self.timeout_s = timeout_s
+        self.deadline = time.time() + timeout_s
+        self.retries_left = retries
+
 
 class SerialManager:
+    # Výchozí čekání na ack a počet opakování příkazu
+    COMMAND_TIMEOUT_S = 0.5
+    COMMAND_RETRIES = 2
+
+    # Prodlevy mezi pokusy o znovupřipojení (poslední hodnota se opakuje)
+    RECONNECT_BACKOFF_S = (0.5, 1.0, 2.0, 4.0)
+    # Jak dlouho po znovuotevření portu čekáme na "hello" z ESP32
+    HANDSHAKE_TIMEOUT_S = 3.0
+    # Jak dlouho čekáme na odpověď při hledání ESP32 na portech
+    # (pokrývá i restart desky, který otevření portu na některých OS vyvolá)
+    PROBE_TIMEOUT_S = 2.5
+
     def __init__(self):
         self._ser: Optional[serial.Serial] = None
         self._reader_thread: Optional[threading.Thread] = None
         self._running = False
+        self._stop_event = threading.Event()
         self._line_callback: Optional[Callable[[str], None]] = None
 
+        # Parametry posledního open() - potřebné pro znovupřipojení
+        self._port: Optional[str] = None
+        self._baudrate = 115200
+        self._timeout = 0.1
+
+        self.auto_reconnect = True
+        self._on_connection_lost: Optional[Callable[[], None]] = None
+        self._on_connection_restored: Optional[Callable[[Optional[dict]], None]] = None
+
+        # Příkazy čekající na potvrzení (v pořadí odeslání)
+        self._pending: List[_PendingCommand] = []
+        self._pending_lock = threading.Lock()
+        _QUEUE_DEPTH.labels("serial_commands").set_function(lambda: len(self._pending))
+
     @staticmethod
     def list_ports() -> List[str]:
         return [p.device for p in list_ports.comports()]
 
+    @staticmethod
+    def candidate_ports() -> List[str]:
+        """Porty, na kterých má smysl hledat ESP32 (USB převodníky, jinak všechny)."""
+        ports = list(list_ports.comports())
+        usb = [p.device for p in ports if p.vid is not None]
+        return usb if usb else [p.device for p in ports]
+
+    @classmethod
+    def probe_ports(
+        cls,
+        ports: Optional[List[str]] = None,
+        preferred: Optional[str] = None,
+        baudrate: int = 115200,
+        timeout_s: Optional[float] = None,
+    ) -> Optional[Tuple[str, dict]]:
+        """
+        Paralelně otestuje porty a vrátí (port, hello) prvního, kde odpoví ESP32.
+        Port "preferred" (např. z cache) má přednost, pokud odpoví také.
+        """
+        candidates = list(ports) if ports is not None else cls.candidate_ports()
+        if not candidates:
+            return None
+        timeout_s = cls.PROBE_TIMEOUT_S if timeout_s is None else timeout_s
+
+        stop_event = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=len(candidates))
+        futures = {
+            pool.submit(cls._probe_port, port, baudrate, timeout_s, stop_event): port
+            for port in candidates
+        }
+        found: Optional[Tuple[str, dict]] = None
+        try:
+            wait_for_preferred = preferred in candidates
+            for future in as_completed(futures):
+                port = futures[future]
+                hello = future.result()
+                if port == preferred:
+                    wait_for_preferred = False
+                if hello is not None and (found is None or port == preferred):
+                    found = (port, hello)
+                if found is not None and not wait_for_preferred:
+                    break
+        finally:
+            # Zbylé sondy ukončíme, na jejich timeout nečekáme
+            stop_event.set()
+            pool.shutdown(wait=False)
+        return found
+
+    @classmethod
+    def _probe_port(
+        cls, port: str, baudrate: int, timeout_s: float, stop_event: threading.Event
+    ) -> Optional[dict]:
+        try:
+            with serial.Serial(port=port, baudrate=baudrate, timeout=0.1) as ser:
+                ser.reset_input_buffer()
+                ser.write(b"HELLO\n")
+                return cls._read_hello(
+                    ser, time.time() + timeout_s, lambda: not stop_event.is_set()
+                )
+        except Exception:
+            return None
+
+    @property
+    def port(self) -> Optional[str]:
+        return self._port
+
     def is_open(self) -> bool:
         return self._ser is not None and self._ser.is_open
 
-    def open(self, port: str, baudrate: int = 115200, timeout: float = 0.1):
+    def open(self, port: str, baudrate: int = 115200, timeout: float = 0.1, reset: bool = True):
+        """
+        Otevře port a spustí čtecí vlákno.
+        reset=False přeskočí DTR/RTS reset - rychlé připojení ke známému,
+        už běžícímu zařízení (identitu pak ověří příkaz HELLO).
+        """
         self.close()
-        
-        # 1. Otevření portu
-        self._ser = serial.Serial(port=port, baudrate=baudrate, timeout=timeout)
 
-        # 2. HARD RESET ESP32 (Agresivní metoda ala esptool)
-        # Mnoho desek potřebuje specifickou sekvenci DTR/RTS
-        self._ser.dtr = False
-        self._ser.rts = False
-        time.sleep(0.1)
-        
-        self._ser.dtr = True
-        self._ser.rts = True
-        time.sleep(0.1)
-        
-        self._ser.dtr = False
-        self._ser.rts = False
-        time.sleep(0.2)  # Chvilku počkáme, než ESP nastartuje
+        self._port = port
+        self._baudrate = baudrate
+        self._timeout = timeout
+        self._open_port(reset)
 
         self._start_reader()
 
     def close(self):
         self._running = False
+        self._stop_event.set()
         if self._reader_thread and self._reader_thread.is_alive():
             self._reader_thread.join(timeout=1.0)
         self._reader_thread = None
-
-        if self._ser is not None:
-            try:
-                self._ser.close()
-            except Exception:
-                pass
-            self._ser = None
+        self._close_port()
+        self._fail_pending(ConnectionError("Port byl uzavřen"))
 
     def set_line_callback(self, cb: Optional[Callable[[str], None]]):
         self._line_callback = cb
 
+    def set_connection_callbacks(
+        self,
+        on_lost: Optional[Callable[[], None]],
+        on_restored: Optional[Callable[[Optional[dict]], None]],
+    ):
+        """
+        Callbacky volané z čtecího vlákna:
+          - on_lost: port přestal odpovídat (odpojení USB)
+          - on_restored: port je znovu otevřen, argumentem je "hello" zpráva
+            (nebo None, pokud ESP po otevření nic neposlalo)
+        """
+        self._on_connection_lost = on_lost
+        self._on_connection_restored = on_restored
+
     def write(self, data: str):
         if not self.is_open():
             return
@@ -69,27 +195,217 @@ class SerialManager:
     def write_line(self, line: str):
         self.write(line + "\n")
 
+    def send_command(
+        self,
+        line: str,
+        ack: Optional[str] = None,
+        timeout_s: Optional[float] = None,
+        retries: Optional[int] = None,
+    ) -> Future:
+        """
+        Odešle příkaz a vrátí Future, která se vyřeší odpovídající zprávou
+        {"type":"ack","cmd":...} z ESP32.
+          - ack: očekávaný název v poli "cmd" (výchozí odvozen z příkazu,
+            např. "SET RATE 2" -> "set_rate", "START" -> "start")
+          - při zprávě "error" skončí Future výjimkou CommandError
+          - bez odpovědi se příkaz opakuje, pak skončí výjimkou TimeoutError
+        Příkazy se neblokují, lze jich odeslat více za sebou (pipelining).
+        """
+        pending = _PendingCommand(
+            line,
+            ack or self._default_ack_name(line),
+            self.COMMAND_TIMEOUT_S if timeout_s is None else timeout_s,
+            self.COMMAND_RETRIES if retries is None else retries,
+        )
+        if not self.is_open():
+            pending.future.set_exception(ConnectionError("Port není otevřen"))
+            return pending.future
+
+        with self._pending_lock:
+            self._pending.append(pending)
+        self.write_line(line)
+        return pending.future
+
+    @staticmethod
+    def _default_ack_name(line: str) -> str:
+        words = line.strip().lower().split()
+        if not words:
+            return ""
+        if words[0] == "set" and len(words) > 1:
+            return f"set_{words[1]}"
+        return words[0]
+
+    def _resolve_pending(self, msg: dict):
+        """Spáruje ack/error zprávu s nejstarším odpovídajícím příkazem."""
+        cmd = msg.get("cmd")
+        with self._pending_lock:
+            match = next((p for p in self._pending if p.ack == cmd), None)
+            if match is None and msg.get("type") == "error" and self._pending:
+                # Starší firmware neposílá v chybě název příkazu
+                match = self._pending[0]
+            if match is None:
+                return
+            self._pending.remove(match)
+
+        if msg.get("type") == "ack":
+            match.future.set_result(msg)
+        else:
+            match.future.set_exception(CommandError(str(msg.get("msg", "unknown_error"))))
+
+    def _check_command_timeouts(self):
+        now = time.time()
+        expired: List[_PendingCommand] = []
+        resend: List[str] = []
+        with self._pending_lock:
+            for p in self._pending:
+                if now < p.deadline:
+                    continue
+                if p.retries_left > 0:
+                    p.retries_left -= 1
+                    p.deadline = now + p.timeout_s
+                    resend.append(p.line)
+                else:
+                    expired.append(p)
+            for p in expired:
+                self._pending.remove(p)
+
+        _COMMAND_RETRIES.inc(len(resend))
+        _COMMAND_TIMEOUTS.inc(len(expired))
+        for line in resend:
+            self.write_line(line)
+        for p in expired:
+            p.future.set_exception(TimeoutError(f"ESP32 nepotvrdilo příkaz '{p.line}'"))
+
+    def _fail_pending(self, exc: Exception):
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        for p in pending:
+            p.future.set_exception(exc)
+
+    def _open_port(self, reset: bool = True):
+        # 1. Otevření portu
+        self._ser = serial.Serial(port=self._port, baudrate=self._baudrate, timeout=self._timeout)
+        if not reset:
+            return
+
+        # 2. HARD RESET ESP32 (Agresivní metoda ala esptool)
+        # Mnoho desek potřebuje specifickou sekvenci DTR/RTS
+        self._ser.dtr = False
+        self._ser.rts = False
+        time.sleep(0.1)
+
+        self._ser.dtr = True
+        self._ser.rts = True
+        time.sleep(0.1)
+
+        self._ser.dtr = False
+        self._ser.rts = False
+        time.sleep(0.2)  # Chvilku počkáme, než ESP nastartuje
+
+    def _close_port(self):
+        if self._ser is not None:
+            try:
+                self._ser.close()
+            except Exception:
+                pass
+            self._ser = None
+
     def _start_reader(self):
         if not self._ser:
             return
         self._running = True
+        self._stop_event.clear()
         self._reader_thread = threading.Thread(target=self._reader_loop, daemon=True)
         self._reader_thread.start()
 
     def _reader_loop(self):
         buffer = b""
-        while self._running and self._ser and self._ser.is_open:
+        while self._running:
             try:
                 chunk = self._ser.read(128)
-                if not chunk:
-                    continue
-                buffer += chunk
-                while b"\n" in buffer:
-                    line, buffer = buffer.split(b"\n", 1)
-                    text = line.decode(errors="ignore").strip()
-                    if text and self._line_callback:
-                        self._line_callback(text)
             except Exception:
                 # V případě odpojení USB za chodu
-                self._running = False
-                break
\ No newline at end of file
+                if not self._running or not self.auto_reconnect or not self._reconnect():
+                    self._running = False
+                    break
+                buffer = b""
+                continue
+
+            if self._pending:
+                self._check_command_timeouts()
+            if not chunk:
+                continue
+            _BYTES_RECEIVED.inc(len(chunk))
+            buffer += chunk
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                _LINES_RECEIVED.inc()
+                text = line.decode(errors="ignore").strip()
+                if self._pending and ('"ack"' in text or '"error"' in text):
+                    msg = parse_json_message(text)
+                    if msg:
+                        self._resolve_pending(msg)
+                if text and self._line_callback:
+                    try:
+                        self._line_callback(text)
+                    except Exception as e:
+                        # Chyba ve zpracování řádku nesmí shodit čtecí vlákno
+                        print(f"Line callback error: {e}")
+
+    def _reconnect(self) -> bool:
+        """
+        Znovuotevře port s rostoucí prodlevou, počká na handshake
+        a oznámí obnovení spojení. Vrací False, pokud byl mezitím zavolán close().
+        """
+        self._close_port()
+        self._fail_pending(ConnectionError("Spojení s ESP32 ztraceno"))
+        _DISCONNECTS.inc()
+        print(f"Spojení s {self._port} ztraceno, zkouším znovu připojit...")
+        if self._on_connection_lost:
+            self._on_connection_lost()
+
+        attempt = 0
+        while self._running:
+            delay = self.RECONNECT_BACKOFF_S[min(attempt, len(self.RECONNECT_BACKOFF_S) - 1)]
+            attempt += 1
+            if self._stop_event.wait(delay):
+                return False
+
+            try:
+                self._open_port()
+            except Exception:
+                self._close_port()
+                continue
+
+            hello = self._wait_for_hello(self.HANDSHAKE_TIMEOUT_S)
+            if not self._running:
+                return False
+            if not self.is_open():
+                continue
+
+            _RECONNECTS.inc()
+            print(f"Spojení s {self._port} obnoveno (pokus {attempt}).")
+            if self._on_connection_restored:
+                self._on_connection_restored(hello)
+            return True
+        return False
+
+    def _wait_for_hello(self, timeout_s: float) -> Optional[dict]:
+        try:
+            return self._read_hello(self._ser, time.time() + timeout_s, lambda: self._running)
+        except Exception:
+            self._close_port()
+            return None
+
+    @staticmethod
+    def _read_hello(ser: serial.Serial, deadline: float, keep_going: Callable[[], bool]) -> Optional[dict]:
+        """Čte řádky, dokud nepřijde "hello" zpráva nebo nevyprší timeout."""
+        buffer = b""
+        while keep_going() and time.time() < deadline:
+            buffer += ser.read(128)
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                msg = parse_json_message(line.decode(errors="ignore").strip())
+                if msg and msg.get("type") == "hello":
+                    return msg
+        return None
@@ -0,0 +1,137 @@
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.alignment import METHOD_LINEAR, AlignedData, align
+
+# Uložená měření (import archivu, dávkový běh) - mimo repozitář, v domovské složce
+SESSIONS_DIR = os.path.join(os.path.expanduser("~"), ".temp_lab", "sessions")
+CATALOG_NAME = "catalog.json"
+
+# Klíč metadat v .npz souboru (sloupce mají prefix, aby nekolidovaly)
+_META_KEY = "__meta__"
+_COLUMN_PREFIX = "col_"
+
+
+def rows_to_columns(rows: Iterable[dict]) -> Dict[str, np.ndarray]:
+    """
+    Převede řádky { "t_s": ..., "T_BME": ..., ... } na sloupce stejné délky.
+    Chybějící hodnota = NaN, pořadí sloupců podle prvního výskytu.
+    """
+    rows = list(rows)
+    keys: Dict[str, None] = {}
+    for row in rows:
+        for key in row:
+            keys.setdefault(key, None)
+
+    columns: Dict[str, np.ndarray] = {}
+    nan = float("nan")
+    for key in keys:
+        columns[key] = np.fromiter((row.get(key, nan) for row in rows), dtype=np.float64, count=len(rows))
+    return columns
+
+
+class Session:
+    """
+    Jedno měření ve sloupcové podobě.
+      - columns: { "t_s": np.ndarray, "T_BME": np.ndarray, ... } - všechny sloupce stejně dlouhé
+      - metadata: volný slovník (zdroj, typ měření, frekvence, ...)
+      - gaps: výpadky spojení [(začátek_s, konec_s), ...]
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], metadata: Optional[dict] = None,
+                 gaps: Optional[List[Tuple[float, float]]] = None):
+        if "t_s" not in columns:
+            raise ValueError("session musí obsahovat sloupec t_s")
+        lengths = {len(col) for col in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("sloupce session nemají stejnou délku")
+
+        # t_s vždy první
+        self.columns: Dict[str, np.ndarray] = {"t_s": np.asarray(columns["t_s"], dtype=np.float64)}
+        for key, col in columns.items():
+            if key != "t_s":
+                self.columns[key] = np.asarray(col, dtype=np.float64)
+        self.metadata = dict(metadata or {})
+        self.gaps = [tuple(g) for g in (gaps or [])]
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict], metadata: Optional[dict] = None,
+                  gaps: Optional[List[Tuple[float, float]]] = None) -> "Session":
+        """Ze seznamu řádků (recorded_data měření)."""
+        columns = rows_to_columns(rows)
+        columns.setdefault("t_s", np.empty(0))
+        return cls(columns, metadata, gaps)
+
+    @property
+    def t_s(self) -> np.ndarray:
+        return self.columns["t_s"]
+
+    @property
+    def channels(self) -> List[str]:
+        return [key for key in self.columns if key != "t_s"]
+
+    def __len__(self) -> int:
+        return len(self.columns["t_s"])
+
+    def duration_s(self) -> float:
+        t = self.t_s
+        return float(t[-1] - t[0]) if len(t) > 1 else 0.0
+
+    def aligned(self, dt: Optional[float] = None, method: str = METHOD_LINEAR,
+                max_gap_s: Optional[float] = None) -> AlignedData:
+        """Kanály na rovnoměrné mřížce s maskami děr (výpadky spojení jsou vždy díra)."""
+        return align(self.columns, dt, method, max_gap_s, gaps=self.gaps)
+
+    def save(self, path: str):
+        """Uloží do .npz (sloupce jako pole, metadata a výpadky jako JSON)."""
+        meta = json.dumps({"metadata": self.metadata, "gaps": self.gaps, "order": list(self.columns)})
+        arrays = {_COLUMN_PREFIX + key: col for key, col in self.columns.items()}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, **{_META_KEY: np.array(meta)}, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "Session":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data[_META_KEY]))
+            columns = {key: data[_COLUMN_PREFIX + key] for key in meta["order"]}
+        return cls(columns, meta.get("metadata"), meta.get("gaps"))
+
+
+def load_catalog(directory: str = SESSIONS_DIR) -> List[dict]:
+    """Seznam uložených session (záznamy viz catalog_entry)."""
+    try:
+        with open(os.path.join(directory, CATALOG_NAME), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return data if isinstance(data, list) else []
+
+
+def save_catalog(entries: List[dict], directory: str = SESSIONS_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, CATALOG_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def catalog_entry(session: Session, session_file: str, **extra) -> dict:
+    """Záznam katalogu: souhrn session bez načítání dat."""
+    t = session.t_s
+    entry = {
+        "session_file": session_file,
+        "rows": len(session),
+        "channels": session.channels,
+        "t_start_s": float(t[0]) if len(t) else None,
+        "duration_s": session.duration_s(),
+        "gaps": len(session.gaps),
+        "saved_at": time.time(),
+    }
+    entry.update(extra)
+    return entry
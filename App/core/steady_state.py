@@ -0,0 +1,238 @@
+import math
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from core.sensors import FILTERED_SUFFIX
+
+
+def _rounded(value: float) -> Optional[float]:
+    return round(value, 5) if math.isfinite(value) else None
+
+
+class _WindowFit:
+    """
+    Klouzavé okno (čas, hodnota) s průběžnými součty pro lineární regresi.
+    Přidání i odebrání vzorku je O(1), součty se občas přepočítají (kumulace zaokrouhlení).
+    Čas se počítá od t_ref, aby součty čtverců nebyly zbytečně velké.
+    """
+
+    __slots__ = ("t_ref", "samples", "n", "st", "sx", "stt", "stx", "sxx", "_updates")
+
+    RECOMPUTE_EVERY = 10_000
+
+    def __init__(self, t_ref: float):
+        self.t_ref = t_ref
+        self.samples: Deque[Tuple[float, float]] = deque()
+        self.clear()
+
+    def clear(self):
+        self.samples.clear()
+        self.n = 0
+        self.st = self.sx = self.stt = self.stx = self.sxx = 0.0
+        self._updates = 0
+
+    def push(self, t: float, x: float):
+        t -= self.t_ref
+        self.samples.append((t, x))
+        self.n += 1
+        self.st += t
+        self.sx += x
+        self.stt += t * t
+        self.stx += t * x
+        self.sxx += x * x
+        self._updates += 1
+
+    def drop_older(self, t_min: float):
+        t_min -= self.t_ref
+        samples = self.samples
+        while samples and samples[0][0] < t_min:
+            t, x = samples.popleft()
+            self.n -= 1
+            self.st -= t
+            self.sx -= x
+            self.stt -= t * t
+            self.stx -= t * x
+            self.sxx -= x * x
+            self._updates += 1
+        if self._updates >= self.RECOMPUTE_EVERY:
+            self._recompute()
+
+    def _recompute(self):
+        samples = list(self.samples)
+        self.clear()
+        self.samples.extend(samples)
+        self.n = len(samples)
+        for t, x in samples:
+            self.st += t
+            self.sx += x
+            self.stt += t * t
+            self.stx += t * x
+            self.sxx += x * x
+
+    @property
+    def span(self) -> float:
+        return self.samples[-1][0] - self.samples[0][0] if self.n > 1 else 0.0
+
+    def fit(self) -> Optional[Tuple[float, float, float]]:
+        """(směrnice za sekundu, hodnota přímky v posledním čase, směrodatná odchylka reziduí)."""
+        n = self.n
+        if n < 3:
+            return None
+        mean_t = self.st / n
+        mean_x = self.sx / n
+        var_t = self.stt / n - mean_t * mean_t
+        if var_t <= 0:
+            return None
+        cov = self.stx / n - mean_t * mean_x
+        var_x = max(0.0, self.sxx / n - mean_x * mean_x)
+        slope = cov / var_t
+        # Rozptyl kolem přímky = rozptyl hodnot minus část vysvětlená trendem
+        resid_var = max(0.0, var_x - slope * cov) * n / (n - 2)
+        last_t = self.samples[-1][0]
+        return slope, mean_x + slope * (last_t - mean_t), math.sqrt(resid_var)
+
+
+class ChannelSteadiness:
+    """Stav jednoho kanálu: poslední odhad trendu a šumu a od kdy je kanál ustálený."""
+
+    __slots__ = ("window", "slope", "std", "stable_since", "last_t")
+
+    def __init__(self, t_ref: float):
+        self.window = _WindowFit(t_ref)
+        self.slope = math.nan       # °C/min
+        self.std = math.nan
+        self.stable_since: Optional[float] = None
+        self.last_t = t_ref
+
+
+class SteadyStateDetector:
+    """
+    Online detekce ustáleného stavu pro každý sledovaný kanál.
+
+    V klouzavém okně `window_s` se průběžně počítá regresní přímka:
+      - test směrnice: |směrnice| <= max_slope (jednotka/min)
+      - test rozptylu: směrodatná odchylka kolem přímky <= max_std
+    Kanál je ustálený, pokud okno pokrývá aspoň window_s a oba testy platí. Ustálený stav
+    měření = všechny sledované kanály ustálené nepřetržitě hold_s sekund.
+    Bod změny: vzorek, který se od přímky odchýlí o víc než CHANGE_SIGMA odchylek, okno vyprázdní -
+    staré klidné vzorky pak nemaskují nový přechodový děj.
+    update() vrací True jednou - v okamžiku, kdy je ustálený stav poprvé splněn.
+    """
+
+    CHANGE_SIGMA = 6.0
+    # Spodní mez odchylky pro test bodu změny (kvantování senzorů, např. 1/16 °C)
+    MIN_CHANGE_STD = 0.05
+    # Hystereze: ustálený kanál přestane být ustálený až při překročení mezí o tento násobek
+    UNSTABLE_MARGIN = 1.5
+
+    def __init__(self, window_s: float = 120.0, hold_s: float = 60.0, max_slope: float = 0.02,
+                 max_std: float = 0.1, channels: Optional[Iterable[str]] = None):
+        if window_s <= 0 or hold_s < 0 or max_slope <= 0 or max_std <= 0:
+            raise ValueError("window_s, max_slope a max_std musí být kladné, hold_s nezáporné")
+        self.window_s = window_s
+        self.hold_s = hold_s
+        self.max_slope = max_slope
+        self.max_std = max_std
+        self.channels = set(channels) if channels else None
+        self._states: Dict[str, ChannelSteadiness] = {}
+        self._all_stable_since: Optional[float] = None
+        self.reached_t: Optional[float] = None
+        # Průběh: (čas_s, kanál, "stable" / "unstable" / "change")
+        self.events: List[Tuple[float, str, str]] = []
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SteadyStateDetector":
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        return {"window_s": self.window_s, "hold_s": self.hold_s, "max_slope": self.max_slope,
+                "max_std": self.max_std, "channels": sorted(self.channels) if self.channels else None}
+
+    def reset(self):
+        """Nová časová základna (start, výpadek) - okna se zahodí, čeká se znovu."""
+        self._states = {}
+        self._all_stable_since = None
+
+    @property
+    def is_steady(self) -> bool:
+        return self.reached_t is not None
+
+    def channel_states(self) -> Dict[str, ChannelSteadiness]:
+        return dict(self._states)
+
+    def _watched(self, key: str) -> bool:
+        if self.channels is not None:
+            return key in self.channels
+        return key.startswith("T_") and not key.endswith(FILTERED_SUFFIX)
+
+    def _update_channel(self, t_s: float, key: str, x: float) -> bool:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = ChannelSteadiness(t_s)
+        window = state.window
+        state.last_t = t_s
+
+        fit = window.fit()
+        if fit is not None:
+            slope, predicted, std = fit
+            if abs(x - predicted) > self.CHANGE_SIGMA * max(std, self.MIN_CHANGE_STD):
+                window.clear()
+                self._log(t_s, key, "change")
+        window.push(t_s, x)
+        window.drop_older(t_s - self.window_s)
+
+        fit = window.fit()
+        stable = False
+        if fit is not None:
+            slope, _, std = fit
+            state.slope = slope * 60.0
+            state.std = std
+            margin = self.UNSTABLE_MARGIN if state.stable_since is not None else 1.0
+            # Okno musí pokrývat celou délku (jinak by pár vzorků vypadalo ustáleně)
+            stable = (window.span >= self.window_s * 0.95
+                      and abs(state.slope) <= self.max_slope * margin and std <= self.max_std * margin)
+
+        if stable and state.stable_since is None:
+            state.stable_since = t_s
+            self._log(t_s, key, "stable")
+        elif not stable and state.stable_since is not None:
+            state.stable_since = None
+            self._log(t_s, key, "unstable")
+        return stable
+
+    def _log(self, t_s: float, key: str, kind: str):
+        self.events.append((round(t_s, 3), key, kind))
+
+    def update(self, t_s: float, values: Dict[str, float]) -> bool:
+        for key, x in values.items():
+            if not self._watched(key) or not isinstance(x, (int, float)) or not math.isfinite(x):
+                continue
+            self._update_channel(t_s, key, float(x))
+
+        if not self._states:
+            return False
+        if self.channels is not None and len(self._states) < len(self.channels):
+            # Některý vybraný kanál ještě nedorazil
+            return False
+        if any(state.stable_since is None for state in self._states.values()):
+            self._all_stable_since = None
+            return False
+        if self._all_stable_since is None:
+            self._all_stable_since = t_s
+        if self.reached_t is None and t_s - self._all_stable_since >= self.hold_s:
+            self.reached_t = t_s
+            return True
+        return False
+
+    def summary(self) -> dict:
+        """Stav pro metadata session."""
+        return {
+            "settings": self.to_dict(),
+            "reached_t_s": self.reached_t,
+            "channels": {
+                key: {"slope_per_min": _rounded(state.slope), "std": _rounded(state.std),
+                      "stable_since_s": state.stable_since}
+                for key, state in self._states.items()
+            },
+            "events": [list(event) for event in self.events],
+        }
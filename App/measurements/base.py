@@ -1,9 +1,15 @@
+import threading
 import time
-import csv
 from abc import ABC, abstractmethod
-from typing import Callable, Optional, Set, List
+from typing import Callable, Dict, Optional, Set, List, Tuple
+
+import numpy as np
 
 from core.serial_manager import SerialManager
+from core.sensors import base_channel
+from core.session import Session, catalog_entry, rows_to_columns
+from core.csv_export import DEFAULT_DECIMAL, DEFAULT_DELIMITER, ExportCancelled, export_columns
+from core.sample_store import SampleSnapshot, SampleStore
 
 
 class BaseMeasurement(ABC):
@@ -14,11 +20,19 @@ class BaseMeasurement(ABC):
       - univerzální export do CSV
     """
 
+    # Limit paměti pro uložená data (MB), starší data se pak odkládají na disk. None = bez limitu.
+    MEMORY_BUDGET_MB: Optional[float] = 256.0
+    # Starší vzorky držet v paměti zakódované (bezeztrátově, core.chunk_codec)
+    COMPRESS_HISTORY = True
+    # Počet desetinných míst v CSV pro konkrétní sloupce (doplňuje core.csv_export.COLUMN_PRECISION)
+    EXPORT_PRECISION: Dict[str, int] = {}
+
     def __init__(self, serial_mgr: SerialManager):
         self.serial = serial_mgr
         self._on_data: Optional[Callable[[float, dict], None]] = None
         self._on_progress: Optional[Callable[[float], None]] = None
         self._on_finished: Optional[Callable[[], None]] = None
+        self._on_error: Optional[Callable[[str], None]] = None
         self._running = False
         self._t0 = 0.0
         
@@ -26,22 +40,42 @@ class BaseMeasurement(ABC):
         # Pokud měření data neukládá, zůstane toto None nebo prázdné
         self.recorded_data: Optional[List[dict]] = None
 
+        # Vybrané kanály (None = všechny). Ostatní se vůbec nedekódují ani neukládají.
+        self.allowed_channels: Optional[Set[str]] = None
+
+        # Výpadky spojení během měření jako dvojice (začátek, konec) v sekundách
+        self.gaps: List[Tuple[float, float]] = []
+        # Změny vzorkovací frekvence během měření jako dvojice (čas_s, frekvence_hz)
+        self.rate_changes: List[Tuple[float, float]] = []
+        # Výsledek detekce ustáleného stavu (SteadyStateDetector.summary), pokud byla zapnutá
+        self.steady_state: Optional[dict] = None
+
     def set_callbacks(
         self,
         on_data: Callable[[float, dict], None],
         on_progress: Callable[[float], None],
         on_finished: Callable[[], None],
+        on_error: Optional[Callable[[str], None]] = None,
     ):
         self._on_data = on_data
         self._on_progress = on_progress
         self._on_finished = on_finished
+        self._on_error = on_error
+
+    def set_channel_filter(self, allowed: Optional[Set[str]]):
+        self.allowed_channels = set(allowed) if allowed else None
 
     def start(self):
         if self._running:
             return
         self._t0 = time.time()
         self._running = True
-        self.on_start()
+        try:
+            self.on_start()
+        except Exception:
+            # Nepovedený start nesmí nechat měření "běžící"
+            self._running = False
+            raise
 
     def stop(self):
         if not self._running:
@@ -65,24 +99,73 @@ class BaseMeasurement(ABC):
         if self._on_progress:
             self._on_progress(max(0.0, min(1.0, fraction)))
 
-    def export_to_csv(self, filename: str, allowed_sensors: Optional[Set[str]] = None) -> bool:
+    def emit_error(self, message: str):
+        print(message)
+        if self._on_error:
+            self._on_error(message)
+
+    def snapshot(self) -> Optional[SampleSnapshot]:
+        """
+        Konzistentní pohled na data (i běžícího měření) pro export, analýzu a externí čtenáře.
+        Nic se nekopíruje a zápis nových vzorků se neblokuje. None = měření data neukládá do SampleStore.
+        """
+        if isinstance(self.recorded_data, SampleStore):
+            return self.recorded_data.snapshot()
+        return None
+
+    def to_session(self, **metadata) -> Session:
+        """Uložená data jako sloupcová session (chybějící hodnoty = NaN)."""
+        meta = {"measurement": getattr(self, "DISPLAY_NAME", type(self).__name__), "started_at": self._t0}
+        if self.rate_changes:
+            meta["rate_changes"] = [list(change) for change in self.rate_changes]
+        if self.steady_state:
+            meta["steady_state"] = self.steady_state
+        meta.update(metadata)
+        snapshot = self.snapshot()
+        if snapshot is not None:
+            columns = snapshot.columns()
+            columns.setdefault("t_s", np.empty(0))
+            return Session(columns, meta, self.gaps)
+        return Session.from_rows(self.recorded_data or [], meta, self.gaps)
+
+    def save_session(self, path: str, session_file: str, **metadata) -> Optional[dict]:
+        """Uloží data jako session (.npz) a vrátí záznam katalogu, při chybě None."""
+        try:
+            session = self.to_session(**metadata)
+            session.save(path)
+            return catalog_entry(session, session_file, **metadata)
+        except Exception as e:
+            print(f"Session se nepodařilo uložit: {e}")
+            return None
+
+    def export_to_csv(self, filename: str, allowed_sensors: Optional[Set[str]] = None,
+                      delimiter: str = DEFAULT_DELIMITER, decimal: str = DEFAULT_DECIMAL,
+                      progress: Optional[Callable[[float], None]] = None,
+                      cancel: Optional[threading.Event] = None) -> bool:
         """
         Univerzální export uložených dat do CSV.
-        - Používá středník jako oddělovač (Excel friendly).
-        - Převádí desetinné tečky na čárky.
+        - Používá středník jako oddělovač a desetinnou čárku (Excel friendly), lze změnit.
+        - Čísla se formátují po celých sloupcích s pevným počtem desetinných míst.
         - Filtruje sloupce podle allowed_sensors (pokud je zadáno).
+        - progress(0..1) hlásí postup, nastavený cancel export přeruší (vyhodí ExportCancelled).
         """
         if not self.recorded_data:
             return False
         
         try:
-            # 1. Zjistíme všechny dostupné klíče z prvního řádku
-            all_keys = list(self.recorded_data[0].keys())
+            # 1. Data po sloupcích (odložené bloky SampleStore se načtou z disku)
+            snapshot = self.snapshot()
+            if snapshot is not None:
+                # Běžící měření: jen data do tohoto okamžiku, zápis dalších vzorků pokračuje
+                columns = snapshot.columns()
+            else:
+                columns = rows_to_columns(self.recorded_data)
+            all_keys = list(columns)
             
             # 2. Filtrace sloupců
             if allowed_sensors:
-                # Vždy zachováme 't_s', zbytek filtrujeme
-                fieldnames = [k for k in all_keys if k == "t_s" or k in allowed_sensors]
+                # Vždy zachováme 't_s', zbytek filtrujeme (odvozené kanály podle zdroje)
+                fieldnames = [k for k in all_keys if k == "t_s" or base_channel(k) in allowed_sensors]
             else:
                 fieldnames = all_keys
             
@@ -91,28 +174,23 @@ class BaseMeasurement(ABC):
                 fieldnames.remove("t_s")
                 fieldnames.insert(0, "t_s")
             
-            # 4. Zápis do souboru
-            with open(filename, mode='w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=';')
-                writer.writeheader()
-                
-                for row in self.recorded_data:
-                    # Vytvoříme filtrovaný řádek s formátovanými čísly
-                    out_row = {}
-                    for k in fieldnames:
-                        if k in row:
-                            val = row[k]
-                            if isinstance(val, float):
-                                # Trik pro český Excel: 10.5 -> 10,5
-                                out_row[k] = str(val).replace('.', ',')
-                            else:
-                                out_row[k] = val
-                    writer.writerow(out_row)
-            return True
+            # 4. Zápis do souboru po velkých blocích
+            return export_columns(filename, columns, fieldnames, delimiter, decimal,
+                                  precision=self.EXPORT_PRECISION, progress=progress, cancel=cancel)
+        except ExportCancelled:
+            raise
         except Exception as e:
             print(f"Export error: {e}")
             return False
 
+    def on_connection_lost(self):
+        """Volá se z čtecího vlákna, když se ztratí spojení s ESP32."""
+        pass
+
+    def on_connection_restored(self):
+        """Volá se z čtecího vlákna po znovupřipojení a handshake."""
+        pass
+
     @abstractmethod
     def on_start(self):
         ...
@@ -0,0 +1,157 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+import numpy as np
+
+from measurements.base import BaseMeasurement
+from core.burst import (BURST_CHANNELS, MAX_RATE_HZ, MAX_VALUES, MAX_WINDOW_S,
+                        BurstAssembler, BurstError, burst_command)
+from core.parser import parse_json_message
+from core.sample_store import SampleStore
+
+
+class BurstMeasurement(BaseMeasurement):
+    """
+    Rychlý záznam interního ADC (příkaz BURST).
+    ESP32 vzorkuje vybrané kanály do RAM po dobu DURATION_S a pak pošle celý blok najednou.
+    Blok se převede rovnou na pole (SampleStore.append_columns), graf dostane náhled.
+    """
+
+    DISPLAY_NAME = "Rychlý záznam ADC (burst)"
+    DURATION_S = 1.0
+    SAMPLE_RATE_HZ = 5000.0
+    NO_DATA_TIMEOUT_S = 5.0
+    # Náhled do grafu: min/max z úseků, aby krátké špičky nezmizely
+    PREVIEW_POINTS = 2000
+    # Krok času jsou desítky µs, ADC vrací celé mV
+    EXPORT_PRECISION = {"t_s": 6, "V_ESP_R": 0, "V_ESP_NTC": 0}
+
+    def __init__(self, serial_mgr, duration_s: Optional[float] = None, rate_hz: Optional[float] = None, **kwargs):
+        # Volby průběžného měření (adaptive_rate, steady_stop, PWM...) se tu neuplatní
+        super().__init__(serial_mgr)
+        if duration_s is not None:
+            self.DURATION_S = float(duration_s)
+        if rate_hz is not None:
+            self.SAMPLE_RATE_HZ = float(rate_hz)
+        self._assembler = BurstAssembler()
+        self._stop_flag = False
+        self._capture_started = 0.0
+        self._capture_s = 0.0
+        self._last_data_time = 0.0
+        self._worker_thread: Optional[threading.Thread] = None
+        # Parametry a průběh záznamu pro metadata session
+        self._burst_info: dict = {}
+        self.recorded_data = SampleStore(self.MEMORY_BUDGET_MB, self.COMPRESS_HISTORY)
+
+    def _channels(self):
+        if self.allowed_channels is None:
+            return list(BURST_CHANNELS)
+        return [key for key in BURST_CHANNELS if key in self.allowed_channels]
+
+    def on_start(self):
+        if not self.serial.is_open():
+            self.stop()
+            return
+        channels = self._channels()
+        if not channels:
+            self.emit_error(f"Rychlý záznam umí jen kanály {', '.join(BURST_CHANNELS)} - žádný není vybrán.")
+            self.stop()
+            return
+
+        rate = min(self.SAMPLE_RATE_HZ, MAX_RATE_HZ)
+        duration = min(self.DURATION_S, MAX_WINDOW_S)
+        samples = min(int(round(duration * rate)), MAX_VALUES // len(channels))
+        if samples < 2:
+            self.emit_error("Rychlý záznam: příliš krátké okno.")
+            self.stop()
+            return
+
+        self._stop_flag = False
+        self._assembler.reset()
+        self.recorded_data = SampleStore(self.MEMORY_BUDGET_MB, self.COMPRESS_HISTORY)
+        self._capture_s = samples / rate
+        self._capture_started = self._last_data_time = time.time()
+        self._burst_info = {"burst_rate_hz": rate, "burst_samples": samples}
+
+        line = burst_command(rate, samples, channels)
+        print(f"Rychlý záznam: {samples} vzorků × {len(channels)} kanálů při {rate:g} Hz")
+        future = self.serial.send_command(line)
+        future.add_done_callback(lambda f: self._on_burst_ack(line, f))
+
+        self._worker_thread = threading.Thread(target=self._watchdog_loop, daemon=True)
+        self._worker_thread.start()
+
+    def _on_burst_ack(self, line: str, future: Future):
+        exc = future.exception()
+        if exc is not None and self.is_running():
+            self.emit_error(f"Příkaz '{line}' selhal: {exc}")
+            self.stop()
+
+    def on_stop(self):
+        self._stop_flag = True
+
+    def handle_line(self, line: str):
+        if not line.startswith("{"):
+            return
+        msg = parse_json_message(line)
+        if msg is None or not str(msg.get("type", "")).startswith("burst"):
+            return
+        self._last_data_time = time.time()
+        try:
+            columns = self._assembler.feed(msg)
+        except BurstError as e:
+            self.emit_error(f"Rychlý záznam: {e}")
+            self.stop()
+            return
+        if columns is None:
+            return
+
+        header = self._assembler.header
+        if header.get("late"):
+            print(f"Rychlý záznam: {header['late']} vzorků se zpožděním (frekvence je na hranici ADC)")
+        self._burst_info["burst_period_us"] = header.get("period_us")
+        self._burst_info["burst_late"] = header.get("late", 0)
+        self.recorded_data.append_columns(columns)
+        self._emit_preview(columns)
+        self.emit_progress(1.0)
+        self.stop()
+
+    def _emit_preview(self, columns: Dict[str, np.ndarray]):
+        t = columns["t_s"]
+        n = len(t)
+        buckets = max(1, min(n, self.PREVIEW_POINTS // 2))
+        edges = np.linspace(0, n, buckets + 1).astype(int)
+        for key, values in columns.items():
+            if key == "t_s":
+                continue
+            for lo, hi in zip(edges[:-1], edges[1:]):
+                if hi <= lo:
+                    continue
+                i_min = lo + int(np.argmin(values[lo:hi]))
+                i_max = lo + int(np.argmax(values[lo:hi]))
+                for i in sorted({i_min, i_max}):
+                    self.emit_data(float(t[i]), {key: float(values[i])})
+
+    def to_session(self, **metadata):
+        return super().to_session(**{**self._burst_info, **metadata})
+
+    def _watchdog_loop(self):
+        while not self._stop_flag and self.is_running():
+            now = time.time()
+            expected = self._assembler.expected_bytes
+            if expected:
+                # Výpis: podle přijatých bajtů
+                self.emit_progress(0.5 + 0.5 * self._assembler.received_bytes / expected)
+            else:
+                # Záznam: podle času (ESP mezitím neposílá nic)
+                self.emit_progress(0.5 * min(1.0, (now - self._capture_started) / self._capture_s))
+
+            # Během záznamu ESP mlčí, timeout se počítá až od jeho konce
+            quiet_since = max(self._last_data_time, self._capture_started + self._capture_s)
+            if now - quiet_since > self.NO_DATA_TIMEOUT_S:
+                self.emit_error("Rychlý záznam: ESP32 neposlalo data (starší firmware bez příkazu BURST?)")
+                self.stop()
+                break
+            time.sleep(0.1)
@@ -1,4 +1,3 @@
-import time
 from measurements.streaming_measurement import StreamingTempMeasurement
 
 class PartOneMeasurement(StreamingTempMeasurement):
@@ -6,23 +5,23 @@ class PartOneMeasurement(StreamingTempMeasurement):
     DURATION_S = 3600.0 
     SAMPLE_RATE_HZ = 1.0
 
-    def __init__(self, serial_mgr, pwm_channel=0, pwm_value=0):
-        # Předáme kwargs dál (i když zde je explicitně pwm_channel)
-        super().__init__(serial_mgr)
+    def __init__(self, serial_mgr, pwm_channel=0, pwm_value=0, **kwargs):
+        # Předáme kwargs dál (duration_s, rate_hz)
+        super().__init__(serial_mgr, **kwargs)
         
         self._pwm_channel = pwm_channel
         self._pwm_value = pwm_value
         
         # Poznámka: self.recorded_data se inicializuje už v StreamingTempMeasurement
 
-    def on_start(self):
+    def _configure_device(self):
         """
         Specifická logika pro start Části 1:
-        Nastavíme PWM a pak pustíme standardní měření.
+        Nastavíme PWM a pak standardní nastavení měření.
+        Volá se i po znovupřipojení, aby se obnovil výkon topení/chlazení.
         """
         if self.serial.is_open():
             print(f"PartOne: Nastavuji PWM CH{self._pwm_channel} -> {self._pwm_value}%")
-            self.serial.write_line(f"SET PWM {self._pwm_channel} {self._pwm_value}")
-            time.sleep(0.1)
+            self._send_command(f"SET PWM {self._pwm_channel} {self._pwm_value}")
             
-        super().on_start()
\ No newline at end of file
+        super()._configure_device()
\ No newline at end of file
@@ -1,32 +1,91 @@
 import threading
 import time
-from typing import Optional
+from concurrent.futures import Future
+from typing import Dict, List, Optional
 
 from measurements.base import BaseMeasurement
-from core.parser import parse_json_message, extract_data_values
+from core.parser import LineDecoder, extract_data_values
+from core.sensors import channel_mask
+from core.filters import ChannelFilterBank, FilterSpec
+from core.sample_store import SampleStore
+from core.adaptive_rate import AdaptiveRateController
+from core.steady_state import SteadyStateDetector
+from core.metrics import REGISTRY
+
+_PARSE_ERRORS = REGISTRY.counter("temp_lab_parse_errors_total", "Řádky, které nešlo rozpoznat jako zprávu")
+_DEVICE_ERRORS = REGISTRY.counter("temp_lab_device_errors_total", "Chybové zprávy hlášené ESP32")
+_SAMPLES = REGISTRY.counter("temp_lab_samples_total", "Uložené vzorky měření")
+_CHANNEL_AGE = REGISTRY.gauge("temp_lab_channel_last_seen_age_seconds",
+                              "Stáří poslední hodnoty kanálu", ("channel",))
+# Čas poslední hodnoty každého kanálu (metrika stáří se počítá až při stažení).
+# Sdílený pro všechna měření - callback metriky tak nedrží instanci měření ani jeho data.
+_LAST_SEEN: Dict[str, float] = {}
 
 
 class StreamingTempMeasurement(BaseMeasurement):
     """
     Měření přes JSON protokol.
-    Start: Pošle "SET RATE" a pak "START".
+    Start: Pošle "SET RATE" a pak "START" (bez čekání, potvrzení hlídá SerialManager).
     Stop: Pošle "STOP".
-    Data: Parsuje JSON, posílá do grafu a UKLÁDÁ PRO EXPORT.
+    Data: Parsuje JSON (nebo legacy text starších firmware), posílá do grafu a UKLÁDÁ PRO EXPORT.
     """
 
     DURATION_S = 10.0
     SAMPLE_RATE_HZ = 2.0  # Defaultní frekvence (lze přepsat v potomcích)
     NO_DATA_TIMEOUT_S = 5.0
+    # Adaptivní vzorkování: frekvence se mění podle dynamiky teplot (SET RATE 0,1-10 Hz)
+    ADAPTIVE_RATE = False
+    # Změna teploty mezi vzorky, o kterou adaptivní režim usiluje (°C)
+    ADAPTIVE_RESOLUTION = 0.1
+    # Ukončit měření dřív, jakmile jsou všechny teploty ustálené (parametry SteadyStateDetector)
+    STEADY_STOP = False
+    STEADY_STATE: Dict[str, float] = {"window_s": 120.0, "hold_s": 60.0, "max_slope": 0.02, "max_std": 0.1}
+
+    # Proudové filtry { vzor klíče: [(typ, parametry), ...] }, výsledek jako <klíč>_filt.
+    # Interní ADC ESP32 je zašuměné -> medián proti špičkám + exponenciální vyhlazení.
+    FILTERS: Dict[str, List[FilterSpec]] = {
+        "V_ESP_*": [("median", {"window": 5}), ("ema", {"alpha": 0.3})],
+    }
 
-    def __init__(self, serial_mgr, **kwargs):
+    def __init__(self, serial_mgr, duration_s: Optional[float] = None, rate_hz: Optional[float] = None,
+                 adaptive_rate: Optional[bool] = None, steady_stop=None, **kwargs):
         super().__init__(serial_mgr)
+        # Volitelné přepsání výchozí délky a frekvence třídy (dávkové měření)
+        if duration_s is not None:
+            self.DURATION_S = float(duration_s)
+        if rate_hz is not None:
+            self.SAMPLE_RATE_HZ = float(rate_hz)
+        if adaptive_rate is not None:
+            self.ADAPTIVE_RATE = bool(adaptive_rate)
+        # steady_stop: True = výchozí parametry, dict = vlastní (window_s, hold_s, max_slope, max_std, channels)
+        if isinstance(steady_stop, dict):
+            self.STEADY_STOP = True
+            self.STEADY_STATE = {**self.STEADY_STATE, **steady_stop}
+        elif steady_stop is not None:
+            self.STEADY_STOP = bool(steady_stop)
+        # Aktuální frekvence zařízení (v adaptivním režimu se mění za běhu)
+        self._rate_hz = self.SAMPLE_RATE_HZ
+        self._rate_ctrl: Optional[AdaptiveRateController] = None
+        if self.ADAPTIVE_RATE:
+            self._rate_ctrl = AdaptiveRateController(self.SAMPLE_RATE_HZ, self.ADAPTIVE_RESOLUTION)
+        # Chybné parametry (neznámý klíč, záporné okno) se ohlásí hned, ne až při startu
+        self._steady: Optional[SteadyStateDetector] = (
+            SteadyStateDetector(**self.STEADY_STATE) if self.STEADY_STOP else None
+        )
         self._stop_flag = False
         self._worker_thread: Optional[threading.Thread] = None
         self._t0_ms: Optional[float] = None
         self._last_data_time = 0.0
         self._last_ping_time = 0.0 
+        # Posun časové osy po znovupřipojení (ESP po resetu začíná t_ms od nuly)
+        self._t_offset_s = 0.0
+        self._gap_start_s: Optional[float] = None
+        self._filter_bank = ChannelFilterBank(self.FILTERS)
+        # Formát řádků (JSON / legacy) se rozpozná jednou pro celý proud
+        self._decoder = LineDecoder()
         
-        self.recorded_data = []
+        # Uložená data s limitem paměti (starší bloky se odkládají do dočasného souboru)
+        self.recorded_data = SampleStore(self.MEMORY_BUDGET_MB, self.COMPRESS_HISTORY)
 
     def on_start(self):
         """
@@ -37,59 +96,168 @@ class StreamingTempMeasurement(BaseMeasurement):
             return
 
         self._stop_flag = False
-        self.recorded_data = [] 
+        self.recorded_data = SampleStore(self.MEMORY_BUDGET_MB, self.COMPRESS_HISTORY)
+        self.gaps = []
+        self.rate_changes = []
+        self._rate_hz = self.SAMPLE_RATE_HZ
+        if self._rate_ctrl:
+            self._rate_ctrl.reset(self.SAMPLE_RATE_HZ)
+            self._rate_hz = self._rate_ctrl.rate_hz
+        self.steady_state = None
+        if self._steady:
+            self._steady = SteadyStateDetector.from_dict(self._steady.to_dict())
         
         self._t0_ms = None 
+        self._t_offset_s = 0.0
+        self._gap_start_s = None
+        self._filter_bank.reset()
+        self._decoder.reset()
         self._last_data_time = time.time()
         self._last_ping_time = time.time()
 
-        # --- NOVÉ: Odeslání vzorkovací frekvence ---
-        if hasattr(self, "SAMPLE_RATE_HZ") and self.SAMPLE_RATE_HZ > 0:
-            print(f"Nastavuji vzorkovací frekvenci: {self.SAMPLE_RATE_HZ} Hz")
-            self.serial.write_line(f"SET RATE {self.SAMPLE_RATE_HZ}")
-            time.sleep(0.1) # Krátká pauza pro zpracování
-        # -------------------------------------------
+        self._configure_device()
 
         print("Odesílám příkaz START...")
-        self.serial.write_line("START")
+        self._send_command("START")
         
         self._worker_thread = threading.Thread(target=self._watchdog_loop, daemon=True)
         self._worker_thread.start()
 
+    def _configure_device(self):
+        """
+        Pošle nastavení měření do ESP32 (před START i po znovupřipojení).
+        Potomci mohou rozšířit (např. o SET PWM).
+        """
+        if self._rate_hz > 0:
+            print(f"Nastavuji vzorkovací frekvenci: {self._rate_hz} Hz")
+            self._send_command(f"SET RATE {self._rate_hz}")
+
+        # Výběr kanálů přímo v ESP32 (nečte ani neposílá vypnuté senzory)
+        mask = channel_mask(self.allowed_channels) if self.allowed_channels else -1
+        if mask != 0:
+            line = f"SET CHANNELS {mask}" if mask > 0 else "SET CHANNELS ALL"
+            future = self.serial.send_command(line)
+            future.add_done_callback(lambda f: self._on_channels_done(line, f))
+
+    def _on_channels_done(self, line: str, future: Future):
+        # Starší firmware příkaz nezná - filtr pak platí jen na straně PC
+        if future.exception() is not None and self.is_running():
+            print(f"'{line}' nepotvrzeno ({future.exception()}), filtruji jen v PC")
+
+    def _send_command(self, line: str) -> Future:
+        """Odešle příkaz přes frontu SerialManageru a ohlásí, pokud selže."""
+        future = self.serial.send_command(line)
+        future.add_done_callback(lambda f: self._on_command_done(line, f))
+        return future
+
+    def _on_command_done(self, line: str, future: Future):
+        exc = future.exception()
+        if exc is None or not self.is_running():
+            return
+        if isinstance(exc, ConnectionError):
+            # Výpadek spojení řeší znovupřipojení, příkazy se pak pošlou znovu
+            return
+        self.emit_error(f"Příkaz '{line}' selhal: {exc}")
+        if line == "START":
+            self.stop()
+
+    def on_connection_lost(self):
+        if not self.is_running() or self._gap_start_s is not None:
+            return
+        self._gap_start_s = self._last_t_s()
+        print(f"Výpadek spojení v čase {self._gap_start_s:.1f} s")
+
+    def on_connection_restored(self):
+        if not self.is_running():
+            return
+        gap_end_s = self.now_s()
+        gap_start_s = self._gap_start_s if self._gap_start_s is not None else gap_end_s
+        self.gaps.append((round(gap_start_s, 3), round(gap_end_s, 3)))
+        self._gap_start_s = None
+
+        # ESP se při znovupřipojení resetuje -> nová časová základna
+        self._t0_ms = None
+        self._t_offset_s = gap_end_s
+        self._last_data_time = time.time()
+        # Filtry nesmí vyhlazovat přes výpadek
+        self._filter_bank.reset()
+        if self._rate_ctrl:
+            # Po výpadku se pokračuje aktuální frekvencí, odhady dynamiky začínají znovu
+            self._rate_ctrl.reset()
+        if self._steady:
+            # Okna nesmí spojit data z obou stran výpadku
+            self._steady.reset()
+
+        print(f"Obnovuji měření po výpadku {gap_start_s:.1f}-{gap_end_s:.1f} s")
+        self._configure_device()
+        self._send_command("START")
+
+    def _last_t_s(self) -> float:
+        if self.recorded_data:
+            return self.recorded_data[-1]["t_s"]
+        return self.now_s()
+
     def on_stop(self):
         self._stop_flag = True
+        if self._steady:
+            self.steady_state = self._steady.summary()
         if self.serial.is_open():
             print("Odesílám příkaz STOP...")
-            self.serial.write_line("STOP")
+            self.serial.send_command("STOP")
 
     def handle_line(self, line: str):
-        msg = parse_json_message(line)
-        if msg is None: return
+        msg = self._decoder.decode(line)
+        if msg is None:
+            _PARSE_ERRORS.inc()
+            return
 
         if msg.get("type") == "error":
+            _DEVICE_ERRORS.inc()
             print(f"-> ESP HLÁSÍ CHYBU: {msg.get('msg')}")
             return
         
         if msg.get("type") == "ack": return
 
-        data = extract_data_values(msg)
+        data = extract_data_values(msg, self.allowed_channels)
         if not data: return
 
-        self._last_data_time = time.time()
+        now = self._last_data_time = time.time()
+        for key in data:
+            if key not in _LAST_SEEN:
+                _CHANNEL_AGE.labels(key).set_function(lambda k=key: time.time() - _LAST_SEEN[k])
+            _LAST_SEEN[key] = now
 
         t_ms = msg.get("t_ms")
         if isinstance(t_ms, (int, float)):
             if self._t0_ms is None:
                 self._t0_ms = float(t_ms)
-            t_s = max(0.0, (float(t_ms) - self._t0_ms) / 1000.0)
+            t_s = self._t_offset_s + max(0.0, (float(t_ms) - self._t0_ms) / 1000.0)
         else:
             t_s = self.now_s()
 
+        if self._filter_bank:
+            data.update(self._filter_bank.process_sample(t_s, data))
+
         row = {"t_s": round(t_s, 3), **data}
         self.recorded_data.append(row)
+        _SAMPLES.inc()
+
+        if self._rate_ctrl:
+            self._update_rate(row["t_s"], data)
+        if self._steady and self._steady.update(row["t_s"], data):
+            print(f"Ustálený stav v čase {t_s:.1f} s, měření končí")
 
         self.emit_data(t_s, data)
 
+    def _update_rate(self, t_s: float, data: dict):
+        new_rate = self._rate_ctrl.update(t_s, data)
+        if new_rate is None or new_rate == self._rate_hz:
+            return
+        print(f"Adaptivní vzorkování: {self._rate_hz} -> {new_rate} Hz (t = {t_s:.1f} s)")
+        self._rate_hz = new_rate
+        self.rate_changes.append((t_s, new_rate))
+        self._send_command(f"SET RATE {new_rate}")
+
     def _watchdog_loop(self):
         while not self._stop_flag and self.is_running():
             now = time.time()
@@ -108,5 +276,10 @@ class StreamingTempMeasurement(BaseMeasurement):
             if elapsed >= self.DURATION_S:
                 self.stop()
                 break
+
+            if self._steady and self._steady.is_steady:
+                # Zastavení z tohoto vlákna (stejně jako po uplynutí DURATION_S)
+                self.stop()
+                break
                 
             time.sleep(0.1)
\ No newline at end of file
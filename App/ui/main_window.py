@@ -1,12 +1,21 @@
+import math
+import threading
 from typing import Optional, Set
-from PySide6.QtCore import Slot, QTimer, Signal
+from PySide6.QtCore import Slot, QTimer, Signal, QLocale, Qt
 from PySide6.QtWidgets import (
-    QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QMessageBox, QFileDialog
+    QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QMessageBox, QFileDialog, QProgressDialog
 )
 
 from core.serial_manager import SerialManager
+from core.device_cache import find_last_port, load_last_device, save_last_device
 from core.parser import parse_json_message
 from core.measurement_manager import MeasurementManager 
+from core.analytics import SlidingComparison, REFERENCE_KEY
+from core.csv_export import DEFAULT_DELIMITER, ExportCancelled
+from core.diagnostics import Profiler, StallDetector
+from core.metrics import MetricsServer
+from core.batch import BatchRunner, load_batch
+from core.sensors import SensorRegistry, get_sensor_name, register_channels, set_registry
 from ui.styles import STYLESHEET
 
 from ui.panels.sidebar import Sidebar
@@ -17,6 +26,18 @@ from measurements.part_one import PartOneMeasurement
 
 class MainWindow(QMainWindow):
     handshake_received_signal = Signal()
+    probe_finished_signal = Signal(str)
+    export_progress_signal = Signal(float)
+    export_finished_signal = Signal(bool, bool)  # (úspěch, zrušeno)
+
+    # Známé zařízení bez resetu odpoví na HELLO téměř okamžitě
+    FAST_HANDSHAKE_MS = 500
+    HANDSHAKE_MS = 3000
+    # Porovnání s referencí (TMP117) na kartičkách
+    ANALYTICS_INTERVAL_MS = 2000
+    ANALYTICS_WINDOW_S = 120.0
+    # Diagnostika: zaseknutí GUI delší než tento limit se loguje
+    STALL_THRESHOLD_MS = 200.0
 
     def __init__(self):
         super().__init__()
@@ -33,19 +54,52 @@ class MainWindow(QMainWindow):
         self.allowed_sensors: Set[str] = set()
         
         self.detected_sensors: list[str] = []
+        self._last_hello: Optional[dict] = None
+        self._connect_port: Optional[str] = None
+        self._fast_handshake = False
+        self._export_thread: Optional[threading.Thread] = None
+        self._export_cancel = threading.Event()
+        self._export_dialog: Optional[QProgressDialog] = None
 
         self.meas_mgr.data_received.connect(self._on_measurement_data)
         self.meas_mgr.progress_updated.connect(self._on_measurement_progress)
         self.meas_mgr.finished.connect(self._on_measurement_finished)
         self.meas_mgr.error_occurred.connect(lambda msg: QMessageBox.warning(self, "Chyba", msg))
+        self.meas_mgr.connection_lost.connect(self._on_connection_lost)
+        self.meas_mgr.connection_restored.connect(self._on_connection_restored)
 
         self.handshake_received_signal.connect(self._on_handshake_ok)
+        self.probe_finished_signal.connect(self._on_probe_finished)
+        self.export_progress_signal.connect(self._on_export_progress)
+        self.export_finished_signal.connect(self._on_export_finished)
 
         self.handshake_timer = QTimer()
         self.handshake_timer.setSingleShot(True)
         self.handshake_timer.timeout.connect(self._on_handshake_timeout)
 
+        self.comparison = SlidingComparison(window_s=self.ANALYTICS_WINDOW_S)
+        self.analytics_timer = QTimer(self)
+        self.analytics_timer.timeout.connect(self._update_analytics)
+        self.analytics_timer.start(self.ANALYTICS_INTERVAL_MS)
+
+        self.profiler = Profiler()
+        self.stall_detector = StallDetector(self.STALL_THRESHOLD_MS)
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.timeout.connect(self.stall_detector.beat)
+        self._profile_label = "necinnost"
+        self.metrics_server = MetricsServer()
+
+        # Dávka měření bez obsluhy (po konci běhu bez dialogu rovnou další)
+        self.batch_runner = BatchRunner(self.meas_mgr, self)
+        self.batch_runner.run_started.connect(self._on_batch_run_started)
+        self.batch_runner.cooling_started.connect(self._on_batch_cooling)
+        self.batch_runner.batch_finished.connect(self._on_batch_finished)
+
         self._init_ui()
+
+        last_port = find_last_port()
+        if last_port:
+            self.sidebar.set_current_port(last_port)
         
         available_types = self.meas_mgr.get_available_types()
         if available_types:
@@ -68,6 +122,12 @@ class MainWindow(QMainWindow):
         self.sidebar.measurement_type_changed.connect(self._on_measurement_type_changed)
         self.sidebar.pwm_changed.connect(self._on_pwm_changed)
         self.sidebar.export_clicked.connect(self._on_export_clicked)
+        self.sidebar.process_mode_changed.connect(self._on_process_mode_changed)
+        self.sidebar.live_server_toggled.connect(self._on_live_server_toggled)
+        self.sidebar.scrolling_mode_changed.connect(self._on_scrolling_mode_changed)
+        self.sidebar.diagnostics_toggled.connect(self._on_diagnostics_toggled)
+        self.sidebar.metrics_toggled.connect(self._on_metrics_toggled)
+        self.sidebar.batch_clicked.connect(self._on_batch_clicked)
 
         right_layout = QVBoxLayout()
         right_layout.setContentsMargins(0, 0, 0, 0)
@@ -101,7 +161,13 @@ class MainWindow(QMainWindow):
     def _start_measurement(self, type_name: str):
         self.cards_panel.clear()
         self.plot_widget.clear()
+        self.comparison.clear()
         self.sidebar.progress.setValue(0)
+
+        if self.profiler.is_running:
+            # Uzavřít profil doby před měřením, další profil = toto měření
+            self.profiler.dump(self._profile_label)
+            self._profile_label = type_name
         
         # --- Příprava argumentů pro konkrétní měření ---
         kwargs = {}
@@ -111,28 +177,126 @@ class MainWindow(QMainWindow):
                 "pwm_channel": self._pending_pwm_channel,
                 "pwm_value": self._pending_pwm_value
             }
+        if self.sidebar.chk_adaptive.isChecked():
+            kwargs["adaptive_rate"] = True
+        if self.sidebar.chk_steady.isChecked():
+            kwargs["steady_stop"] = True
 
         self.sidebar.set_measurement_running(True)
         
         # Předáme parametry manageru -> ten je předá konstruktoru měření
-        self.meas_mgr.start_measurement(type_name, **kwargs)
+        self.meas_mgr.start_measurement(type_name, allowed_sensors=self.allowed_sensors, **kwargs)
         
         duration = self.meas_mgr.get_duration()
         self.plot_widget.set_time_window(60.0 if duration > 300 else duration)
 
     @Slot()
     def _stop_measurement(self):
+        if self.batch_runner.is_active():
+            self.batch_runner.stop()
+            return
         self.meas_mgr.stop_measurement()
 
+    @Slot()
+    def _on_batch_clicked(self):
+        filename, _ = QFileDialog.getOpenFileName(self, "Načíst dávku", "", "Dávka (*.json)")
+        if not filename:
+            return
+        try:
+            runs = load_batch(filename)
+            self.batch_runner.start(runs, allowed_sensors=self.allowed_sensors)
+        except (OSError, ValueError, TypeError, RuntimeError) as e:
+            QMessageBox.warning(self, "Chyba", f"Dávku nelze spustit: {e}")
+
+    def _prepare_plot_for(self, type_name: str):
+        self.cards_panel.clear()
+        self.plot_widget.clear()
+        self.comparison.clear()
+        self.plot_widget.set_dual_axis_mode(type_name == PartOneMeasurement.DISPLAY_NAME)
+        self.sidebar.progress.setValue(0)
+        self.sidebar.set_measurement_running(True)
+
+    @Slot(int, int, str)
+    def _on_batch_run_started(self, index: int, total: int, label: str):
+        run = self.batch_runner.current_run()
+        self._prepare_plot_for(run.type_name if run else "")
+        self.sidebar.set_status_text(f"Dávka {index}/{total}: {label}")
+
+    @Slot(int, str)
+    def _on_batch_cooling(self, index: int, condition: str):
+        self._prepare_plot_for("")
+        self.sidebar.set_status_text(f"Dávka: před během {index} čekám ({condition})")
+
+    @Slot(int, bool)
+    def _on_batch_finished(self, completed: int, aborted: bool):
+        self.sidebar.set_measurement_running(False)
+        text = "přerušena" if aborted else "dokončena"
+        QMessageBox.information(self, "Dávka", f"Dávka {text}, uložené běhy: {completed}.")
+
     @Slot()
     def _on_export_clicked(self):
+        if self._export_thread is not None and self._export_thread.is_alive():
+            return
         filename, _ = QFileDialog.getSaveFileName(self, "Uložit CSV", "", "CSV (*.csv)")
-        if filename:
-            # Předáváme allowed_sensors pro filtrování
-            if self.meas_mgr.export_data(filename, self.allowed_sensors):
-                QMessageBox.information(self, "OK", "Data exportována.")
-            else:
-                QMessageBox.warning(self, "Chyba", "Nelze exportovat data (žádná data k dispozici?).")
+        if not filename:
+            return
+
+        # Desetinný znak podle systému, sloupce vždy středníkem (soubor jde znovu načíst importem)
+        decimal = QLocale().decimalPoint() or "."
+        delimiter = DEFAULT_DELIMITER
+
+        self._export_cancel.clear()
+        self._export_dialog = QProgressDialog("Exportuji data...", "Zrušit", 0, 100, self)
+        self._export_dialog.setWindowTitle("Export CSV")
+        self._export_dialog.setWindowModality(Qt.WindowModal)
+        self._export_dialog.setMinimumDuration(300)
+        self._export_dialog.setAutoClose(False)
+        self._export_dialog.setAutoReset(False)
+        self._export_dialog.canceled.connect(self._export_cancel.set)
+        self._export_dialog.setValue(0)
+
+        # Export běží v samostatném vlákně, GUI (a graf) se mezitím dál překresluje
+        self._export_thread = threading.Thread(
+            target=self._export_worker,
+            args=(filename, set(self.allowed_sensors), delimiter, decimal),
+            daemon=True,
+        )
+        self._export_thread.start()
+
+    def _export_worker(self, filename: str, allowed: Set[str], delimiter: str, decimal: str):
+        cancelled = False
+        try:
+            ok = self.meas_mgr.export_data(
+                filename, allowed, delimiter=delimiter, decimal=decimal,
+                progress=self.export_progress_signal.emit, cancel=self._export_cancel,
+            )
+        except ExportCancelled:
+            ok, cancelled = False, True
+        except Exception as e:
+            print(f"Chyba exportu: {e}")
+            ok = False
+        self.export_finished_signal.emit(ok, cancelled)
+
+    @Slot(float)
+    def _on_export_progress(self, fraction: float):
+        if self._export_dialog is not None:
+            self._export_dialog.setValue(int(fraction * 100))
+
+    @Slot(bool, bool)
+    def _on_export_finished(self, ok: bool, cancelled: bool):
+        if self._export_dialog is not None:
+            self._export_dialog.canceled.disconnect(self._export_cancel.set)
+            self._export_dialog.close()
+            self._export_dialog.deleteLater()
+            self._export_dialog = None
+        self._export_thread = None
+
+        if cancelled:
+            return
+        if ok:
+            QMessageBox.information(self, "OK", "Data exportována.")
+        else:
+            QMessageBox.warning(self, "Chyba", "Nelze exportovat data (žádná data k dispozici?).")
 
     @Slot(int, int)
     def _on_pwm_changed(self, channel: int, value: int):
@@ -142,13 +306,29 @@ class MainWindow(QMainWindow):
 
     @Slot(float, dict)
     def _on_measurement_data(self, t_s: float, values: dict):
-        if self.allowed_sensors:
-            filtered = {k: v for k, v in values.items() if k in self.allowed_sensors}
-        else:
-            filtered = values
-        if filtered:
-            self.cards_panel.update_values(filtered)
-            self.plot_widget.add_point(t_s, filtered)
+        # Výběr senzorů už aplikovalo měření při dekódování
+        if values:
+            # Nové kanály (filtrované kopie, neohlášené senzory) dostanou index a barvu
+            register_channels(values)
+            self.cards_panel.update_values(values, t_s)
+            self.plot_widget.add_point(t_s, values)
+            if self.meas_mgr.runs_in_process():
+                # Data měření jsou v jiném procesu - analýza si drží vlastní okno
+                self.comparison.add(t_s, values)
+
+    @Slot()
+    def _update_analytics(self):
+        if not self.meas_mgr.is_running():
+            return
+        ref_name = get_sensor_name(REFERENCE_KEY)
+        for key, st in self.comparison.compute(self.meas_mgr.snapshot()).items():
+            lag = f"{st.lag_s:.1f} s" if math.isfinite(st.lag_s) else "zatím nelze určit"
+            self.cards_panel.set_card_info(
+                key,
+                f"Vůči {ref_name} (posledních {self.ANALYTICS_WINDOW_S:.0f} s):\n"
+                f"odchylka {st.bias:+.3f} °C, RMS {st.rms:.3f} °C, max {st.max_error:.3f} °C\n"
+                f"zpoždění {lag}"
+            )
 
     @Slot(float)
     def _on_measurement_progress(self, fraction: float):
@@ -158,15 +338,56 @@ class MainWindow(QMainWindow):
     @Slot()
     def _on_measurement_finished(self):
         self.sidebar.set_measurement_running(False)
+        if self.profiler.is_running:
+            self.profiler.dump(self._profile_label)
+            self._profile_label = "necinnost"
+        if self.batch_runner.is_active():
+            # Dávka pokračuje sama, dialog by stanici zdržel
+            return
         QMessageBox.information(self, "Hotovo", "Měření dokončeno.")
     
     @Slot(str)
     def _handle_connect_request(self, port: str):
+        if port == Sidebar.AUTO_PORT:
+            # Hledání blokuje až PROBE_TIMEOUT_S -> mimo GUI vlákno
+            self.sidebar.set_waiting_state()
+            threading.Thread(target=self._probe_ports_worker, daemon=True).start()
+            return
+
+        cached = load_last_device()
+        fast = cached is not None and cached.get("port") == port
+        self._open_port(port, fast)
+
+    def _probe_ports_worker(self):
+        found = SerialManager.probe_ports(preferred=find_last_port())
+        self.probe_finished_signal.emit(found[0] if found else "")
+
+    @Slot(str)
+    def _on_probe_finished(self, port: str):
+        if not port:
+            self.sidebar.set_connected_state(False)
+            QMessageBox.warning(self, "Nenalezeno", "ESP32 nebylo nalezeno na žádném portu.")
+            return
+        print(f"ESP32 nalezeno na {port}")
+        self.sidebar.set_current_port(port)
+        # Zařízení právě odpovědělo, není třeba ho resetovat
+        self._open_port(port, fast=True)
+
+    def _open_port(self, port: str, fast: bool):
+        """
+        Otevře port a čeká na handshake.
+        fast=True: bez resetu ESP32, identitu si vyžádáme příkazem HELLO;
+        pokud neodpoví do FAST_HANDSHAKE_MS, zkusíme klasické připojení s resetem.
+        """
+        self._connect_port = port
+        self._fast_handshake = fast
         try:
-            self.serial_mgr.open(port)
+            self.serial_mgr.open(port, reset=not fast)
             self.serial_mgr.set_line_callback(self._wait_for_handshake)
             self.sidebar.set_waiting_state()
-            self.handshake_timer.start(3000)
+            if fast:
+                self.serial_mgr.write_line("HELLO")
+            self.handshake_timer.start(self.FAST_HANDSHAKE_MS if fast else self.HANDSHAKE_MS)
         except Exception as e:
             QMessageBox.critical(self, "Chyba", f"Port nelze otevřít:\n{e}")
             self.sidebar.set_connected_state(False)
@@ -174,48 +395,99 @@ class MainWindow(QMainWindow):
     def _wait_for_handshake(self, line: str):
         msg = parse_json_message(line)
         if msg and msg.get("type") == "hello":
-            self.detected_sensors = []
-            
-            # --- ZMĚNA: Přidání do seznamu pod správnými klíči ---
-            if str(msg.get("bme")).lower() == "true":
-                self.detected_sensors.append("T_BME")
-            if str(msg.get("tmp")).lower() == "true":
-                self.detected_sensors.append("T_TMP")
-                
-            if str(msg.get("adc")).lower() == "true":
-                # Názvy klíčů musí odpovídat tomu, co posílá ESP v sendData
-                self.detected_sensors.extend(["V_ADS_R", "V_ADS_NTC", "V_ESP_R", "V_ESP_NTC"])
-                
-            try:
-                dallas_count = int(msg.get("dallas", 0))
-                for i in range(dallas_count):
-                    self.detected_sensors.append(f"T_DS{i}")
-            except: pass
+            self._last_hello = msg
+            # Registr kanálů zařízení (indexy, názvy, jednotky, barvy) se sestaví jednou
+            registry = SensorRegistry.from_hello(msg)
+            set_registry(registry)
+            self.detected_sensors = registry.keys
             
             print(f"Detekováno: {self.detected_sensors}")
             self.handshake_received_signal.emit()
 
     @Slot()
     def _on_handshake_ok(self):
+        if not self.handshake_timer.isActive():
+            # Opakované hello (např. restart ESP) po dokončeném připojení
+            return
         self.handshake_timer.stop()
+        if self._connect_port:
+            save_last_device(self._connect_port, self._last_hello)
         self.sidebar.set_connected_state(True)
         QMessageBox.information(self, "Připojeno", "Spojení navázáno.")
 
     @Slot()
     def _on_handshake_timeout(self):
+        if self._fast_handshake and self._connect_port:
+            print("Rychlé připojení bez resetu selhalo, zkouším s resetem...")
+            self._open_port(self._connect_port, fast=False)
+            return
         self.serial_mgr.close()
         self.sidebar.set_connected_state(False)
         QMessageBox.warning(self, "Timeout", "ESP32 neodpovědělo.")
 
+    @Slot()
+    def _on_connection_lost(self):
+        self.sidebar.set_reconnecting_state(True)
+
+    @Slot()
+    def _on_connection_restored(self):
+        self.sidebar.set_reconnecting_state(False)
+        gaps = self.meas_mgr.get_gaps()
+        if self.meas_mgr.is_running() and gaps:
+            self.plot_widget.mark_gap(*gaps[-1])
+
     @Slot()
     def _handle_disconnect_request(self):
-        self.meas_mgr.stop_measurement()
+        self.meas_mgr.shutdown()
         self.serial_mgr.close()
         self.sidebar.set_connected_state(False)
         self.sidebar.set_measurement_running(False)
         self.cards_panel.clear()
         self.plot_widget.clear()
         
+    @Slot(bool)
+    def _on_process_mode_changed(self, enabled: bool):
+        self.meas_mgr.use_process = enabled
+
+    @Slot(bool)
+    def _on_scrolling_mode_changed(self, enabled: bool):
+        self.plot_widget.set_scrolling_mode(enabled)
+
+    @Slot(bool)
+    def _on_live_server_toggled(self, enabled: bool):
+        if not enabled:
+            self.meas_mgr.stop_live_server()
+        elif not self.meas_mgr.start_live_server():
+            self.sidebar.chk_live.setChecked(False)
+
+    @Slot(bool)
+    def _on_diagnostics_toggled(self, enabled: bool):
+        if enabled:
+            self._profile_label = "necinnost"
+            self.profiler.start()
+            self.heartbeat_timer.start(StallDetector.HEARTBEAT_MS)
+            self.stall_detector.start()
+        else:
+            self.heartbeat_timer.stop()
+            self.stall_detector.stop()
+            self.profiler.stop(self._profile_label)
+
+    @Slot(bool)
+    def _on_metrics_toggled(self, enabled: bool):
+        if not enabled:
+            self.metrics_server.stop()
+        elif not self.metrics_server.start():
+            self.sidebar.chk_metrics.setChecked(False)
+
+    def closeEvent(self, event):
+        if self.profiler.is_running:
+            self._on_diagnostics_toggled(False)
+        self.metrics_server.stop()
+        # Ukončí i případný proces měření a uvolní sdílenou paměť
+        self.meas_mgr.shutdown()
+        self.serial_mgr.close()
+        super().closeEvent(event)
+
     @Slot()
     def _open_sensor_settings(self):
         dlg = SensorConfigDialog(self.allowed_sensors, self.detected_sensors, self)
@@ -1,25 +1,95 @@
+from typing import Dict, Optional
+
 from PySide6.QtWidgets import (
-    QWidget, QHBoxLayout, QFrame, QVBoxLayout, 
+    QWidget, QHBoxLayout, QFrame, QVBoxLayout,
     QLabel, QScrollArea
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer, QPointF
+from PySide6.QtGui import QPainter, QPen, QColor, QPolygonF
+
+from core.ring_buffer import RingBuffer
+
+# Název, jednotka a barva kanálu z centrálního registru (core/sensors.py)
+from core.sensors import ChannelInfo, channel_info
+
+
+class Sparkline(QWidget):
+    """
+    Malý graf posledních `window_s` sekund jedné veličiny.
+    Data drží v předalokovaných kruhových bufferech, kreslí se jen při překreslení.
+    """
+
+    # Kapacita pokrývá maximální rychlost firmware (10 Hz) po celé okno
+    MAX_RATE_HZ = 10.0
+
+    def __init__(self, window_s: float = 60.0, color: str = "#007acc", parent=None):
+        super().__init__(parent)
+        self.setFixedHeight(22)
+        self._window_s = window_s
+        capacity = int(window_s * self.MAX_RATE_HZ) + 1
+        self._t = RingBuffer(capacity)
+        self._v = RingBuffer(capacity)
+        self._pen = QPen(QColor(color), 1.5)
+
+    def add(self, t_s: float, value: float):
+        self._t.append(t_s)
+        self._v.append(value)
+
+    def clear(self):
+        self._t.clear()
+        self._v.clear()
+        self.update()
+
+    def paintEvent(self, event):
+        if len(self._t) < 2:
+            return
+        ts = self._t.view()
+        vs = self._v.view()
+
+        # Jen body v okně posledních window_s sekund
+        start = int(ts.searchsorted(ts[-1] - self._window_s))
+        ts = ts[start:]
+        vs = vs[start:]
+        if len(ts) < 2:
+            return
+
+        w = self.width() - 2
+        h = self.height() - 2
+        t_span = ts[-1] - ts[0] or 1.0
+        v_min = vs.min()
+        v_span = vs.max() - v_min or 1.0
+        xs = 1 + (ts - ts[0]) * (w / t_span)
+        ys = 1 + h - (vs - v_min) * (h / v_span)
+
+        polygon = QPolygonF([QPointF(x, y) for x, y in zip(xs.tolist(), ys.tolist())])
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(self._pen)
+        painter.drawPolyline(polygon)
+        painter.end()
 
-# Importujeme funkci pro hezké názvy (z nového souboru core/sensors.py)
-# Pokud soubor ještě nemáš, použijeme fallback na starou metodu z grafu,
-# ale doporučuji vytvořit core/sensors.py jak bylo v plánu.
-try:
-    from core.sensors import get_sensor_name
-except ImportError:
-    from ui.realtime_plot import RealtimePlotWidget
-    get_sensor_name = RealtimePlotWidget.format_sensor_name
 
 class ValueCardsPanel(QWidget):
+    # Kartičky se překreslují časovačem, ne s každým vzorkem
+    REFRESH_INTERVAL_MS = 200
+    SPARKLINE_WINDOW_S = 60.0
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setFixedHeight(130)
-        self._labels = {} 
+        self.setFixedHeight(150)
+        self._labels: Dict[str, QLabel] = {}
+        self._frames: Dict[str, QFrame] = {}
+        self._sparklines: Dict[str, Sparkline] = {}
+        self._infos: Dict[str, ChannelInfo] = {}
+        self._texts: Dict[str, str] = {}
+        # Poslední nezobrazené hodnoty (klíč -> hodnota)
+        self._pending: Dict[str, float] = {}
         self._init_ui()
 
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.timeout.connect(self._refresh)
+        self._refresh_timer.start(self.REFRESH_INTERVAL_MS)
+
     def _init_ui(self):
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(0, 0, 0, 0)
@@ -29,35 +99,49 @@ class ValueCardsPanel(QWidget):
         scroll.setWidgetResizable(True)
         scroll.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         scroll.setStyleSheet("background-color: #1e1e1e; border: none;")
-        
+
         self.container = QWidget()
         self.container.setStyleSheet("background-color: #1e1e1e;")
-        
+
         self.cards_layout = QHBoxLayout(self.container)
         self.cards_layout.setContentsMargins(20, 15, 20, 15)
         self.cards_layout.setSpacing(15)
         self.cards_layout.addStretch()
-        
+
         scroll.setWidget(self.container)
         main_layout.addWidget(scroll)
 
-    def update_values(self, values: dict):
+    def update_values(self, values: dict, t_s: Optional[float] = None):
+        """
+        Jen uloží hodnoty - popisky se aktualizují v _refresh().
+        Pokud je zadán čas, hodnoty se přidají i do sparkline.
+        """
         for key, val in values.items():
-            unit = "°C"
-            
-            # --- ZDE SE MĚNÍ JEDNOTKY ---
-            # Identifikace napěťových senzorů podle klíče
-            if key.startswith("V_") or key.startswith("ADC") or key.startswith("ESP"):
-                unit = "mV"  # Změna z "V" na "mV"
-            elif key.startswith("PWM"):
-                unit = "%"
-            
-            text_val = f"{val:.2f} {unit}"
-            
-            if key in self._labels:
+            if key not in self._labels:
+                self._create_card(key)
+            self._pending[key] = val
+            if t_s is not None:
+                self._sparklines[key].add(t_s, val)
+
+    def _refresh(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+
+        for key, val in pending.items():
+            info = self._infos[key]
+            text_val = f"{val:.2f} {info.unit}"
+            # Měníme jen popisky, jejichž text se opravdu změnil
+            if self._texts.get(key) != text_val:
+                self._texts[key] = text_val
                 self._labels[key].setText(text_val)
-            else:
-                self._create_card(key, text_val)
+            self._sparklines[key].update()
+
+    def set_card_info(self, key: str, text: str):
+        """Doplňující informace ke kartičce (zobrazí se jako tooltip)."""
+        frame = self._frames.get(key)
+        if frame is not None and frame.toolTip() != text:
+            frame.setToolTip(text)
 
     def clear(self):
         while self.cards_layout.count() > 1:
@@ -65,30 +149,42 @@ class ValueCardsPanel(QWidget):
             if item.widget():
                 item.widget().deleteLater()
         self._labels.clear()
+        self._frames.clear()
+        self._sparklines.clear()
+        self._infos.clear()
+        self._texts.clear()
+        self._pending.clear()
 
-    def _create_card(self, key: str, initial_text: str):
-        # Použijeme sjednocenou funkci pro název senzoru
-        pretty_name = get_sensor_name(key)
+    def _create_card(self, key: str):
+        # Název, jednotka i barva jsou předpočítané v registru kanálů
+        info = channel_info(key)
+        pretty_name = info.name
 
         frame = QFrame()
         frame.setObjectName("ValueCard")
         frame.setFixedWidth(170)
-        
+
         l = QVBoxLayout(frame)
         l.setContentsMargins(10, 8, 10, 8)
         l.setSpacing(2)
-        
+
         lbl_title = QLabel(pretty_name)
         lbl_title.setObjectName("ValueTitle")
         lbl_title.setAlignment(Qt.AlignCenter)
-        
-        lbl_val = QLabel(initial_text)
+
+        lbl_val = QLabel("--")
         lbl_val.setObjectName("ValueNumber")
         lbl_val.setAlignment(Qt.AlignCenter)
-        
+
+        sparkline = Sparkline(self.SPARKLINE_WINDOW_S, info.color)
+
         l.addWidget(lbl_title)
         l.addWidget(lbl_val)
-        
+        l.addWidget(sparkline)
+
         self._labels[key] = lbl_val
+        self._frames[key] = frame
+        self._sparklines[key] = sparkline
+        self._infos[key] = info
         idx = self.cards_layout.count() - 1
-        self.cards_layout.insertWidget(idx, frame)
\ No newline at end of file
+        self.cards_layout.insertWidget(idx, frame)
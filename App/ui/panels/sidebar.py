@@ -1,13 +1,16 @@
 from typing import List
 from PySide6.QtWidgets import (
     QFrame, QVBoxLayout, QLabel, QComboBox, QPushButton, 
-    QProgressBar, QWidget, QSlider, QRadioButton, QButtonGroup, QHBoxLayout
+    QProgressBar, QWidget, QSlider, QRadioButton, QButtonGroup, QHBoxLayout, QCheckBox
 )
 from PySide6.QtCore import Signal, Qt
 
 from core.serial_manager import SerialManager
 
 class Sidebar(QFrame):
+    # Položka výběru portu pro automatické vyhledání ESP32
+    AUTO_PORT = "Automaticky (hledat ESP32)"
+
     # Signály
     connect_requested = Signal(str)
     disconnect_requested = Signal()
@@ -17,6 +20,12 @@ class Sidebar(QFrame):
     measurement_type_changed = Signal(str) 
     pwm_changed = Signal(int, int) # (channel, value 0-100)
     export_clicked = Signal()
+    process_mode_changed = Signal(bool)
+    live_server_toggled = Signal(bool)
+    scrolling_mode_changed = Signal(bool)
+    diagnostics_toggled = Signal(bool)
+    metrics_toggled = Signal(bool)
+    batch_clicked = Signal()
 
     def __init__(self, measurement_types: List[str], parent=None):
         super().__init__(parent)
@@ -67,7 +76,7 @@ class Sidebar(QFrame):
         # --- PŘIPOJENÍ ---
         self._add_section_label(layout, "PŘIPOJENÍ")
         self.combo_ports = QComboBox()
-        self.combo_ports.addItems(SerialManager.list_ports())
+        self.combo_ports.addItems([self.AUTO_PORT] + SerialManager.list_ports())
         self.combo_ports.setStyleSheet(COMBO_BOX_STYLE)
         layout.addWidget(self.combo_ports)
 
@@ -103,6 +112,49 @@ class Sidebar(QFrame):
         self.btn_sensors.clicked.connect(self.sensor_settings_clicked.emit)
         layout.addWidget(self.btn_sensors)
 
+        self.chk_process = QCheckBox("Měřit v samostatném procesu")
+        self.chk_process.setToolTip("Čtení sériové linky neovlivní zatížení GUI (využije další jádro CPU).")
+        self.chk_process.setStyleSheet("color: #aaaaaa; font-size: 12px;")
+        self.chk_process.toggled.connect(self.process_mode_changed.emit)
+        layout.addWidget(self.chk_process)
+
+        self.chk_live = QCheckBox("Sdílet živá data (TCP 8765)")
+        self.chk_live.setToolTip("Rozesílá vzorky lokálním klientům (JSON řádky na 127.0.0.1:8765).")
+        self.chk_live.setStyleSheet("color: #aaaaaa; font-size: 12px;")
+        self.chk_live.toggled.connect(self.live_server_toggled.emit)
+        layout.addWidget(self.chk_live)
+
+        self.chk_scroll = QCheckBox("Posuvné okno grafu")
+        self.chk_scroll.setToolTip("Graf ukazuje jen poslední úsek měření (konstantní paměť i zátěž při dlouhém běhu).")
+        self.chk_scroll.setStyleSheet("color: #aaaaaa; font-size: 12px;")
+        self.chk_scroll.toggled.connect(self.scrolling_mode_changed.emit)
+        layout.addWidget(self.chk_scroll)
+
+        self.chk_adaptive = QCheckBox("Adaptivní vzorkování")
+        self.chk_adaptive.setToolTip("Frekvence se mění podle dynamiky teplot (0,1-10 Hz): "
+                                     "rychle při přechodových dějích, pomalu v ustáleném stavu.")
+        self.chk_adaptive.setStyleSheet("color: #aaaaaa; font-size: 12px;")
+        layout.addWidget(self.chk_adaptive)
+
+        self.chk_steady = QCheckBox("Ukončit po ustálení")
+        self.chk_steady.setToolTip("Měření skončí dřív, jakmile jsou všechny teploty ustálené "
+                                   "(směrnice do 0,02 °C/min a malý rozptyl po dobu 1 min v okně 2 min).")
+        self.chk_steady.setStyleSheet("color: #aaaaaa; font-size: 12px;")
+        layout.addWidget(self.chk_steady)
+
+        self.chk_diag = QCheckBox("Diagnostika výkonu")
+        self.chk_diag.setToolTip("Profiluje GUI (cProfile, profil za každé měření) a loguje zaseknutí GUI "
+                                 "se zásobníkem volání do ~/.temp_lab/diagnostics.")
+        self.chk_diag.setStyleSheet("color: #aaaaaa; font-size: 12px;")
+        self.chk_diag.toggled.connect(self.diagnostics_toggled.emit)
+        layout.addWidget(self.chk_diag)
+
+        self.chk_metrics = QCheckBox("Metriky (HTTP 9108)")
+        self.chk_metrics.setToolTip("Zpřístupní čítače a stav stanice ve formátu Prometheus na http://127.0.0.1:9108/metrics.")
+        self.chk_metrics.setStyleSheet("color: #aaaaaa; font-size: 12px;")
+        self.chk_metrics.toggled.connect(self.metrics_toggled.emit)
+        layout.addWidget(self.chk_metrics)
+
         layout.addSpacing(5)
         
         # --- DYNAMICKÁ SEKCE ---
@@ -131,6 +183,13 @@ class Sidebar(QFrame):
         self.btn_stop.clicked.connect(self._on_stop_click)
         layout.addWidget(self.btn_stop)
 
+        self.btn_batch = QPushButton("Dávkové měření...")
+        self.btn_batch.setToolTip("Spustí frontu měření z JSON souboru bez obsluhy (každý běh = vlastní session).")
+        self.btn_batch.setEnabled(False)
+        self.btn_batch.setCursor(Qt.PointingHandCursor)
+        self.btn_batch.clicked.connect(self.batch_clicked.emit)
+        layout.addWidget(self.btn_batch)
+
         self.btn_export = QPushButton("Exportovat CSV")
         self.btn_export.setStyleSheet("background-color: #d19a66; color: #202020; font-weight: bold;")
         self.btn_export.setCursor(Qt.PointingHandCursor)
@@ -235,9 +294,13 @@ class Sidebar(QFrame):
     def update_ports(self):
         current = self.combo_ports.currentText()
         self.combo_ports.clear()
-        self.combo_ports.addItems(SerialManager.list_ports())
+        self.combo_ports.addItems([self.AUTO_PORT] + SerialManager.list_ports())
         self.combo_ports.setCurrentText(current)
 
+    def set_current_port(self, port: str):
+        if self.combo_ports.findText(port) >= 0:
+            self.combo_ports.setCurrentText(port)
+
     def set_connected_state(self, connected: bool):
         if connected:
             self.btn_connect.setText("ODPOJIT")
@@ -247,6 +310,7 @@ class Sidebar(QFrame):
             except: pass
             self.btn_connect.clicked.connect(self._on_disconnect_click)
             self.btn_start.setEnabled(True)
+            self.btn_batch.setEnabled(True)
             self.lbl_status.setText("Připojeno k ESP32")
             self.btn_connect.setEnabled(True)
         else:
@@ -254,6 +318,7 @@ class Sidebar(QFrame):
             self.btn_connect.setStyleSheet("")
             self.combo_ports.setEnabled(True)
             self.btn_start.setEnabled(False)
+            self.btn_batch.setEnabled(False)
             self.btn_stop.setEnabled(False)
             try: self.btn_connect.clicked.disconnect()
             except: pass
@@ -263,9 +328,13 @@ class Sidebar(QFrame):
 
     def set_measurement_running(self, running: bool):
         self.btn_start.setEnabled(not running)
+        self.btn_batch.setEnabled(not running)
         self.btn_stop.setEnabled(running)
         self.combo_type.setEnabled(not running)
         self.btn_sensors.setEnabled(not running)
+        self.chk_process.setEnabled(not running)
+        self.chk_adaptive.setEnabled(not running)
+        self.chk_steady.setEnabled(not running)
         
         # --- ZMĚNA: Zablokování PWM ovládání ---
         # Bezpečné ovládání Radio Buttonů a Slideru
@@ -287,6 +356,22 @@ class Sidebar(QFrame):
             self.lbl_status.setText("Připraveno")
             self.lbl_status.setStyleSheet("color: #808080; font-size: 11px;")
 
+    def set_status_text(self, text: str):
+        """Vlastní text stavu (např. průběh dávky)."""
+        self.lbl_status.setText(text)
+        self.lbl_status.setStyleSheet("color: #2ea043; font-size: 11px;")
+
+    def set_reconnecting_state(self, reconnecting: bool):
+        if reconnecting:
+            self.lbl_status.setText("Spojení ztraceno, obnovuji...")
+            self.lbl_status.setStyleSheet("color: #da3633; font-size: 11px;")
+        elif self.btn_stop.isEnabled():
+            self.lbl_status.setText("Měření probíhá...")
+            self.lbl_status.setStyleSheet("color: #2ea043; font-size: 11px;")
+        else:
+            self.lbl_status.setText("Připojeno k ESP32")
+            self.lbl_status.setStyleSheet("color: #808080; font-size: 11px;")
+
     def set_waiting_state(self):
         self.btn_connect.setText("Čekám...")
         self.btn_connect.setEnabled(False)
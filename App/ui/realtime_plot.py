@@ -1,12 +1,107 @@
-from typing import Dict, List
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from PySide6.QtWidgets import QWidget, QVBoxLayout
 from PySide6.QtCore import Qt
+import numpy as np
 import pyqtgraph as pg
 
 # Čistý import z centrálního souboru
-from core.sensors import get_sensor_name
+from core.sensors import AXIS_VOLTAGE, channel_info
+from core.ring_buffer import RingBuffer
+from core.metrics import REGISTRY
+from ui.render_quality import RenderLevel, RenderQualityPolicy
+
+_FRAME_SECONDS = REGISTRY.histogram("temp_lab_plot_frame_seconds", "Doba snímku grafu (aktualizace dat + vykreslení)",
+                                    buckets=(0.002, 0.005, 0.01, 0.02, 0.03, 0.05, 0.1, 0.25, 0.5, 1.0))
+_VISIBLE_POINTS = REGISTRY.gauge("temp_lab_plot_points", "Počet bodů v grafu")
+_RENDER_LEVEL = REGISTRY.gauge("temp_lab_plot_render_level", "Úroveň kvality vykreslování (0 = plná)")
+
+
+class _TimedPlotWidget(pg.PlotWidget):
+    """PlotWidget, který měří skutečnou dobu vykreslení každého snímku."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_frame: Optional[Callable[[float], None]] = None
+
+    def paintEvent(self, ev):
+        t0 = time.perf_counter()
+        result = super().paintEvent(ev)
+        if self.on_frame:
+            self.on_frame((time.perf_counter() - t0) * 1000.0)
+        return result
+
+
+# Data jedné křivky: seznam (roztahování) nebo kruhový buffer (posuvné okno)
+Series = Union[List[float], RingBuffer]
+
+
+class _MinMaxEnvelope:
+    """
+    Zhuštěná starší část křivky: pro každý úsek `bucket` surových bodů minimum a maximum.
+    Surové body se zhustí jen jednou. Když úseků přibude moc, sloučí se po dvojicích
+    (minimum z minim, maximum z maxim) - výsledek je stejný, jako by se úseky dvojnásobné
+    délky počítaly přímo ze surových dat, rozlišení je tedy v celé historii stejné.
+    """
+
+    def __init__(self, bucket: int):
+        self.bucket = bucket
+        self._x_min = self._y_min = self._x_max = self._y_max = np.empty(0)
+
+    def __len__(self) -> int:
+        return len(self._x_min)
+
+    @property
+    def n_points(self) -> int:
+        return 2 * len(self._x_min)
+
+    def add(self, xs: List[float], ys: List[float]):
+        """Přidá surové body (počet musí být násobkem bucket)."""
+        xo = np.asarray(xs, dtype=np.float64).reshape(-1, self.bucket)
+        yo = np.asarray(ys, dtype=np.float64).reshape(-1, self.bucket)
+        rows = np.arange(len(xo))
+        i_min, i_max = yo.argmin(axis=1), yo.argmax(axis=1)
+        self._x_min = np.concatenate((self._x_min, xo[rows, i_min]))
+        self._y_min = np.concatenate((self._y_min, yo[rows, i_min]))
+        self._x_max = np.concatenate((self._x_max, xo[rows, i_max]))
+        self._y_max = np.concatenate((self._y_max, yo[rows, i_max]))
+
+    def merge_pairs(self):
+        """Sloučí sousední úseky (lichý poslední úsek zůstane, jak je)."""
+        m = len(self) // 2 * 2
+        a, b = slice(0, m, 2), slice(1, m, 2)
+        take_b = self._y_min[b] < self._y_min[a]
+        x_min = np.where(take_b, self._x_min[b], self._x_min[a])
+        y_min = np.where(take_b, self._y_min[b], self._y_min[a])
+        take_b = self._y_max[b] > self._y_max[a]
+        x_max = np.where(take_b, self._x_max[b], self._x_max[a])
+        y_max = np.where(take_b, self._y_max[b], self._y_max[a])
+        self._x_min = np.concatenate((x_min, self._x_min[m:]))
+        self._y_min = np.concatenate((y_min, self._y_min[m:]))
+        self._x_max = np.concatenate((x_max, self._x_max[m:]))
+        self._y_max = np.concatenate((y_max, self._y_max[m:]))
+        self.bucket *= 2
+
+    def points(self) -> Tuple[List[float], List[float]]:
+        # V každém úseku jde minimum a maximum v časovém pořadí
+        min_first = self._x_min <= self._x_max
+        first_x = np.where(min_first, self._x_min, self._x_max)
+        second_x = np.where(min_first, self._x_max, self._x_min)
+        first_y = np.where(min_first, self._y_min, self._y_max)
+        second_y = np.where(min_first, self._y_max, self._y_min)
+        return (np.column_stack((first_x, second_x)).ravel().tolist(),
+                np.column_stack((first_y, second_y)).ravel().tolist())
+
 
 class RealtimePlotWidget(QWidget):
+    # Počáteční kapacita bufferů posuvného okna pokrývá maximální rychlost firmware (10 Hz),
+    # rychlejší data (burst) buffery zvětší až do SCROLL_MAX_POINTS
+    SCROLL_MAX_RATE_HZ = 10.0
+    SCROLL_MAX_POINTS = 200_000
+    # Roztahování: nad tento počet bodů na křivku se starší část zhustí (zachová špičky)
+    STRETCH_MAX_POINTS = 20000
+    STRETCH_FIRST_BUCKET = 4
+
     def __init__(self, time_window_s: float = 60.0, parent=None):
         super().__init__(parent)
 
@@ -18,13 +113,26 @@ class RealtimePlotWidget(QWidget):
         
         # Slovníky pro data a křivky
         self._curves: Dict[str, pg.PlotDataItem] = {}
-        self._data_x: Dict[str, List[float]] = {}
-        self._data_y: Dict[str, List[float]] = {}
+        self._data_x: Dict[str, Series] = {}
+        self._data_y: Dict[str, Series] = {}
+        # Posuvné okno: jen posledních time_window_s sekund v předalokovaných bufferech
+        self._scrolling = False
+        self._latest_t = 0.0
+        # Základní styl křivek (barva, čára, symbol) - kvalita se pak upravuje podle zátěže
+        self._styles: Dict[str, dict] = {}
+        # Osa kanálu z registru (zjištěná jednou při vytvoření křivky)
+        self._axes: Dict[str, str] = {}
+        # Roztahování: zhuštěná starší část křivek
+        self._envelopes: Dict[str, _MinMaxEnvelope] = {}
+        self._quality = RenderQualityPolicy()
+        self._update_ms = 0.0
+        self._visible_points = 0
 
         layout = QVBoxLayout(self)
         layout.setContentsMargins(10, 10, 20, 10) 
 
-        self._plot_widget = pg.PlotWidget()
+        self._plot_widget = _TimedPlotWidget()
+        self._plot_widget.on_frame = self._on_frame_painted
         self._plot_widget.showGrid(x=True, y=True, alpha=0.3)
 
         self._plot_item = self._plot_widget.getPlotItem()
@@ -79,6 +187,12 @@ class RealtimePlotWidget(QWidget):
         self._curves.clear()
         self._data_x.clear()
         self._data_y.clear()
+        self._styles.clear()
+        self._axes.clear()
+        self._envelopes.clear()
+        self._quality.reset()
+        self._latest_t = 0.0
+        self._visible_points = 0
 
         # Reset legendy
         if self._legend:
@@ -94,87 +208,245 @@ class RealtimePlotWidget(QWidget):
 
         self._plot_widget.setXRange(0, self._time_window, padding=0.02)
 
+    def set_scrolling_mode(self, enabled: bool):
+        """
+        Posuvné okno: graf ukazuje jen posledních time_window_s sekund a data drží
+        v kruhových bufferech pevné velikosti (konstantní paměť i cena snímku).
+        Při přepnutí se stávající data převedou (do okna se vejde jen jeho konec).
+        """
+        if enabled == self._scrolling:
+            return
+        self._scrolling = enabled
+        self._envelopes.clear()
+        for key in list(self._data_x):
+            self._data_x[key] = self._convert_series(self._data_x[key])
+            self._data_y[key] = self._convert_series(self._data_y[key])
+        self._refresh_curves()
+
+    def is_scrolling(self) -> bool:
+        return self._scrolling
+
+    def _new_series(self) -> Series:
+        if self._scrolling:
+            return RingBuffer(int(self._time_window * self.SCROLL_MAX_RATE_HZ) + 1)
+        return []
+
+    def _grow_series(self, key: str):
+        """Data chodí rychleji, než počítala kapacita - buffer se zvětší, aby pokryl celé okno."""
+        capacity = min(2 * self._data_x[key].capacity, self.SCROLL_MAX_POINTS)
+        for data in (self._data_x, self._data_y):
+            grown = RingBuffer(capacity)
+            grown.extend(data[key].view())
+            data[key] = grown
+
+    def _convert_series(self, series: Series) -> Series:
+        values = series.view() if isinstance(series, RingBuffer) else series
+        new = self._new_series()
+        if isinstance(new, RingBuffer):
+            new.extend(values)
+        else:
+            new.extend(float(v) for v in values)
+        return new
+
     def add_point(self, t_s: float, values: Dict[str, float]):
-        current_max_time = 0.0
+        t_start = time.perf_counter()
 
         for sensor_key, val in values.items():
             # Pokud křivka pro daný senzor neexistuje, vytvoříme ji
             if sensor_key not in self._curves:
                 self._create_curve(sensor_key)
 
+            if self._scrolling:
+                xs = self._data_x[sensor_key]
+                # Plný buffer by přepsal bod, který je ještě v okně
+                if (len(xs) == xs.capacity < self.SCROLL_MAX_POINTS
+                        and xs.view()[0] >= t_s - self._time_window):
+                    self._grow_series(sensor_key)
+
             self._data_x[sensor_key].append(t_s)
             self._data_y[sensor_key].append(val)
-            current_max_time = max(current_max_time, t_s)
+            if not self._scrolling and len(self._data_x[sensor_key]) > self.STRETCH_MAX_POINTS:
+                self._compact_series(sensor_key)
+        if values:
+            self._latest_t = max(self._latest_t, t_s)
+
+        self._refresh_curves()
+
+        # Doba aktualizace dat se přičte k době vykreslení následujícího snímku
+        self._update_ms = (time.perf_counter() - t_start) * 1000.0
+        points = self._visible_point_count()
+        _VISIBLE_POINTS.set(points)
+        level = self._quality.update(points)
+        if level is not None:
+            self._apply_render_level(level)
 
+    def _refresh_curves(self):
         for sensor_key, curve in self._curves.items():
             xs = self._data_x[sensor_key]
             ys = self._data_y[sensor_key]
-            if not xs: continue
-            
-            # Bez scrollingu - data se jen přidávají a graf se natahuje
-            curve.setData(xs, ys)
+            if not len(xs): continue
+
+            if isinstance(xs, RingBuffer):
+                # Souvislé pohledy do bufferu, bez kopírování
+                curve.setData(xs.view(), ys.view())
+            else:
+                # Bez scrollingu - data se jen přidávají a graf se natahuje
+                curve.setData(xs, ys)
 
-        # Osa X - roztahování
-        view_max = max(self._time_window, current_max_time)
-        self._plot_widget.setXRange(0, view_max, padding=0.02)
+        if self._scrolling:
+            # Osa X - posuvné okno
+            view_min = max(0.0, self._latest_t - self._time_window)
+            self._plot_widget.setXRange(view_min, view_min + self._time_window, padding=0.02)
+        else:
+            # Osa X - roztahování
+            view_max = max(self._time_window, self._latest_t)
+            self._plot_widget.setXRange(0, view_max, padding=0.02)
 
-        # Auto-scale pro Y osy
-        temp_vals = []
-        volt_vals = []
+        # Auto-scale pro Y osy - jen z bodů, které jsou v zobrazeném okně
+        temp_range = None
+        volt_range = None
+        visible = 0
+        window_start = self._latest_t - self._time_window
         for key, ys in self._data_y.items():
-            if not ys: continue
-            
-            is_voltage = key.startswith("V_") or key.startswith("ADC") or key.startswith("ESP")
-            if is_voltage:
-                volt_vals.extend(ys)
+            if not len(ys): continue
+            if isinstance(ys, RingBuffer):
+                # Buffer může držet i body před oknem (kapacita je odhad)
+                xs = self._data_x[key].view()
+                ys = ys.view()[int(np.searchsorted(xs, window_start)):]
+                if not len(ys): continue
+            visible += len(ys)
+
+            if self._axes[key] == AXIS_VOLTAGE:
+                volt_range = self._merge_range(volt_range, ys)
             else:
-                temp_vals.extend(ys)
+                temp_range = self._merge_range(temp_range, ys)
 
-        if temp_vals:
-            mi, ma = min(temp_vals), max(temp_vals)
+        if temp_range:
+            mi, ma = temp_range
             diff = ma - mi if ma != mi else 1.0
             self._plot_item.setYRange(mi - diff*0.1, ma + diff*0.1, padding=0.02)
         
-        if self._dual_axis_enabled and volt_vals:
-            mi, ma = min(volt_vals), max(volt_vals)
+        if self._dual_axis_enabled and volt_range:
+            mi, ma = volt_range
             diff = ma - mi if ma != mi else 1.0
             self._view_voltage.setYRange(mi - diff*0.1, ma + diff*0.1, padding=0.02)
 
+        self._visible_points = visible
+
+    def _compact_series(self, key: str):
+        """
+        Omezí paměť křivky při roztahování: starší surové body se přesunou do obálky
+        minim a maxim (špičky zůstanou vidět), nejnovější čtvrtina limitu zůstává v plném rozlišení.
+        Křivka = první bod + obálka + surový konec. Plné rozlišení zůstává v datech měření (export, analýza).
+        """
+        xs, ys = self._data_x[key], self._data_y[key]
+        envelope = self._envelopes.get(key)
+        if envelope is None:
+            envelope = self._envelopes[key] = _MinMaxEnvelope(self.STRETCH_FIRST_BUCKET)
+        # První bod zůstává vždy, aby křivka začínala na začátku měření
+        raw_start = 1 + envelope.n_points
+        n_new = (len(xs) - raw_start - self.STRETCH_MAX_POINTS // 4) // envelope.bucket * envelope.bucket
+        if n_new <= 0:
+            return
+        envelope.add(xs[raw_start:raw_start + n_new], ys[raw_start:raw_start + n_new])
+        while envelope.n_points > self.STRETCH_MAX_POINTS // 2:
+            envelope.merge_pairs()
+        env_x, env_y = envelope.points()
+        self._data_x[key] = xs[:1] + env_x + xs[raw_start + n_new:]
+        self._data_y[key] = ys[:1] + env_y + ys[raw_start + n_new:]
+
+    @staticmethod
+    def _merge_range(current: Optional[Tuple[float, float]], ys: Union[List[float], np.ndarray]) -> Tuple[float, float]:
+        if isinstance(ys, np.ndarray):
+            mi, ma = float(ys.min()), float(ys.max())
+        else:
+            mi, ma = min(ys), max(ys)
+        if current is None:
+            return mi, ma
+        return min(current[0], mi), max(current[1], ma)
+
+    @property
+    def render_level(self) -> RenderLevel:
+        return self._quality.level
+
+    def _on_frame_painted(self, paint_ms: float):
+        _FRAME_SECONDS.observe((paint_ms + self._update_ms) / 1000.0)
+        self._quality.record_frame(paint_ms + self._update_ms)
+        self._update_ms = 0.0
+
+    def _visible_point_count(self) -> int:
+        # Roztahování: viditelné jsou všechny body, posuvné okno: body v okně (spočítané v _refresh_curves)
+        return self._visible_points
+
+    def _apply_render_level(self, level: RenderLevel):
+        print(f"Graf: kvalita vykreslování -> {level.name}")
+        _RENDER_LEVEL.set(self._quality.level_index)
+        for key, curve in self._curves.items():
+            self._apply_level_to_curve(key, curve, level)
+
+    def _apply_level_to_curve(self, key: str, curve: pg.PlotDataItem, level: RenderLevel):
+        style = self._styles[key]
+        curve.opts['antialias'] = level.antialias
+        curve.setSkipFiniteCheck(level.skip_finite_check)
+        curve.setDownsampling(auto=level.downsample, method='peak')
+        curve.setSymbol(style["symbol"] if level.symbols else None)
+        # setPen překreslí křivku s novými volbami
+        curve.setPen(pg.mkPen(color=style["color"], width=level.pen_width, style=style["line"]))
+
+    def mark_gap(self, start_s: float, end_s: float):
+        """Vyznačí v grafu úsek, kdy nebylo spojení s ESP32."""
+        region = pg.LinearRegionItem(
+            values=(start_s, end_s), movable=False, brush=pg.mkBrush(218, 54, 51, 60)
+        )
+        region.setZValue(-10)
+        self._plot_item.addItem(region)
+
     def set_time_window(self, seconds: float):
         if seconds <= 0: return
         self._time_window = seconds
+        if self._scrolling:
+            # Kapacita bufferů odpovídá délce okna
+            for key in list(self._data_x):
+                self._data_x[key] = self._convert_series(self._data_x[key])
+                self._data_y[key] = self._convert_series(self._data_y[key])
 
     def _create_curve(self, key: str):
-        # Použití centrální funkce
-        pretty_name = get_sensor_name(key)
-        
-        color = self._assign_color(len(self._curves))
+        # Název, barva a osa jsou předpočítané v registru kanálů
+        info = channel_info(key)
+        pretty_name = info.name
+        color = pg.mkColor(info.color)
         
-        self._data_x[key] = []
-        self._data_y[key] = []
+        self._data_x[key] = self._new_series()
+        self._data_y[key] = self._new_series()
+        self._axes[key] = info.axis
 
-        use_right_axis = self._dual_axis_enabled and (
-            key.startswith("V_") or key.startswith("ADC") or key.startswith("ESP")
-        )
+        use_right_axis = self._dual_axis_enabled and info.axis == AXIS_VOLTAGE
         
         if self._dual_axis_enabled:
             if use_right_axis:
-                pen = pg.mkPen(color=color, width=2, style=Qt.SolidLine)
+                line = Qt.SolidLine
                 symbol = 'o'
                 sym_size = 5
             else:
-                pen = pg.mkPen(color=color, width=2, style=Qt.DashLine)
+                line = Qt.DashLine
                 symbol = 'x'
                 sym_size = 7
         else:
-            pen = pg.mkPen(color=color, width=2, style=Qt.SolidLine)
+            line = Qt.SolidLine
             symbol = 'x'
             sym_size = 7
 
+        self._styles[key] = {"color": color, "line": line, "symbol": symbol}
+        level = self._quality.level
+        pen = pg.mkPen(color=color, width=level.pen_width, style=line)
+        if not level.symbols:
+            symbol = None
+
         if use_right_axis:
             # Křivka pro druhou osu (manuální přidání do legendy)
             curve = pg.PlotDataItem(
-                name=pretty_name, pen=pen, symbol=symbol, symbolSize=sym_size, symbolBrush=color, antialias=True
+                name=pretty_name, pen=pen, symbol=symbol, symbolSize=sym_size, symbolBrush=color,
+                antialias=level.antialias, skipFiniteCheck=level.skip_finite_check
             )
             self._view_voltage.addItem(curve)
             
@@ -183,14 +455,10 @@ class RealtimePlotWidget(QWidget):
         else:
             # Křivka pro hlavní osu (automatická legenda)
             curve = self._plot_widget.plot(
-                name=pretty_name, pen=pen, symbol=symbol, symbolSize=sym_size, symbolBrush=color, antialias=True
+                name=pretty_name, pen=pen, symbol=symbol, symbolSize=sym_size, symbolBrush=color,
+                antialias=level.antialias, skipFiniteCheck=level.skip_finite_check
             )
+        if level.downsample:
+            curve.setDownsampling(auto=True, method='peak')
         
-        self._curves[key] = curve
-
-    def _assign_color(self, index: int):
-        colors = [
-            "#00FF00", "#FF4500", "#00FFFF", "#FFFF00", 
-            "#FF00FF", "#1E90FF", "#FFFFFF", "#FFA500"
-        ]
-        return pg.mkColor(colors[index % len(colors)])
\ No newline at end of file
+        self._curves[key] = curve
\ No newline at end of file
@@ -0,0 +1,86 @@
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+
+class RenderLevel(NamedTuple):
+    """Jedna úroveň kvality vykreslování grafu."""
+    name: str
+    pen_width: float
+    symbols: bool
+    antialias: bool
+    skip_finite_check: bool
+    downsample: bool
+    # Nad tento počet viditelných bodů se přejde na levnější úroveň (None = bez limitu)
+    max_points: Optional[int]
+
+
+# Od nejhezčí po nejlevnější
+RENDER_LEVELS: List[RenderLevel] = [
+    RenderLevel("full", 2.0, True, True, False, False, 3000),
+    RenderLevel("no_symbols", 2.0, False, True, False, False, 15000),
+    RenderLevel("fast", 1.0, False, False, True, False, 60000),
+    RenderLevel("minimal", 1.0, False, False, True, True, None),
+]
+
+
+class RenderQualityPolicy:
+    """
+    Volí úroveň kvality podle naměřené doby snímku a počtu viditelných bodů.
+      - zhoršení: snímek trvá déle než FRAME_BUDGET_MS nebo je bodů víc než limit úrovně
+      - zlepšení: snímek je výrazně pod rozpočtem a body se vejdou do limitu lepší úrovně
+    Mezi změnami je prodleva (hystereze), aby kvalita neblikala.
+    """
+
+    FRAME_BUDGET_MS = 30.0
+    RECOVER_FACTOR = 0.4       # zlepšit jen pod 40 % rozpočtu
+    POINTS_RECOVER_FACTOR = 0.8
+    SMOOTHING = 0.2            # váha nového snímku v klouzavém průměru
+    DOWN_HOLD_S = 0.5
+    UP_HOLD_S = 3.0
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.level_index = 0
+        self.frame_ms: Optional[float] = None
+        self._last_change = clock()
+
+    @property
+    def level(self) -> RenderLevel:
+        return RENDER_LEVELS[self.level_index]
+
+    def reset(self):
+        self.level_index = 0
+        self.frame_ms = None
+        self._last_change = self._clock()
+
+    def record_frame(self, ms: float):
+        if self.frame_ms is None:
+            self.frame_ms = ms
+        else:
+            self.frame_ms += self.SMOOTHING * (ms - self.frame_ms)
+
+    def update(self, visible_points: int) -> Optional[RenderLevel]:
+        """Vrátí novou úroveň, pokud se má změnit, jinak None."""
+        held = self._clock() - self._last_change
+        level = self.level
+        frame_ms = self.frame_ms
+
+        too_slow = frame_ms is not None and frame_ms > self.FRAME_BUDGET_MS
+        too_many = level.max_points is not None and visible_points > level.max_points
+        if (too_slow or too_many) and held >= self.DOWN_HOLD_S and self.level_index < len(RENDER_LEVELS) - 1:
+            return self._change(self.level_index + 1)
+
+        if self.level_index > 0 and held >= self.UP_HOLD_S:
+            better = RENDER_LEVELS[self.level_index - 1]
+            fast_enough = frame_ms is not None and frame_ms < self.FRAME_BUDGET_MS * self.RECOVER_FACTOR
+            fits = better.max_points is None or visible_points < better.max_points * self.POINTS_RECOVER_FACTOR
+            if fast_enough and fits:
+                return self._change(self.level_index - 1)
+        return None
+
+    def _change(self, index: int) -> RenderLevel:
+        self.level_index = index
+        # Nová úroveň se měří od začátku
+        self.frame_ms = None
+        self._last_change = self._clock()
+        return self.level
@@ -1,4 +1,5 @@
 #include "SerialProtocol.h"
+#include <base64.h>
 
 // ... begin, sendHello beze změny ...
 
@@ -29,6 +30,7 @@ void SerialProtocol::processLine(const String& line, Command& cmd) {
     if (up == "START") { cmd.type = CommandType::Start; return; }
     if (up == "STOP")  { cmd.type = CommandType::Stop; return; }
     if (up == "PING")  { cmd.type = CommandType::Ping; return; } // <-- NOVÉ
+    if (up == "HELLO") { cmd.type = CommandType::Hello; return; }
 
     if (up.startsWith("SET PWM")) {
         int idx = up.indexOf("SET PWM");
@@ -45,6 +47,29 @@ void SerialProtocol::processLine(const String& line, Command& cmd) {
         return;
     }
 
+    if (up.startsWith("SET CHANNELS")) {
+        String rest = up.substring(12);
+        rest.trim();
+        cmd.type = CommandType::SetChannels;
+        cmd.channelMask = (rest == "ALL") ? Channel::ALL : (uint32_t)strtoul(rest.c_str(), nullptr, 10);
+        return;
+    }
+
+    if (up.startsWith("BURST")) {
+        // BURST <rate_hz> <počet vzorků> <maska>, platnost kontroluje CommandDispatcher
+        String rest = up.substring(5);
+        rest.trim();
+        int s1 = rest.indexOf(' ');
+        int s2 = (s1 > 0) ? rest.indexOf(' ', s1 + 1) : -1;
+        if (s1 > 0 && s2 > s1) {
+            cmd.type = CommandType::Burst;
+            cmd.rateHz = rest.substring(0, s1).toFloat();
+            cmd.burstSamples = (uint32_t)strtoul(rest.substring(s1 + 1, s2).c_str(), nullptr, 10);
+            cmd.channelMask = (uint32_t)strtoul(rest.substring(s2 + 1).c_str(), nullptr, 10);
+        }
+        return;
+    }
+
     if (up.startsWith("SET RATE")) {
         int idx = up.indexOf("SET RATE");
         if (idx >= 0) {
@@ -65,21 +90,52 @@ void SerialProtocol::processLine(const String& line, Command& cmd) {
 // JEN PRO KOMPLETNOST DOPLNÍM TYTO METODY, ABY SOUBOR BYL VALIDNÍ
 void SerialProtocol::begin(unsigned long baud) { Serial.begin(baud); while (!Serial && millis() < 2000); }
 void SerialProtocol::sendHello(bool bme_ok, uint8_t dallas_count, bool adc_ok, bool tmp_ok) {
+    _helloBme = bme_ok; _helloDallas = dallas_count; _helloAdc = adc_ok; _helloTmp = tmp_ok;
     Serial.print("{\"type\":\"hello\",\"device\":\"temp-lab-v2\",\"bme\":");
     Serial.print(bme_ok?"true":"false"); Serial.print(",\"dallas\":"); Serial.print(dallas_count);
     Serial.print(",\"adc\":"); Serial.print(adc_ok?"true":"false"); Serial.print(",\"tmp\":"); 
     Serial.print(tmp_ok?"true":"false"); Serial.println("}");
 }
+void SerialProtocol::resendHello() { sendHello(_helloBme, _helloDallas, _helloAdc, _helloTmp); }
 void SerialProtocol::sendAckSetRate(float rateHz) { Serial.print("{\"type\":\"ack\",\"cmd\":\"set_rate\",\"rate_hz\":"); Serial.print(rateHz, 4); Serial.println("}"); }
 void SerialProtocol::sendAck(const char* cmd) { Serial.print("{\"type\":\"ack\",\"cmd\":\""); Serial.print(cmd); Serial.println("\"}"); }
-void SerialProtocol::sendError(const char* msg) { Serial.print("{\"type\":\"error\",\"msg\":\""); Serial.print(msg); Serial.println("\"}"); }
-void SerialProtocol::sendData(uint32_t t_ms, float t_bme, DallasBus& dallas, float v1, float v2, float v3, float v4, float t_tmp) {
+void SerialProtocol::sendError(const char* msg, const char* cmd) {
+    Serial.print("{\"type\":\"error\",\"msg\":\""); Serial.print(msg); Serial.print("\"");
+    // Název příkazu umožní PC spárovat chybu s odeslaným příkazem
+    if (cmd) { Serial.print(",\"cmd\":\""); Serial.print(cmd); Serial.print("\""); }
+    Serial.println("}");
+}
+void SerialProtocol::sendData(uint32_t t_ms, float t_bme, DallasBus& dallas, float v1, float v2, float v3, float v4, float t_tmp, uint32_t mask) {
+    // Vypnuté kanály (mask) se vůbec neposílají, DS18B20 se ani nečtou
     Serial.print("{\"type\":\"data\",\"t_ms\":"); Serial.print(t_ms);
-    Serial.print(",\"T_BME\":"); if(isnan(t_bme)) Serial.print("null"); else Serial.print(t_bme, 4);
-    Serial.print(",\"V_ADS_R\":"); Serial.print(v1,2); Serial.print(",\"V_ADS_NTC\":"); Serial.print(v2,2);
-    Serial.print(",\"V_ESP_R\":"); Serial.print(v3,2); Serial.print(",\"V_ESP_NTC\":"); Serial.print(v4,2);
-    Serial.print(",\"T_TMP\":"); if(isnan(t_tmp)) Serial.print("null"); else Serial.print(t_tmp, 4);
+    if (mask & Channel::BME) { Serial.print(",\"T_BME\":"); if(isnan(t_bme)) Serial.print("null"); else Serial.print(t_bme, 4); }
+    if (mask & Channel::ADS_R) { Serial.print(",\"V_ADS_R\":"); Serial.print(v1,2); }
+    if (mask & Channel::ADS_NTC) { Serial.print(",\"V_ADS_NTC\":"); Serial.print(v2,2); }
+    if (mask & Channel::ESP_R) { Serial.print(",\"V_ESP_R\":"); Serial.print(v3,2); }
+    if (mask & Channel::ESP_NTC) { Serial.print(",\"V_ESP_NTC\":"); Serial.print(v4,2); }
+    if (mask & Channel::TMP) { Serial.print(",\"T_TMP\":"); if(isnan(t_tmp)) Serial.print("null"); else Serial.print(t_tmp, 4); }
     uint8_t c = dallas.getSensorCount();
-    for(uint8_t i=0; i<c; ++i) { Serial.print(",\"T_DS"); Serial.print(i); Serial.print("\":"); float t=dallas.getTemperatureC(i); if(isnan(t)) Serial.print("null"); else Serial.print(t,4); }
+    for(uint8_t i=0; i<c; ++i) {
+        if (!(mask & (1UL << (Channel::DALLAS_FIRST_BIT + i)))) continue;
+        Serial.print(",\"T_DS"); Serial.print(i); Serial.print("\":"); float t=dallas.getTemperatureC(i); if(isnan(t)) Serial.print("null"); else Serial.print(t,4);
+    }
     Serial.println("}");
+}
+void SerialProtocol::sendBurstHeader(uint32_t t_ms, uint32_t samples, uint32_t mask, uint32_t period_us,
+                                     uint32_t elapsed_us, uint32_t late) {
+    Serial.print("{\"type\":\"burst\",\"t_ms\":"); Serial.print(t_ms);
+    Serial.print(",\"n\":"); Serial.print(samples);
+    Serial.print(",\"mask\":"); Serial.print(mask);
+    Serial.print(",\"period_us\":"); Serial.print(period_us);
+    Serial.print(",\"elapsed_us\":"); Serial.print(elapsed_us);
+    Serial.print(",\"late\":"); Serial.print(late);
+    Serial.println("}");
+}
+void SerialProtocol::sendBurstChunk(uint32_t seq, const uint8_t* data, size_t len) {
+    Serial.print("{\"type\":\"burst_data\",\"seq\":"); Serial.print(seq);
+    Serial.print(",\"data\":\""); Serial.print(base64::encode(data, len)); Serial.println("\"}");
+}
+void SerialProtocol::sendBurstEnd(uint32_t chunks, uint32_t samples) {
+    Serial.print("{\"type\":\"burst_end\",\"chunks\":"); Serial.print(chunks);
+    Serial.print(",\"n\":"); Serial.print(samples); Serial.println("}");
 }
\ No newline at end of file
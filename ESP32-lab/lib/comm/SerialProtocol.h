@@ -3,28 +3,55 @@
 #include "../sensors/DallasSensor.h"
 
 enum class CommandType {
-    None, Start, Stop, SetRate, SetPwm, Ping // <-- NOVÝ PŘÍKAZ
+    None, Start, Stop, SetRate, SetPwm, Ping, Hello, SetChannels, Burst
 };
 
+// Bity masky kanálů pro "SET CHANNELS <mask>" (shodné s App/core/sensors.py)
+namespace Channel {
+    static const uint32_t BME     = 1UL << 0;
+    static const uint32_t TMP     = 1UL << 1;
+    static const uint32_t ADS_R   = 1UL << 2;
+    static const uint32_t ADS_NTC = 1UL << 3;
+    static const uint32_t ESP_R   = 1UL << 4;
+    static const uint32_t ESP_NTC = 1UL << 5;
+    static const uint8_t  DALLAS_FIRST_BIT = 8;
+    static const uint32_t DALLAS_ANY = 0xFFUL << DALLAS_FIRST_BIT;
+    static const uint32_t ALL = 0xFFFFFFFFUL;
+}
+
 struct Command {
     CommandType type = CommandType::None;
     float rateHz = 0.0f;
     int pwmChannel = 0;    
     float pwmValue = 0.0f; 
+    uint32_t channelMask = Channel::ALL;
+    uint32_t burstSamples = 0; // BURST <rate_hz> <počet vzorků> <maska>
 };
 
 class SerialProtocol {
 public:
     void begin(unsigned long baud);
     void sendHello(bool bme_ok, uint8_t dallas_count, bool adc_ok, bool tmp_ok);
+    void resendHello(); // zopakuje poslední hello (identifikace bez resetu)
     bool readCommand(Command& cmd);
     void sendAck(const char* cmd);
     void sendAckSetRate(float rateHz);
-    void sendError(const char* msg);
-    void sendData(uint32_t t_ms, float t_bme, DallasBus& dallas, float v1, float v2, float v3, float v4, float t_tmp);
+    void sendError(const char* msg, const char* cmd = nullptr);
+    void sendData(uint32_t t_ms, float t_bme, DallasBus& dallas, float v1, float v2, float v3, float v4, float t_tmp,
+                  uint32_t mask = Channel::ALL);
+
+    // Výpis rychlého záznamu: hlavička, bloky dat v base64 (uint16 mV little-endian,
+    // kanály vzorku za sebou v pořadí bitů masky) a závěr s počtem bloků
+    static const size_t BURST_CHUNK_BYTES = 192;
+    void sendBurstHeader(uint32_t t_ms, uint32_t samples, uint32_t mask, uint32_t period_us,
+                         uint32_t elapsed_us, uint32_t late);
+    void sendBurstChunk(uint32_t seq, const uint8_t* data, size_t len);
+    void sendBurstEnd(uint32_t chunks, uint32_t samples);
 
 private:
     String _buffer;
+    bool _helloBme = false, _helloAdc = false, _helloTmp = false;
+    uint8_t _helloDallas = 0;
     static const size_t MAX_BUFFER = 256;
     void processLine(const String& line, Command& cmd);
 };
\ No newline at end of file
@@ -0,0 +1,53 @@
+#include "BurstCapture.h"
+
+static uint8_t countChannels(uint32_t mask) {
+    uint8_t n = 0;
+    if (mask & Channel::ESP_R) n++;
+    if (mask & Channel::ESP_NTC) n++;
+    return n;
+}
+
+const char* BurstCapture::validate(float rateHz, uint32_t samples, uint32_t mask) {
+    if (rateHz <= 0.0f || rateHz > (float)MAX_RATE_HZ) return "invalid_rate";
+    if (mask == 0 || (mask & ~ALLOWED_MASK)) return "invalid_channels";
+    if (samples == 0 || samples > MAX_VALUES || samples * countChannels(mask) > MAX_VALUES) return "invalid_samples";
+    if ((float)samples / rateHz * 1000.0f > (float)MAX_WINDOW_MS) return "invalid_samples";
+    return nullptr;
+}
+
+void BurstCapture::capture(AdcSensor& adc, float rateHz, uint32_t samples, uint32_t mask) {
+    _samples = samples;
+    _mask = mask;
+    _channels = countChannels(mask);
+    _periodUs = (uint32_t)(1000000.0f / rateHz);
+    if (_periodUs == 0) _periodUs = 1;
+    _late = 0;
+
+    _tStartMs = millis();
+    uint32_t start = micros();
+    uint32_t next = start;
+    uint32_t idx = 0;
+    for (uint32_t i = 0; i < samples; ++i) {
+        // Aktivní čekání - delay() by měl rozlišení 1 ms
+        while ((int32_t)(micros() - next) < 0) {}
+        if ((int32_t)(micros() - next) > (int32_t)_periodUs) _late++;
+        next += _periodUs;
+
+        if (mask & Channel::ESP_R)   _values[idx++] = (uint16_t)adc.readEspMilliVolts(AdcSensor::PIN_ESP_RESISTOR);
+        if (mask & Channel::ESP_NTC) _values[idx++] = (uint16_t)adc.readEspMilliVolts(AdcSensor::PIN_ESP_NTC);
+    }
+    _elapsedUs = micros() - start;
+}
+
+void BurstCapture::dump(SerialProtocol& proto) const {
+    proto.sendBurstHeader(_tStartMs, _samples, _mask, _periodUs, _elapsedUs, _late);
+    const uint8_t* bytes = (const uint8_t*)_values;
+    size_t total = (size_t)_samples * _channels * sizeof(uint16_t);
+    uint32_t seq = 0;
+    for (size_t pos = 0; pos < total; pos += SerialProtocol::BURST_CHUNK_BYTES) {
+        size_t len = total - pos;
+        if (len > SerialProtocol::BURST_CHUNK_BYTES) len = SerialProtocol::BURST_CHUNK_BYTES;
+        proto.sendBurstChunk(seq++, bytes + pos, len);
+    }
+    proto.sendBurstEnd(seq, _samples);
+}
@@ -0,0 +1,35 @@
+#pragma once
+#include <Arduino.h>
+#include "../../lib/comm/SerialProtocol.h"
+#include "../../lib/sensors/AdcSensor.h"
+
+// Rychlý záznam (BURST): vybrané kanály interního ADC se vzorkují do RAM
+// a po skončení okna se celý blok pošle najednou (SerialProtocol::sendBurst*).
+class BurstCapture {
+public:
+    // Jen interní ADC ESP32 - ADS1115 zvládne max. 860 SPS a I2C by vzorkování brzdilo
+    static const uint32_t ALLOWED_MASK = Channel::ESP_R | Channel::ESP_NTC;
+    static const uint32_t MAX_RATE_HZ = 10000;
+    // 64 kB RAM (uint16 mV, vzorky kanálů za sebou)
+    static const uint32_t MAX_VALUES = 32768;
+    // Nejdelší okno - po dobu záznamu ESP nereaguje na příkazy
+    static const uint32_t MAX_WINDOW_MS = 10000;
+
+    // Kontrola parametrů příkazu, při chybě vrátí text chyby pro sendError
+    static const char* validate(float rateHz, uint32_t samples, uint32_t mask);
+
+    // Blokující záznam (během něj se nečtou příkazy ani neposílají data)
+    void capture(AdcSensor& adc, float rateHz, uint32_t samples, uint32_t mask);
+    // Odeslání posledního záznamu
+    void dump(SerialProtocol& proto) const;
+
+private:
+    uint16_t _values[MAX_VALUES];
+    uint32_t _samples = 0;
+    uint32_t _mask = 0;
+    uint8_t _channels = 0;
+    uint32_t _tStartMs = 0;
+    uint32_t _periodUs = 0;
+    uint32_t _elapsedUs = 0;
+    uint32_t _late = 0; // vzorky pořízené se zpožděním větším než perioda
+};
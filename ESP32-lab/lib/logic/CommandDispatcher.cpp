@@ -1,4 +1,5 @@
 #include "CommandDispatcher.h"
+#include "BurstCapture.h"
 
 void CommandDispatcher::apply(const Command& cmd) {
     // Jakýkoliv příkaz resetuje watchdog
@@ -20,28 +21,69 @@ void CommandDispatcher::apply(const Command& cmd) {
             // Jen resetuje časovač (už se stalo výše), neposíláme ACK
             break;
 
+        case CommandType::Hello:
+            // PC se připojilo bez resetu a chce znát konfiguraci senzorů
+            _proto.resendHello();
+            break;
+
         case CommandType::SetRate:
             if (cmd.rateHz > 0.0f && cmd.rateHz <= 10.0f) {
                 _rateHz = cmd.rateHz;
                 _proto.sendAckSetRate(_rateHz);
             } else {
-                _proto.sendError("invalid_rate");
+                _proto.sendError("invalid_rate", "set_rate");
             }
             break;
 
+        case CommandType::SetChannels:
+            _channelMask = cmd.channelMask;
+            _proto.sendAck("set_channels");
+            break;
+
         case CommandType::SetPwm:
             if (cmd.pwmChannel == 0) {
                 _actuators.setHeater(cmd.pwmValue);
             } else if (cmd.pwmChannel == 1) {
                 _actuators.setCooler(cmd.pwmValue);
+            } else {
+                _proto.sendError("invalid_channel", "set_pwm");
+                break;
             }
             _proto.sendAck("set_pwm");
             break;
+
+        case CommandType::Burst: {
+            // Záznam blokuje smyčku -> jen mimo průběžné měření
+            if (_isRunning) {
+                _proto.sendError("busy", "burst");
+                break;
+            }
+            const char* err = BurstCapture::validate(cmd.rateHz, cmd.burstSamples, cmd.channelMask);
+            if (err) {
+                _proto.sendError(err, "burst");
+                break;
+            }
+            _burstRateHz = cmd.rateHz;
+            _burstSamples = cmd.burstSamples;
+            _burstMask = cmd.channelMask;
+            _burstPending = true;
+            _proto.sendAck("burst");
+            break;
+        }
             
         default: break;
     }
 }
 
+bool CommandDispatcher::takeBurstRequest(float& rateHz, uint32_t& samples, uint32_t& mask) {
+    if (!_burstPending) return false;
+    _burstPending = false;
+    rateHz = _burstRateHz;
+    samples = _burstSamples;
+    mask = _burstMask;
+    return true;
+}
+
 // --- TOTO JE TA CHYBĚJÍCÍ ČÁST ---
 void CommandDispatcher::checkSafetyTimeout() {
     // Pokud běžíme a dlouho nepřišel příkaz (více než 3 sekundy), vypneme to
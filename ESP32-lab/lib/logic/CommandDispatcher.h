@@ -13,6 +13,12 @@ public:
 
     bool isRunning() const { return _isRunning; }
     float getRateHz() const { return _rateHz; }
+    uint32_t getChannelMask() const { return _channelMask; }
+
+    // Čekající rychlý záznam (BURST) - provede ho hlavní smyčka, vrací true jen jednou
+    bool takeBurstRequest(float& rateHz, uint32_t& samples, uint32_t& mask);
+    // Po dlouhé blokující operaci (záznam, výpis) začne hlídání komunikace znovu
+    void touch() { _lastCommandTime = millis(); }
 
 private:
     SerialProtocol& _proto;
@@ -20,6 +26,12 @@ private:
 
     bool _isRunning = false;
     float _rateHz = 2.0f;
+    uint32_t _channelMask = Channel::ALL;
+
+    bool _burstPending = false;
+    float _burstRateHz = 0.0f;
+    uint32_t _burstSamples = 0;
+    uint32_t _burstMask = 0;
     
     // Čas posledního přijatého příkazu (Watchdog)
     uint32_t _lastCommandTime = 0;
@@ -8,6 +8,7 @@
 #include "SerialProtocol.h"
 #include "../lib/actuators/ActuatorController.h"
 #include "../lib/logic/CommandDispatcher.h"
+#include "../lib/logic/BurstCapture.h"
 
 // Piny
 static const uint8_t I2C_SDA = 21;
@@ -22,6 +23,7 @@ ActuatorController actuators;
 SerialProtocol proto;
 
 CommandDispatcher dispatcher(proto, actuators);
+BurstCapture burst;
 
 static uint32_t g_last_ms = 0;
 
@@ -55,7 +57,15 @@ void loop() {
     // 2. Bezpečnost (Watchdog)
     dispatcher.checkSafetyTimeout();
 
-    // 3. Měření
+    // 3. Rychlý záznam (BURST) - záznam do RAM, pak výpis celého bloku
+    float burstRate; uint32_t burstSamples, burstMask;
+    if (dispatcher.takeBurstRequest(burstRate, burstSamples, burstMask)) {
+        burst.capture(adc, burstRate, burstSamples, burstMask);
+        burst.dump(proto);
+        dispatcher.touch();
+    }
+
+    // 4. Měření
     if (dispatcher.isRunning() && dispatcher.getRateHz() > 0.0f) {
         uint32_t now = millis();
         uint32_t period = (uint32_t)(1000.0f / dispatcher.getRateHz());
@@ -64,17 +74,19 @@ void loop() {
         if (now - g_last_ms >= period) {
             g_last_ms = now;
 
-            float t_bme = bme.readTemperatureC();
-            float t_tmp = tmp.readTemperatureC();
-            float mv_ads_r   = adc.readAdsMilliVolts(AdcSensor::ADS_CH_RESISTOR);
-            float mv_ads_ntc = adc.readAdsMilliVolts(AdcSensor::ADS_CH_NTC);
-            float mv_esp_r   = adc.readEspMilliVolts(AdcSensor::PIN_ESP_RESISTOR);
-            float mv_esp_ntc = adc.readEspMilliVolts(AdcSensor::PIN_ESP_NTC);
+            // Čteme jen kanály vybrané příkazem SET CHANNELS
+            uint32_t mask = dispatcher.getChannelMask();
+            float t_bme = (mask & Channel::BME) ? bme.readTemperatureC() : NAN;
+            float t_tmp = (mask & Channel::TMP) ? tmp.readTemperatureC() : NAN;
+            float mv_ads_r   = (mask & Channel::ADS_R)   ? adc.readAdsMilliVolts(AdcSensor::ADS_CH_RESISTOR) : NAN;
+            float mv_ads_ntc = (mask & Channel::ADS_NTC) ? adc.readAdsMilliVolts(AdcSensor::ADS_CH_NTC) : NAN;
+            float mv_esp_r   = (mask & Channel::ESP_R)   ? adc.readEspMilliVolts(AdcSensor::PIN_ESP_RESISTOR) : NAN;
+            float mv_esp_ntc = (mask & Channel::ESP_NTC) ? adc.readEspMilliVolts(AdcSensor::PIN_ESP_NTC) : NAN;
 
             proto.sendData(now, t_bme, dallas, 
                            mv_ads_r, mv_ads_ntc, 
                            mv_esp_r, mv_esp_ntc, 
-                           t_tmp);
+                           t_tmp, mask);
         }
     }
     delay(1);